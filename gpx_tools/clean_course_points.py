@@ -1,7 +1,17 @@
-from gpxpy.gpx import GPX, GPXRoutePoint, GPXWaypoint
+import argparse
+import glob
+import os
 import re
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from gpxpy.gpx import GPX, GPXRoutePoint, GPXWaypoint
 
-from gpx_tools.utils import read_gpx, save_gpx
+from gpx_tools.gpx_stream import iter_track_points, iter_waypoints, to_gpx_waypoint, write_track_points
+from gpx_tools.utils import read_gpx, read_gpx_routes, save_gpx
 
 
 def get_waypoints(track: GPX, reg):
@@ -48,28 +58,54 @@ def set_waypoint_point_type(waypoints: list[GPXWaypoint], wp_type: str):
     return waypoints
 
 
-def from_single_file(filename: str):
+def keep_single_file_waypoints(gpx: GPX) -> list[GPXWaypoint]:
     """
-    This subroutine takes a single file containing both the track and route information.
-    This preserves ONLY the danger, food, and control waypoints.
-    Personal use case: send route to Garmin via RideWithGPS and export from Garmin. Simpler but trims waypoint names.
-    :param filename:
-    :return:
+    :param gpx: a file containing both the track and route information
+    :return: ONLY the danger, food, and control waypoints, controls typed as Control
     """
-    original_gpx = read_gpx(filename)
-
     # keep danger waypoints
-    danger_wps = get_waypoints_by_type(original_gpx, wp_type='DANGER')
+    danger_wps = get_waypoints_by_type(gpx, wp_type='DANGER')
 
     # keep food waypoints
-    food_wps = get_waypoints_by_type(original_gpx, wp_type='FOOD')
+    food_wps = get_waypoints_by_type(gpx, wp_type='FOOD')
 
     # keep controls
     reg_for_controls = 'Control'
-    control_wps = get_waypoints(original_gpx, reg_for_controls)
+    control_wps = get_waypoints(gpx, reg_for_controls)
     set_waypoint_point_type(control_wps, wp_type='Control')
 
-    original_gpx.waypoints = danger_wps + food_wps + control_wps
+    return danger_wps + food_wps + control_wps
+
+
+def keep_route_cues(route: GPX) -> list[GPXRoutePoint]:
+    """
+    :param route: a route file, only its cues are used
+    :return: ONLY the danger, food, and control cues, named after their description, controls typed as Checkpoint
+    """
+    # keep danger waypoints
+    danger_wps = get_route_points_by_type(route, wp_type='Danger')
+
+    # keep food waypoints
+    food_wps = get_route_points_by_type(route, wp_type='Food')
+
+    # keep controls
+    control_wps = get_route_points_by_type(route, wp_type='Control', wp_type_override="Checkpoint")
+
+    return danger_wps + food_wps + control_wps
+
+
+def from_single_file(filename: str):
+    """
+    This subroutine takes a single file containing both the track and route information.
+    This preserves ONLY the danger, food, and control waypoints.
+    Personal use case: send route to Garmin via RideWithGPS and export from Garmin. Simpler but trims waypoint names.
+    The whole file is parsed with gpxpy, which keeps its metadata, routes, track names and extensions;
+    clean_single_file streams the track instead when those are not needed.
+    :param filename:
+    :return:
+    """
+    original_gpx = read_gpx(filename)
+    original_gpx.waypoints = keep_single_file_waypoints(original_gpx)
 
     return original_gpx
 
@@ -79,39 +115,257 @@ def from_track_course_file(track_file: str, route_file: str):
     This subroutine takes two filename: a track and route file.
     The track file contains only the points while the route contains only the cues/waypoints.
     Personal use case: export route and track directly from RideWithGPS in order to get untrimmed descriptions.
+    The track file is parsed with gpxpy, which keeps its metadata, track names and extensions;
+    clean_track_course_file streams the track instead when those are not needed.
     :param track_file:
     :param route_file:
     :return:
     """
     track = read_gpx(track_file)
-    route = read_gpx(route_file)
+    # only the cues of the route file are used
+    track.waypoints = keep_route_cues(read_gpx_routes(route_file))
 
-    # keep danger waypoints
-    danger_wps = get_route_points_by_type(route, wp_type='Danger')
+    return track
 
-    # keep food waypoints
-    food_wps = get_route_points_by_type(route, wp_type='Food')
 
-    # keep controls
-    control_wps = get_route_points_by_type(route, wp_type='Control', wp_type_override="Checkpoint")
+def clean_single_file(filename: str, output: str) -> int:
+    """
+    Writes what from_single_file keeps, without parsing the file with gpxpy: the waypoints are read first,
+    then the track points are streamed straight to the output.
+    Only the track points and the kept waypoints are written: use from_single_file when the metadata, routes,
+    track names or extensions must be preserved. The tracks of the file are written as segments of one track.
+    :param filename: a file containing both the track and route information
+    :param output: the cleaned file
+    :return: the number of waypoints kept
+    """
+    gpx = GPX()
+    gpx.waypoints = [to_gpx_waypoint(point) for point in iter_waypoints(filename)]
+    gpx.waypoints = keep_single_file_waypoints(gpx)
 
-    track.waypoints = danger_wps + food_wps + control_wps
+    write_track_points(output, iter_track_points(filename), gpx=gpx)
+    return len(gpx.waypoints)
 
-    return track
 
+def clean_track_course_file(track_file: str, route_file: str, output: str) -> int:
+    """
+    Writes what from_track_course_file keeps, without parsing the track file with gpxpy:
+    its track points are streamed straight to the output.
+    Only the track points and the kept cues are written: use from_track_course_file when the metadata,
+    track names or extensions of the track file must be preserved. Its tracks are written as segments of one track.
+    :param track_file: the file containing the track points
+    :param route_file: the file containing the cues
+    :param output: the cleaned file
+    :return: the number of waypoints kept
+    """
+    gpx = GPX()
+    # only the cues of the route file are used
+    gpx.waypoints = keep_route_cues(read_gpx_routes(route_file))
+
+    write_track_points(output, iter_track_points(track_file), gpx=gpx)
+    return len(gpx.waypoints)
+
+
+class CleanJob(NamedTuple):
+    name: str
+    track_file: str
+    route_file: str | None = None  # None when the track file holds both the track and the waypoints
+
+
+class CleanResult(NamedTuple):
+    name: str
+    output: str
+    waypoint_count: int
+    read_seconds: float  # reading and filtering, the streamed track is read while it is written
+    write_seconds: float
+    error: str | None = None
+
+    @property
+    def total_seconds(self) -> float:
+        return self.read_seconds + self.write_seconds
 
-def main():
-    from_single = False
 
-    if from_single:
-        single_file = r"S:\Downloads\COURSE_340564128.gpx"
-        gpx = from_single_file(single_file)
-    else:
-        track_file = r"S:\Downloads\Double_Eagles_400K_track.gpx"
-        route_file = r"S:\Downloads\Double_Eagles_400K_route.gpx"
-        gpx = from_track_course_file(track_file, route_file)
+def _gpx_stem(filename: str) -> str:
+    name = os.path.basename(filename)
+    for extension in ('.gz', '.gpx'):
+        if name.lower().endswith(extension):
+            name = name[:-len(extension)]
+    return name
 
-    save_gpx('T-Double_Eagles_400k.gpx', gpx)
+
+def _unique_names(jobs: list[CleanJob]) -> list[CleanJob]:
+    # jobs of the same name in different directories are told apart by their directory, then by a counter
+    counts = Counter(job.name for job in jobs)
+    jobs = [job._replace(name=f'{os.path.basename(os.path.dirname(os.path.abspath(job.track_file)))}-{job.name}')
+            if counts[job.name] > 1 else job for job in jobs]
+
+    res = []
+    seen = Counter()
+    for job in sorted(jobs):
+        seen[job.name] += 1
+        res.append(job._replace(name=f'{job.name}-{seen[job.name]}') if seen[job.name] > 1 else job)
+    return res
+
+
+def find_jobs(paths: Iterable[str],
+              track_suffix: str = '_track',
+              route_suffix: str = '_route') -> tuple[list[CleanJob], list[tuple[str, str]]]:
+    """
+    Pairs the track and route files exported separately, e.g. Double_Eagles_400K_track.gpx with
+    Double_Eagles_400K_route.gpx in the same directory; files with neither suffix are single files holding both.
+    Job names are unique, so every job writes its own file.
+    :param paths: GPX files, directories (their .gpx and .gpx.gz files) or glob patterns
+    :param track_suffix: the end of the name of track files, case-insensitive
+    :param route_suffix: the end of the name of route files, case-insensitive
+    :return: the jobs sorted by name, and the skipped files with the reason: missing their counterpart, or sharing
+             their name and role with another file of the same directory (e.g. Foo_track.gpx and Foo_track.gpx.gz)
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += glob.glob(os.path.join(path, '*.gpx')) + glob.glob(os.path.join(path, '*.gpx.gz'))
+        elif glob.has_magic(path):
+            files += glob.glob(path)
+        else:
+            files.append(path)
+
+    # (role, directory, name) -> files
+    groups: dict[tuple[str, str, str], list[str]] = {}
+    for file in dict.fromkeys(os.path.normpath(file) for file in files):
+        directory = os.path.dirname(os.path.abspath(file))
+        stem = _gpx_stem(file)
+        if stem.lower().endswith(track_suffix.lower()):
+            key = 'track', directory, stem[:-len(track_suffix)]
+        elif stem.lower().endswith(route_suffix.lower()):
+            key = 'route', directory, stem[:-len(route_suffix)]
+        else:
+            key = 'single', directory, stem
+        groups.setdefault(key, []).append(file)
+
+    skipped = []
+    found = {}
+    for key, group in groups.items():
+        if len(group) > 1:
+            skipped += [(file, f"conflicts with {', '.join(other for other in group if other != file)}")
+                        for file in group]
+        else:
+            found[key] = group[0]
+
+    jobs = []
+    for (role, directory, name), file in found.items():
+        if role == 'single':
+            jobs.append(CleanJob(name, file))
+            continue
+
+        other_role = 'route' if role == 'track' else 'track'
+        other = found.get((other_role, directory, name))
+        if other is None:
+            reason = 'conflicting' if (other_role, directory, name) in groups else 'no matching'
+            skipped.append((file, f"{reason} {other_role} file"))
+        elif role == 'track':
+            jobs.append(CleanJob(name, file, other))
+
+    return _unique_names(jobs), sorted(skipped)
+
+
+def clean_job(job: CleanJob, output_dir: str, prefix: str = 'T-', preserve_metadata: bool = False) -> CleanResult:
+    """
+    Runs clean_single_file or clean_track_course_file on one job, streaming the track to the cleaned file.
+    Errors are reported in the result, so one bad file does not stop a batch.
+    :param job: the files to clean
+    :param output_dir: the directory the cleaned file is written to
+    :param prefix: prepended to the job name to name the cleaned file
+    :param preserve_metadata: parse the track with from_single_file or from_track_course_file instead,
+                              to keep its metadata, track names and extensions
+    :return: the result, with timings
+    """
+    output = os.path.join(output_dir, f'{prefix}{job.name}.gpx')
+    start = time.perf_counter()
+    try:
+        if not preserve_metadata:
+            if job.route_file is None:
+                waypoint_count = clean_single_file(job.track_file, output)
+            else:
+                waypoint_count = clean_track_course_file(job.track_file, job.route_file, output)
+            return CleanResult(job.name, output, waypoint_count, 0, time.perf_counter() - start)
+
+        if job.route_file is None:
+            gpx = from_single_file(job.track_file)
+        else:
+            gpx = from_track_course_file(job.track_file, job.route_file)
+        read_seconds = time.perf_counter() - start
+
+        save_gpx(output, gpx)
+        write_seconds = time.perf_counter() - start - read_seconds
+        return CleanResult(job.name, output, len(gpx.waypoints), read_seconds, write_seconds)
+    except Exception as e:
+        return CleanResult(job.name, output, 0, time.perf_counter() - start, 0, error=f'{type(e).__name__}: {e}')
+
+
+def clean_batch(jobs: Iterable[CleanJob],
+                output_dir: str,
+                prefix: str = 'T-',
+                max_workers: int | None = None,
+                preserve_metadata: bool = False) -> Iterator[CleanResult]:
+    """
+    Cleans many jobs across a process pool, one file pair per task since files are large and few.
+    :param jobs: the files to clean, with unique names
+    :param output_dir: the directory the cleaned files are written to, created if needed
+    :param prefix: prepended to the job names to name the cleaned files
+    :param max_workers: the number of processes, the CPU count by default
+    :param preserve_metadata: parse the tracks with gpxpy to keep their metadata, see clean_job
+    :return: iterator of results, in job order
+    """
+    jobs = list(jobs)
+    duplicates = [name for name, count in Counter(job.name for job in jobs).items() if count > 1]
+    if duplicates:
+        raise ValueError(f"Jobs would overwrite each other's output: {', '.join(duplicates)}.")
+    os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(clean_job, jobs, [output_dir] * len(jobs), [prefix] * len(jobs),
+                                [preserve_metadata] * len(jobs))
+
+
+def format_summary(results: list[CleanResult], wall_seconds: float) -> str:
+    """
+    :param results: the results of a batch
+    :param wall_seconds: how long the batch took
+    :return: one line per file with its timings, then the totals
+    """
+    width = max([len(result.name) for result in results] + [len('file')])
+    lines = [f"{'file':<{width}}  {'waypoints':>9}  {'read (s)':>8}  {'write (s)':>9}  {'total (s)':>9}"]
+    for result in results:
+        line = f"{result.name:<{width}}  {result.waypoint_count:>9}  {result.read_seconds:>8.2f}  " \
+               f"{result.write_seconds:>9.2f}  {result.total_seconds:>9.2f}"
+        if result.error:
+            line += f"  FAILED {result.error}"
+        lines.append(line)
+
+    failed = sum(1 for result in results if result.error)
+    lines.append(f"{len(results)} files ({failed} failed) in {wall_seconds:.2f} s, "
+                 f"{sum(result.total_seconds for result in results):.2f} s of per-file time")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keeps the danger, food and control waypoints of GPX course exports.")
+    parser.add_argument('paths', nargs='+', help="GPX files, directories or glob patterns")
+    parser.add_argument('--output-dir', default='cleaned', help="directory the cleaned files are written to")
+    parser.add_argument('--prefix', default='T-', help="prepended to the names of the cleaned files")
+    parser.add_argument('--track-suffix', default='_track', help="end of the names of track files")
+    parser.add_argument('--route-suffix', default='_route', help="end of the names of route files")
+    parser.add_argument('--workers', type=int, help="number of processes, the CPU count by default")
+    parser.add_argument('--preserve-metadata', action='store_true',
+                        help="parse the tracks with gpxpy to keep their metadata, track names and extensions")
+    args = parser.parse_args()
+
+    jobs, skipped = find_jobs(args.paths, track_suffix=args.track_suffix, route_suffix=args.route_suffix)
+    for file, reason in skipped:
+        print(f"SKIPPED {file}: {reason}")
+
+    start = time.perf_counter()
+    results = list(clean_batch(jobs, args.output_dir, prefix=args.prefix, max_workers=args.workers,
+                               preserve_metadata=args.preserve_metadata))
+    print(format_summary(results, time.perf_counter() - start))
 
 
 if __name__ == '__main__':
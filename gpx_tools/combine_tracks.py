@@ -1,16 +1,94 @@
-from gpx_tools.utils import read_gpx, save_gpx
+import argparse
+from collections.abc import Iterable, Iterator
+from datetime import timedelta
 
+from gpx_tools.gpx_stream import TrackPoint, iter_track_points, write_track_points
 
-def main():
-    files = [r"S:\Downloads\to_two_eagles.gpx", r"W:\Python\EnduranceCalculations\Cycling\gpx_tools\T-Double_Eagles_400k.gpx" , r"S:\Downloads\home.gpx"]
 
-    gpxs = [read_gpx(file) for file in files]
+def iter_combined_points(files: Iterable[str],
+                         drop_duplicate_junctions: bool = False,
+                         reindex_times: bool = False,
+                         time_step: timedelta = timedelta(seconds=1),
+                         merge_segments: bool = False) -> Iterator[TrackPoint]:
+    """
+    Streams the track points of several GPX files one after the other, every track and segment of every file.
+    :param files: the GPX files, in order
+    :param drop_duplicate_junctions: drop the first point of a segment when it is at the position of the point before it
+    :param reindex_times: shift the times of every file after the first so they carry on from the previous file,
+                          time_step after its last time; the times within a file keep their spacing
+    :param time_step: the time between the last point of a file and the first point of the next one
+    :param merge_segments: put all the points in a single segment, otherwise every input segment stays a segment
+    :return: iterator of track points, all in track 0 and numbered by segment
+    """
+    segment = -1
+    previous: TrackPoint | None = None
+    for file in files:
+        file_segment = None
+        time_offset = None
+        for point in iter_track_points(file):
+            if (point.track, point.segment) != file_segment:
+                file_segment = point.track, point.segment
+                if not merge_segments or segment < 0:
+                    segment += 1
+                if drop_duplicate_junctions and previous is not None \
+                        and (point.latitude, point.longitude) == (previous.latitude, previous.longitude):
+                    continue
+
+            time = point.time
+            if reindex_times and time is not None:
+                if time_offset is None:
+                    # the first timed point of the file follows the last timed point written
+                    time_offset = timedelta(0) if previous is None or previous.time is None \
+                        else previous.time + time_step - time
+                time += time_offset
+
+            previous = point._replace(time=time, track=0, segment=segment)
+            yield previous
+
 
-    for gpx in gpxs[1:]:
-        for point in gpx.tracks[0].segments[0].speed:
-            gpxs[0].tracks[0].segments[0].speed.append(point)
+def combine_tracks(files: Iterable[str],
+                   output: str,
+                   name: str | None = None,
+                   drop_duplicate_junctions: bool = False,
+                   reindex_times: bool = False,
+                   time_step: timedelta = timedelta(seconds=1),
+                   merge_segments: bool = False,
+                   compress: bool | None = None) -> None:
+    """
+    Concatenates the tracks of several GPX files into one track, streamed from the inputs to the output, so time is
+    linear and memory bounded whatever the number and size of the files. Waypoints and routes are not carried over.
+    :param files: the GPX files, in order
+    :param output: the combined GPX file
+    :param name: the name of the combined track
+    :param drop_duplicate_junctions: see iter_combined_points
+    :param reindex_times: see iter_combined_points
+    :param time_step: see iter_combined_points
+    :param merge_segments: see iter_combined_points
+    :param compress: gzip the output, by default when the filename ends with .gz
+    """
+    write_track_points(output, iter_combined_points(files, drop_duplicate_junctions=drop_duplicate_junctions,
+                                                    reindex_times=reindex_times, time_step=time_step,
+                                                    merge_segments=merge_segments),
+                       name=name, compress=compress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concatenates the tracks of GPX files into one track.")
+    parser.add_argument('files', nargs='+', help="GPX files to combine, in order")
+    parser.add_argument('--output', default='combined_track.gpx', help="combined file, gzipped if it ends with .gz")
+    parser.add_argument('--name', help="name of the combined track")
+    parser.add_argument('--drop-duplicate-junctions', action='store_true',
+                        help="drop the first point of a segment when it repeats the point before it")
+    parser.add_argument('--reindex-times', action='store_true',
+                        help="shift the times of every file to carry on from the previous one")
+    parser.add_argument('--time-step', type=float, default=1,
+                        help="seconds between the last point of a file and the first of the next one")
+    parser.add_argument('--merge-segments', action='store_true', help="write a single segment")
+    args = parser.parse_args()
 
-    save_gpx('combined_track.gpx', gpxs[0])
+    combine_tracks(args.files, args.output, name=args.name, drop_duplicate_junctions=args.drop_duplicate_junctions,
+                   reindex_times=args.reindex_times, time_step=timedelta(seconds=args.time_step),
+                   merge_segments=args.merge_segments)
 
 
 if __name__ == '__main__':
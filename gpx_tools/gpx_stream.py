@@ -0,0 +1,395 @@
+import copy
+import gzip
+import xml.etree.ElementTree as ET
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from functools import lru_cache
+from itertools import groupby
+from typing import Any, BinaryIO, NamedTuple
+
+from gpxpy import utils as gpx_utils
+from gpxpy.gpx import GPX, GPXException, GPXRoutePoint, GPXTrack, GPXTrackPoint, GPXTrackSegment, GPXWaypoint
+from gpxpy.gpxfield import GPXComplexField, _check_dependents, format_time, gpx_fields_to_xml, parse_time
+
+
+class TrackPoint(NamedTuple):
+    latitude: float
+    longitude: float
+    elevation: float | None
+    time: datetime | None
+    track: int  # index of the track in the file
+    segment: int  # index of the segment in its track
+
+
+class Waypoint(NamedTuple):
+    latitude: float
+    longitude: float
+    elevation: float | None
+    time: datetime | None
+    name: str | None
+    comment: str | None
+    description: str | None
+    type: str | None
+    symbol: str | None
+
+
+class RoutePoint(NamedTuple):
+    latitude: float
+    longitude: float
+    elevation: float | None
+    time: datetime | None
+    name: str | None
+    comment: str | None
+    description: str | None
+    type: str | None
+    symbol: str | None
+    route: int  # index of the route in the file
+
+
+# GPX child element name -> point field
+_TEXT_FIELDS = {'name': 'name', 'cmt': 'comment', 'desc': 'description', 'type': 'type', 'sym': 'symbol'}
+_POINT_ELEMENTS = {'trkpt', 'wpt', 'rtept'}
+_READ_SIZE = 64 * 1024
+_WRITE_SIZE = 64 * 1024
+
+
+def open_gpx(filename: str, mode: str, compress: bool | None = None):
+    """
+    :param filename: the GPX file
+    :param mode: the open mode, 'rb', 'r', 'w' etc.
+    :param compress: gzip the file, by default when the filename ends with .gz
+    :return: the opened file, text modes are UTF-8 as GPX files declare
+    """
+    if compress is None:
+        compress = filename.endswith('.gz')
+    encoding = None if 'b' in mode else 'utf-8'
+    if compress:
+        return gzip.open(filename, mode if 'b' in mode else f'{mode}t', encoding=encoding)
+    return open(filename, mode, encoding=encoding)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+def _parse_time(text: str | None) -> datetime | None:
+    if not text:
+        return None
+    try:
+        # same value and same to_xml output as gpxpy, several times faster
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return parse_time(text)
+
+
+class _PointCollector:
+    """
+    Parser target collecting the points of a GPX document as they are closed, no element tree is built.
+    """
+
+    def __init__(self):
+        self.points: list[TrackPoint | Waypoint | RoutePoint] = []
+        self.__names: dict[str, str] = {}
+        self.__track = self.__segment = self.__route = -1
+        self.__point: dict | None = None
+        self.__point_depth = 0
+        self.__depth = 0
+        self.__text: list[str] = []
+
+    def __name(self, tag: str) -> str:
+        name = self.__names.get(tag)
+        if name is None:
+            name = self.__names[tag] = _local_name(tag)
+        return name
+
+    def start(self, tag: str, attrib: dict[str, str]):
+        self.__depth += 1
+        name = self.__name(tag)
+        if name in _POINT_ELEMENTS:
+            self.__point = {'latitude': float(attrib['lat']), 'longitude': float(attrib['lon']),
+                            'elevation': None, 'time': None}
+            self.__point_depth = self.__depth
+        elif name == 'trk':
+            self.__track += 1
+            self.__segment = -1
+        elif name == 'trkseg':
+            self.__segment += 1
+        elif name == 'rte':
+            self.__route += 1
+        self.__text.clear()
+
+    def data(self, text: str):
+        self.__text.append(text)
+
+    def end(self, tag: str):
+        depth = self.__depth
+        self.__depth -= 1
+        point = self.__point
+        # only the point and its direct children, e.g. not the type of a link or the contents of extensions
+        if point is None or depth > self.__point_depth + 1:
+            return
+
+        name = self.__name(tag)
+        text = ''.join(self.__text).strip() or None
+        self.__text.clear()
+        if depth > self.__point_depth:
+            if name == 'ele':
+                point['elevation'] = None if text is None else float(text)
+            elif name == 'time':
+                point['time'] = _parse_time(text)
+            elif name in _TEXT_FIELDS:
+                point[_TEXT_FIELDS[name]] = text
+        elif name == 'trkpt':
+            self.points.append(TrackPoint(point['latitude'], point['longitude'], point['elevation'], point['time'],
+                                          track=self.__track, segment=self.__segment))
+            self.__point = None
+        elif name == 'wpt':
+            self.points.append(Waypoint(**dict.fromkeys(_TEXT_FIELDS.values()) | point))
+            self.__point = None
+        elif name == 'rtept':
+            self.points.append(RoutePoint(**dict.fromkeys(_TEXT_FIELDS.values()) | point, route=self.__route))
+            self.__point = None
+
+    def close(self):
+        pass
+
+
+def iter_gpx(source: str | BinaryIO) -> Iterator[TrackPoint | Waypoint | RoutePoint]:
+    """
+    Streams the points of a GPX file in document order with incremental XML parsing, without building the GPX object.
+    The file is fed to the parser in chunks and the points closed by each chunk are yielded before the next one is
+    read, so memory does not grow with the number of points. Only the fields of the point tuples are read,
+    extensions are skipped.
+
+    :param source: a filename or a file object opened in binary mode
+    :return: iterator of track points, waypoints and route points
+    """
+    if isinstance(source, str):
+        with open_gpx(source, 'rb') as f:
+            yield from iter_gpx(f)
+        return
+
+    collector = _PointCollector()
+    parser = ET.XMLParser(target=collector)
+    while chunk := source.read(_READ_SIZE):
+        parser.feed(chunk)
+        yield from collector.points
+        collector.points.clear()
+    parser.close()
+    yield from collector.points
+
+
+def iter_track_points(source: str | BinaryIO) -> Iterator[TrackPoint]:
+    return (point for point in iter_gpx(source) if isinstance(point, TrackPoint))
+
+
+def iter_waypoints(source: str | BinaryIO) -> Iterator[Waypoint]:
+    return (point for point in iter_gpx(source) if isinstance(point, Waypoint))
+
+
+def iter_route_points(source: str | BinaryIO) -> Iterator[RoutePoint]:
+    return (point for point in iter_gpx(source) if isinstance(point, RoutePoint))
+
+
+def to_gpx_track_point(point: TrackPoint) -> GPXTrackPoint:
+    return GPXTrackPoint(latitude=point.latitude, longitude=point.longitude, elevation=point.elevation, time=point.time)
+
+
+def to_gpx_waypoint(point: Waypoint | RoutePoint) -> GPXWaypoint:
+    return GPXWaypoint(latitude=point.latitude, longitude=point.longitude, elevation=point.elevation, time=point.time,
+                       name=point.name, description=point.description, symbol=point.symbol, type=point.type,
+                       comment=point.comment)
+
+
+def to_gpx_route_point(point: Waypoint | RoutePoint) -> GPXRoutePoint:
+    return GPXRoutePoint(latitude=point.latitude, longitude=point.longitude, elevation=point.elevation,
+                         time=point.time, name=point.name, description=point.description, symbol=point.symbol,
+                         type=point.type, comment=point.comment)
+
+
+def _track_point_xml(point: TrackPoint, prettyprint: bool, indent: str) -> str:
+    """
+    :return: what gpx_fields_to_xml returns for the GPXTrackPoint of the point, formatted directly
+    """
+    if not prettyprint:
+        indent = ''
+    child_indent = f'{indent}  ' if prettyprint else ''
+    res = f'\n{indent}<trkpt lat="{gpx_utils.make_str(point.latitude)}" lon="{gpx_utils.make_str(point.longitude)}">'
+    if point.elevation is not None:
+        res += f'\n{child_indent}<ele>{gpx_utils.make_str(point.elevation)}</ele>'
+    if point.time is not None:
+        res += f'\n{child_indent}<time>{format_time(point.time)}</time>'
+    return f'{res}\n{indent}</trkpt>'
+
+
+@lru_cache(maxsize=None)
+def _has_lists(cls: type, version: str) -> bool:
+    fields = cls.gpx_11_fields if version == '1.1' else cls.gpx_10_fields
+    return any(isinstance(field, GPXComplexField) and field.is_list for field in fields)
+
+
+def _iter_fields_xml(instance: Any, tag: str, version: str, custom_attributes: dict[str, str] | None = None,
+                     nsmap: dict[str, str] | None = None, prettyprint: bool = True, indent: str = '') -> Iterator[str]:
+    """
+    gpxpy.gpxfield.gpx_fields_to_xml yielding its output piece by piece: the elements of list fields (tracks,
+    segments, points...) are serialized one at a time instead of being joined into one string.
+    """
+    custom_attributes = custom_attributes or {}
+    nsmap = nsmap or {}
+    if not prettyprint:
+        indent = ''
+    fields = instance.gpx_11_fields if version == '1.1' else instance.gpx_10_fields
+
+    tag_open = True
+    yield f'\n{indent}<{tag}'
+    if tag == 'gpx':  # write nsmap in root node
+        yield f' xmlns="{nsmap["defaultns"]}"'
+        for prefix in sorted(set(nsmap) - {'defaultns'}):
+            yield f' xmlns:{prefix}="{nsmap[prefix]}"'
+    for key in sorted(custom_attributes):
+        yield f' {key}="{gpx_utils.make_str(custom_attributes[key])}"'
+
+    suppress_until = ''
+    for field in fields:
+        # strings are containers of other fields, suppressed when all of their fields are empty
+        if isinstance(field, str):
+            if suppress_until:
+                if suppress_until == field:
+                    suppress_until = ''
+                continue
+            suppress_until, field = _check_dependents(instance, field)
+            if suppress_until:
+                continue
+            if tag_open:
+                yield '>'
+                tag_open = False
+            if field[0] == '/':
+                yield f'\n{indent}<{field}>'
+                if prettyprint and len(indent) > 1:
+                    indent = indent[:-2]
+            else:
+                if prettyprint:
+                    indent += '  '
+                yield f'\n{indent}<{field}'
+                tag_open = True
+            continue
+        if suppress_until:
+            continue
+
+        value = getattr(instance, field.name)
+        if field.attribute:
+            yield ' ' + field.to_xml(value, version, nsmap, prettyprint=prettyprint, indent=f'{indent}  ')
+        elif value is not None:
+            if tag_open:
+                yield '>'
+                tag_open = False
+            if isinstance(field, GPXComplexField) and field.is_list:
+                for element in value:
+                    if isinstance(element, TrackPoint):
+                        yield _track_point_xml(element, prettyprint, f'{indent}  ')
+                    elif _has_lists(type(element), version):
+                        yield from _iter_fields_xml(element, field.tag, version, nsmap=nsmap, prettyprint=prettyprint,
+                                                    indent=f'{indent}  ')
+                    else:
+                        yield gpx_fields_to_xml(element, field.tag, version, nsmap=nsmap, prettyprint=prettyprint,
+                                                indent=f'{indent}  ')
+            else:
+                xml_value = field.to_xml(value, version, nsmap, prettyprint=prettyprint, indent=f'{indent}  ')
+                if xml_value:
+                    yield xml_value
+
+    if tag_open:
+        yield '>'
+    yield f'\n{indent}</{tag}>'
+
+
+def iter_gpx_xml(gpx: GPX, version: str | None = None, prettyprint: bool = True) -> Iterator[str]:
+    """
+    Serializes a GPX object piece by piece, the pieces join into exactly what gpx.to_xml returns.
+    Like to_xml, it fills in the version, creator, namespaces and schema locations of the GPX object.
+
+    :param gpx: the GPX object
+    :param version: the GPX version, the one of the object or 1.1 by default
+    :param prettyprint: indent the elements
+    :return: iterator of XML strings
+    """
+    version = version or gpx.version or '1.1'
+    if version not in ('1.0', '1.1'):
+        raise GPXException(f'Invalid version {version}')
+
+    gpx.version = version
+    if not gpx.creator:
+        gpx.creator = 'gpx.py -- https://github.com/tkrajina/gpxpy'
+    version_path = version.replace('.', '/')
+    gpx.nsmap['xsi'] = 'http://www.w3.org/2001/XMLSchema-instance'
+    gpx.nsmap['defaultns'] = f'http://www.topografix.com/GPX/{version_path}'
+    if not gpx.schema_locations:
+        gpx.schema_locations = [f'http://www.topografix.com/GPX/{version_path}',
+                                f'http://www.topografix.com/GPX/{version_path}/gpx.xsd']
+
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    # to_xml strips the leading newline of the root element, nothing trails the closing tag
+    pieces = _iter_fields_xml(gpx, 'gpx', version,
+                              custom_attributes={'xsi:schemaLocation': ' '.join(gpx.schema_locations)},
+                              nsmap=gpx.nsmap, prettyprint=prettyprint)
+    yield next(pieces).lstrip()
+    yield from pieces
+
+
+def write_chunks(f, pieces: Iterator[str]) -> None:
+    """
+    :param f: a file opened in text mode
+    :param pieces: XML strings, written joined in chunks of about _WRITE_SIZE characters
+    """
+    chunk = []
+    size = 0
+    for piece in pieces:
+        chunk.append(piece)
+        size += len(piece)
+        if size >= _WRITE_SIZE:
+            f.write(''.join(chunk))
+            chunk.clear()
+            size = 0
+    f.write(''.join(chunk))
+
+
+def write_gpx(filename: str, gpx: GPX, version: str | None = None, prettyprint: bool = True,
+              compress: bool | None = None) -> None:
+    """
+    Writes a GPX object as gpx.to_xml would, without building the document in memory: the XML is written in chunks
+    of about _WRITE_SIZE characters.
+
+    :param filename: the output file
+    :param gpx: the GPX object
+    :param version: the GPX version, the one of the object or 1.1 by default
+    :param prettyprint: indent the elements
+    :param compress: gzip the output, by default when the filename ends with .gz
+    """
+    with open_gpx(filename, 'w', compress=compress) as f:
+        write_chunks(f, iter_gpx_xml(gpx, version=version, prettyprint=prettyprint))
+
+
+def _segment_key(point: TrackPoint) -> tuple[int, int]:
+    return point.track, point.segment
+
+
+def write_track_points(filename: str, points: Iterable[TrackPoint], gpx: GPX | None = None, name: str | None = None,
+                       compress: bool | None = None) -> None:
+    """
+    Writes a track from streamed points, as write_gpx would write the GPX object holding them, without ever holding
+    more than one point: the segments are only created while they are serialized, and the points are formatted
+    straight from the tuples instead of going through GPXTrackPoint objects.
+
+    :param filename: the output file
+    :param points: the track points, a new segment starts whenever the track or segment index changes
+    :param gpx: the rest of the document (metadata, waypoints, routes, other tracks), the track is added after its
+                tracks; the object itself is not modified
+    :param name: the name of the track
+    :param compress: gzip the output, by default when the filename ends with .gz
+    """
+    gpx = copy.copy(gpx) if gpx is not None else GPX()
+    track = GPXTrack(name=name)
+    # lazy, consumed once by the writer in document order
+    track.segments = (GPXTrackSegment(points=segment_points) for _, segment_points in groupby(points, key=_segment_key))
+    gpx.tracks = gpx.tracks + [track]
+    write_gpx(filename, gpx, compress=compress)
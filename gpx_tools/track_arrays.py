@@ -0,0 +1,241 @@
+from array import array
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from gpxpy.geo import EARTH_RADIUS, ONE_DEGREE
+from gpxpy.gpx import GPX, GPXBounds, GPXTrack, GPXTrackSegment
+
+from gpx_tools.gpx_stream import TrackPoint, to_gpx_track_point
+
+# gpxpy switches from its flat approximation to haversine when two points are further apart, in degrees
+_HAVERSINE_THRESHOLD = .2
+_EPOCH = datetime(1970, 1, 1)
+_UTC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def point_distances(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Vectorized gpxpy.geo.distance between consecutive points, without elevation: the flat approximation for close
+    points and haversine for distant ones, so the sum matches gpxpy's length_2d.
+
+    :param latitudes: latitudes in degrees
+    :param longitudes: longitudes in degrees
+    :return: the distance in meters from every point to the next one, one less than there are points
+    """
+    # gpxpy measures from the later point to the earlier one
+    latitude_1, latitude_2 = latitudes[1:], latitudes[:-1]
+    longitude_1, longitude_2 = longitudes[1:], longitudes[:-1]
+    d_latitude = latitude_1 - latitude_2
+    d_longitude = longitude_1 - longitude_2
+
+    res = np.hypot(d_latitude, d_longitude * np.cos(np.radians(latitude_1))) * ONE_DEGREE
+
+    distant = (np.abs(d_latitude) > _HAVERSINE_THRESHOLD) | (np.abs(d_longitude) > _HAVERSINE_THRESHOLD)
+    if distant.any():
+        lat_1 = np.radians(latitude_1[distant])
+        lat_2 = np.radians(latitude_2[distant])
+        a = (np.sin((lat_1 - lat_2) / 2) ** 2
+             + np.sin(np.radians(d_longitude[distant]) / 2) ** 2 * np.cos(lat_1) * np.cos(lat_2))
+        res[distant] = EARTH_RADIUS * 2 * np.arcsin(np.sqrt(a))
+
+    return res
+
+
+@dataclass(frozen=True)
+class TrackArrays:
+    """
+    Track points stored as NumPy columns, one row per point, the segments of the track one after the other.
+    Distances, bounds, slicing and concatenation are vectorized.
+
+    Times are stored as UTC datetime64 when the points have a time zone (they are converted back as UTC) and as they
+    are otherwise. Missing elevations are NaN and missing times NaT.
+    """
+    latitude: np.ndarray
+    longitude: np.ndarray
+    elevation: np.ndarray
+    time: np.ndarray  # datetime64[us]
+    distance: np.ndarray  # cumulative 2d distance in meters from the first point, gaps between segments excluded
+    segment_starts: np.ndarray  # index of the first point of every segment
+    utc: bool = True  # whether the times were time zone aware
+
+    @staticmethod
+    def from_columns(latitude, longitude, elevation=None, time=None, segment_starts=None,
+                     utc: bool = True) -> 'TrackArrays':
+        """
+        :param latitude: latitudes in degrees
+        :param longitude: longitudes in degrees
+        :param elevation: elevations in meters, NaN or None when missing
+        :param time: times, convertible to datetime64[us]
+        :param segment_starts: index of the first point of every segment, a single segment by default
+        :param utc: whether the times are UTC
+        :return: the track, with cumulative distances computed
+        """
+        latitude = np.asarray(latitude, dtype=float)
+        longitude = np.asarray(longitude, dtype=float)
+        n = len(latitude)
+        elevation = np.full(n, np.nan) if elevation is None else np.asarray(elevation, dtype=float)
+        time = np.full(n, np.datetime64('NaT'), dtype='datetime64[us]') if time is None \
+            else np.asarray(time, dtype='datetime64[us]')
+        segment_starts = np.zeros(min(n, 1), dtype=np.int64) if segment_starts is None \
+            else np.asarray(segment_starts, dtype=np.int64)
+
+        steps = point_distances(latitude, longitude)
+        # no distance between the last point of a segment and the first of the next one
+        steps[segment_starts[segment_starts > 0] - 1] = 0
+        distance = np.zeros(n)
+        np.cumsum(steps, out=distance[1:])
+
+        return TrackArrays(latitude, longitude, elevation, time, distance, segment_starts, utc)
+
+    @staticmethod
+    def from_points(points: Iterable[TrackPoint]) -> 'TrackArrays':
+        """
+        :param points: track points, e.g. as streamed by gpx_stream.iter_track_points; a new segment starts whenever
+                       the track or segment index changes
+        :return: the track
+        """
+        latitude, longitude, elevation = array('d'), array('d'), array('d')
+        time = array('q')  # microseconds since the epoch, NaT as the int64 minimum
+        segment_starts = array('q')
+        nat = np.datetime64('NaT', 'us').astype(np.int64)
+        utc = True
+        previous = None
+        for i, point in enumerate(points):
+            if (point.track, point.segment) != previous:
+                segment_starts.append(i)
+                previous = point.track, point.segment
+            latitude.append(point.latitude)
+            longitude.append(point.longitude)
+            elevation.append(np.nan if point.elevation is None else point.elevation)
+            if point.time is None:
+                time.append(nat)
+            elif point.time.tzinfo is None:
+                utc = False
+                time.append((point.time - _EPOCH) // _MICROSECOND)
+            else:
+                time.append((point.time - _UTC_EPOCH) // _MICROSECOND)
+
+        return TrackArrays.from_columns(np.frombuffer(latitude), np.frombuffer(longitude), np.frombuffer(elevation),
+                                        np.frombuffer(time, dtype=np.int64).view('datetime64[us]'),
+                                        np.frombuffer(segment_starts, dtype=np.int64), utc=utc)
+
+    @staticmethod
+    def from_segments(segments: Iterable[GPXTrackSegment]) -> 'TrackArrays':
+        """
+        :param segments: gpxpy track segments
+        :return: the track, one segment per segment
+        """
+        return TrackArrays.from_points(
+            TrackPoint(point.latitude, point.longitude, point.elevation, point.time, track=0, segment=s)
+            for s, segment in enumerate(segments) for point in segment.points)
+
+    @staticmethod
+    def from_gpx(gpx: GPX) -> 'TrackArrays':
+        """
+        :param gpx: a GPX object
+        :return: the segments of all its tracks, one after the other
+        """
+        return TrackArrays.from_segments(segment for track in gpx.tracks for segment in track.segments)
+
+    @staticmethod
+    def concatenate(tracks: Sequence['TrackArrays']) -> 'TrackArrays':
+        """
+        :param tracks: the tracks to join, in order
+        :return: one track with the segments of all of them, distances continuing from one track to the next
+        """
+        if not tracks:
+            return TrackArrays.from_columns([], [])
+
+        offsets = np.cumsum([0] + [len(track) for track in tracks[:-1]])
+        distance_offsets = np.cumsum([0] + [track.length_2d for track in tracks[:-1]])
+        return TrackArrays(
+            latitude=np.concatenate([track.latitude for track in tracks]),
+            longitude=np.concatenate([track.longitude for track in tracks]),
+            elevation=np.concatenate([track.elevation for track in tracks]),
+            time=np.concatenate([track.time for track in tracks]),
+            distance=np.concatenate([track.distance + offset for track, offset in zip(tracks, distance_offsets)]),
+            segment_starts=np.concatenate([track.segment_starts + offset for track, offset in zip(tracks, offsets)]),
+            utc=all(track.utc for track in tracks)
+        )
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    def __getitem__(self, index: slice) -> 'TrackArrays':
+        """
+        :param index: a slice of points, with a step of 1
+        :return: the points of the slice, distances starting at 0 and segments cut at the slice bounds
+        """
+        if not isinstance(index, slice):
+            raise TypeError(f"TrackArrays can only be sliced, not indexed with {type(index).__name__}.")
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            raise ValueError("TrackArrays slices must have a step of 1.")
+        stop = max(start, stop)
+
+        segment_starts = self.segment_starts[(self.segment_starts > start) & (self.segment_starts < stop)] - start
+        if stop > start:
+            segment_starts = np.concatenate(([0], segment_starts))
+        distance = self.distance[start:stop]
+        return TrackArrays(self.latitude[start:stop], self.longitude[start:stop], self.elevation[start:stop],
+                           self.time[start:stop], distance - distance[0] if len(distance) else distance,
+                           segment_starts, self.utc)
+
+    @property
+    def length_2d(self) -> float:
+        """
+        :return: the 2d length in meters, as gpxpy's length_2d
+        """
+        return float(self.distance[-1]) if len(self) else 0.
+
+    def bounds(self) -> GPXBounds | None:
+        """
+        :return: the bounds of the points, None when there are none
+        """
+        if not len(self):
+            return None
+        return GPXBounds(float(self.latitude.min()), float(self.latitude.max()),
+                         float(self.longitude.min()), float(self.longitude.max()))
+
+    def segments(self) -> list['TrackArrays']:
+        """
+        :return: every segment as its own track
+        """
+        bounds = np.append(self.segment_starts, len(self))
+        return [self[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def iter_points(self) -> Iterable[TrackPoint]:
+        """
+        :return: the points as track point tuples, e.g. to be written by gpx_stream, all in track 0
+        """
+        tz = timezone.utc if self.utc else None
+        times = [None if time is None else time.replace(tzinfo=tz) for time in self.time.astype(object)]
+        segments = np.zeros(len(self), dtype=np.int64)
+        segments[self.segment_starts[1:]] = 1
+        elevations = [None if np.isnan(elevation) else elevation for elevation in self.elevation.tolist()]
+        return map(TrackPoint, self.latitude.tolist(), self.longitude.tolist(), elevations, times,
+                   [0] * len(self), np.cumsum(segments).tolist())
+
+    def to_track(self, name: str | None = None) -> GPXTrack:
+        """
+        :param name: the name of the track
+        :return: a gpxpy track with one segment per segment
+        """
+        track = GPXTrack(name=name)
+        for _ in self.segment_starts:
+            track.segments.append(GPXTrackSegment())
+        for point in self.iter_points():
+            track.segments[point.segment].points.append(to_gpx_track_point(point))
+        return track
+
+    def to_gpx(self, name: str | None = None) -> GPX:
+        """
+        :param name: the name of the track
+        :return: a GPX object holding the track
+        """
+        gpx = GPX()
+        gpx.tracks.append(self.to_track(name))
+        return gpx
@@ -1,14 +1,35 @@
 import datetime
 
 import gpxpy
-from gpxpy.gpx import GPX, GPXTrackPoint
+from gpxpy.gpx import GPX, GPXRoute, GPXTrackPoint
+
+from gpx_tools.gpx_stream import iter_route_points, open_gpx, to_gpx_route_point, write_gpx
 
 
 def read_gpx(filename: str) -> GPX:
-    with open(filename, 'r') as f:
+    with open_gpx(filename, 'r') as f:
         return gpxpy.parse(f, version='1.1')
 
 
-def save_gpx(filename: str, gpx) -> None:
-    with open(filename, 'w') as f:
-        f.write(gpx.to_xml())
+def read_gpx_routes(filename: str) -> GPX:
+    """
+    Streams only the route points of a file, the track points are skipped without being built.
+    :param filename: the GPX file
+    :return: a GPX object holding the routes of the file and nothing else
+    """
+    gpx = GPX()
+    for point in iter_route_points(filename):
+        while len(gpx.routes) <= point.route:
+            gpx.routes.append(GPXRoute())
+        gpx.routes[point.route].points.append(to_gpx_route_point(point))
+    return gpx
+
+
+def save_gpx(filename: str, gpx, compress: bool | None = None) -> None:
+    """
+    Writes the same document as gpx.to_xml(), streamed in chunks.
+    :param filename: the output file
+    :param gpx: the GPX object
+    :param compress: gzip the output, by default when the filename ends with .gz
+    """
+    write_gpx(filename, gpx, compress=compress)
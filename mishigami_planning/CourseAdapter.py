@@ -0,0 +1,219 @@
+import math
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from Cycling.mishigami_planning.Split import Split
+from Cycling.mishigami_planning.Utils import compute_sub_distance_splits
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.Segment import Segment
+from Cycling.pace_calculator.SegmentDetail import SegmentDetail
+from Cycling.pace_calculator.SpeedChain import SpeedChain
+from Cycling.pace_calculator.Split import Split as CourseSplit
+from Cycling.pace_calculator.SplitDetail import SplitDetail
+from Cycling.pace_calculator.SubSplitMode import EvenSubSplitMode, FixedDistanceSubSplitMode
+
+
+class LegacySubSplits(Sequence):
+    __slots__ = ('total_distance', 'down_time_ratio', 'moving_speed', 'start_time', 'start_offset',
+                 'sub_split_distances', '__sub_splits')
+
+    def __init__(self,
+                 total_distance: float,
+                 down_time_ratio: float,
+                 moving_speed: float,
+                 start_time: datetime,
+                 start_offset: float,
+                 sub_split_distances: float):
+        """
+        Sequence of the legacy sub-split rows of a split, computed with compute_sub_distance_splits on first access.
+        """
+        self.total_distance = total_distance
+        self.down_time_ratio = down_time_ratio
+        self.moving_speed = moving_speed
+        self.start_time = start_time
+        self.start_offset = start_offset
+        self.sub_split_distances = sub_split_distances
+        self.__sub_splits: list[dict] | None = None
+
+    def __materialize(self) -> list[dict]:
+        if self.__sub_splits is None:
+            self.__sub_splits = compute_sub_distance_splits(
+                total_distance=self.total_distance,
+                down_time_ratio=self.down_time_ratio,
+                moving_speed=self.moving_speed,
+                start_time=self.start_time,
+                start_offset=self.start_offset,
+                sub_split_distances=self.sub_split_distances
+            )
+        return self.__sub_splits
+
+    def __getitem__(self, index):
+        return self.__materialize()[index]
+
+    def __len__(self):
+        return len(self.__materialize())
+
+    def __iter__(self):
+        return iter(self.__materialize())
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(self.__materialize())
+
+
+@dataclass
+class LegacySegment:
+    """
+    The splits of one SubDistancePaceCalculator run, with the settings they are computed with.
+    Converts them to a pace_calculator Segment, and its SegmentDetail back to the legacy dict rows.
+
+    Legacy semantics kept on top of the Course engine:
+    - a split moving speed override does not consume a decay step, so every split gets an explicit moving speed
+    - no_end_downtime only applies to the last split when it has no down_time override
+    - the rest stop is reached (adjustment_start) once the split moving time is over
+    """
+    splits: list[Split]
+    start_moving_speed: float
+    min_moving_speed: float
+    downtime_ratio: float = 0
+    decay_per_split: float = 0
+    start_offset: float = 0
+    no_end_downtime: bool = False
+    sub_split_distances: float = 20
+    sleep_time: timedelta = timedelta(hours=0)  # time after the segment, before the next one starts
+
+    def moving_speeds(self) -> list[float]:
+        """
+        :return: the moving speed of every split, overrides included
+        """
+        # an overridden split keeps its own speed and does not consume a decay step
+        return SpeedChain.compute(
+            init_moving_speed=self.start_moving_speed,
+            split_decay=self.decay_per_split,
+            overrides=np.array([math.nan if split.moving_speed is None else split.moving_speed
+                                for split in self.splits], dtype=float),
+            min_moving_speeds=np.full(len(self.splits), self.min_moving_speed, dtype=float),
+            overrides_reset=False
+        ).tolist()
+
+    def to_segment(self) -> Segment:
+        """
+        :return: a pace_calculator Segment reproducing the legacy split times
+        """
+        splits = []
+        for i, (split, moving_speed) in enumerate(zip(self.splits, self.moving_speeds()), start=1):
+            down_time = split.down_time
+            if down_time is None and self.no_end_downtime and i == len(self.splits):
+                down_time = timedelta(hours=0)
+
+            splits.append(CourseSplit(
+                distance=split.distance,
+                sub_split_mode=EvenSubSplitMode(split.sub_split_count) if split.sub_split_count
+                else FixedDistanceSubSplitMode(self.sub_split_distances),
+                down_time=down_time,
+                moving_speed=moving_speed,
+                adjusted_time=split.adjustment_time or timedelta(hours=0)
+            ))
+
+        return Segment(
+            splits=splits,
+            down_time_ratio=self.downtime_ratio,
+            sleep_time=self.sleep_time,
+            no_end_down_time=False
+        )
+
+    def split_rows(self, segment_detail: SegmentDetail) -> list[dict]:
+        """
+        :param segment_detail: the computed detail of the segment returned by to_segment
+        :return: the legacy split rows, sub-split rows are computed when accessed
+        """
+        return list(self.iter_split_rows(segment_detail.split_details))
+
+    def iter_split_rows(self, split_details: Iterable[SplitDetail]) -> Iterator[dict]:
+        """
+        :param split_details: the split details of the segment returned by to_segment, e.g. as they are streamed
+        :return: iterator of the legacy split rows, sub-split rows are computed when accessed
+        """
+        _start_offset = self.start_offset
+        for i, (split, split_detail) in enumerate(zip(self.splits, split_details), start=1):
+            _down_time_ratio = self.downtime_ratio
+            if self.no_end_downtime and i == len(self.splits):
+                _down_time_ratio = 0
+
+            sub_split_distances = self.sub_split_distances
+            if split.sub_split_count:
+                sub_split_distances = split.distance / split.sub_split_count
+
+            yield {
+                "distance": split.distance,
+                "sub_splits": LegacySubSplits(
+                    total_distance=split.sub_split_distance or split.distance,  # not sure why we or this
+                    down_time_ratio=_down_time_ratio,
+                    moving_speed=split_detail.moving_speed,
+                    start_time=split_detail.start_time,
+                    start_offset=_start_offset,
+                    sub_split_distances=sub_split_distances),
+                "span": f"{_start_offset:>7.2f}, {(_start_offset := _start_offset + split.distance):>7.2f}",
+                "moving_speed": split_detail.moving_speed,
+                "adjustment_time": split_detail.adjustment_time,
+                "moving_time": split_detail.moving_time,
+                "split_time": split_detail.split_time,
+                "split_speed": split.distance / (split_detail.split_time.total_seconds() / 3600),
+                "down_time": split_detail.down_time,
+                "total_time": split_detail.total_time,
+                "pace": split_detail.pace,
+                "start_time": split_detail.start_time,
+                "adjustment_start": split_detail.start_time + split_detail.moving_time,
+                "stop": split.rest_stop,
+                "end_time": split_detail.end_time,
+            }
+
+    def summary(self, segment_detail: SegmentDetail) -> dict[str: any]:
+        """
+        :param segment_detail: the computed detail of the segment returned by to_segment
+        :return: the legacy summary row, as SubDistancePaceCalculator.get_split_breakdown returns it
+        """
+        total_distance = sum(split.distance for split in self.splits)
+        total_split_time = segment_detail.total_moving_time + segment_detail.total_down_time
+
+        return {
+            "distance": total_distance,
+            "span": f"{self.start_offset:>7.2f}, {self.start_offset + total_distance:>7.2f}",
+            "moving_speed": total_distance / (segment_detail.total_moving_time.total_seconds() / 3600),
+            "moving_time": segment_detail.total_moving_time,
+            "down_time": segment_detail.total_down_time,
+            "split_time": total_split_time,
+            "split_speed": total_distance / (total_split_time.total_seconds() / 3600),
+            "adjustment_time": segment_detail.total_adjustment_time,
+            "total_time": segment_detail.total_elapsed_time,
+            "pace": total_distance / (segment_detail.total_elapsed_time.total_seconds() / 3600),
+            "start_time": segment_detail.start_time,
+            "adjustment_start": None,
+            "end_time": segment_detail.end_time
+        }
+
+
+def to_course(segments: list[LegacySegment], start_time: datetime) -> Course:
+    """
+    :param segments: the legacy segments, in order
+    :param start_time: when the first segment starts
+    :return: a pace_calculator Course computing every segment in one pass
+    """
+    # every split carries an explicit moving speed, the course-level chain settings are informative only
+    first = segments[0] if segments else None
+    return Course(
+        segments=[segment.to_segment() for segment in segments],
+        KOMs=[],
+        init_moving_speed=first.start_moving_speed if first else 0,
+        min_moving_speed=first.min_moving_speed if first else 0,
+        down_time_ratio=first.downtime_ratio if first else 0,
+        split_decay=first.decay_per_split if first else 0,
+        start_time=start_time
+    )
@@ -1,8 +1,8 @@
 from datetime import datetime, timedelta
+from .CourseAdapter import LegacySegment, to_course
 from .PaceCalculatorPrinter import PaceCalculatorPrinter
 from .RestStop import RestStop
 from .Split import Split
-from .SubDistancePaceCalculator import SubDistancePaceCalculator
 from .Utils import hours_to_pretty as hrs_prty
 
 (MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY) = range(7)
@@ -29,27 +29,39 @@ def print_granular_breakdown(splits: list[list[Split]],
 
     total_distance = sum((sum(segment.distance for segment in split) for split in splits) if splits else 0)
 
-    pace_calculator = SubDistancePaceCalculator()
-    pace_calculator_printer = PaceCalculatorPrinter(pace_calculator,
-                                                    keys_to_exclude={'split_speed'},
-                                                    keys_to_rename={'adjustment_start': 'Rest Stop Arrival'})
-
+    # segments are chained up front: each starts at the decayed moving speed of the previous segment's last split
+    legacy_segments: list[LegacySegment] = []
     for i, split in enumerate(splits):
-        pace_calculator.set_split_info(
+        _split_adjustment_time = timedelta()
+        if i + 1 < len(splits) and i < len(split_adjustment_times):
+            _split_adjustment_time = split_adjustment_times[i]
+
+        legacy_segment = LegacySegment(
             splits=split,
-            downtime_ratio=downtime_ratio,
-            start_time=_start_time,
             start_moving_speed=curr_speed,
-            decay_per_split=0,
             min_moving_speed=min_moving_speed,
-            no_end_downtime=last_split_zero_downtime,
+            downtime_ratio=downtime_ratio,
+            decay_per_split=0,
             start_offset=start_mile,
+            no_end_downtime=last_split_zero_downtime,
             sub_split_distances=sub_split_distances[i],
+            sleep_time=_split_adjustment_time,
         )
+        legacy_segments.append(legacy_segment)
+
+        curr_speed = max(legacy_segment.moving_speeds()[-1] - decay_per_split, min_moving_speed)
+        start_mile += sum(segment.distance for segment in split)
 
-        segments, res = pace_calculator.get_split_breakdown()
+    # the whole plan is computed in one pass of the pace_calculator Course engine
+    course_details = to_course(legacy_segments, start_time).compute_course_details()
+    pace_calculator_printer = PaceCalculatorPrinter(keys_to_exclude={'split_speed'},
+                                                    keys_to_rename={'adjustment_start': 'Rest Stop Arrival'})
 
-        pace_calculator_printer.print(with_sub_splits=with_sub_splits)
+    for i, (legacy_segment, segment_detail) in enumerate(zip(legacy_segments, course_details.segment_details)):
+        res = legacy_segment.summary(segment_detail)
+
+        pace_calculator_printer.print_breakdown(legacy_segment.split_rows(segment_detail), res,
+                                                with_sub_splits=with_sub_splits)
         elapsed_time += res['total_time']
         down_time += res['down_time']
         moving_time += res['moving_time']
@@ -57,19 +69,16 @@ def print_granular_breakdown(splits: list[list[Split]],
 
         _start_time = res["end_time"]
         if i + 1 < len(splits):
-            _split_adjustment_time = split_adjustment_times[i] if i < len(split_adjustment_times) else timedelta()
+            _split_adjustment_time = legacy_segment.sleep_time
 
             print(f"{'Sleep Time':14}: {hrs_prty(_split_adjustment_time).strip():14} "
                   f"[{_split_adjustment_time.total_seconds() / 3600:7.3f} hours]", end='\n\n')
 
-            # shift next split's start time if split adjustment time is supplied
+            # the next segment starts after the split adjustment time, see LegacySegment.sleep_time
             _start_time += _split_adjustment_time
             elapsed_time += _split_adjustment_time
             split_adjustment_time += _split_adjustment_time
 
-        curr_speed = max(segments[-1]['moving_speed'] - decay_per_split, min_moving_speed)
-        start_mile += sum(segment.distance for segment in split)
-
     print()
     print(f"Summary")
     print(f"{'Total Distance':14}: {total_distance:>8.3f}")
@@ -1,8 +1,9 @@
 from datetime import datetime, timedelta
 
-from Split import Split, RestStop
-from SubDistancePaceCalculator import SubDistancePaceCalculator
-from Utils import format_field, hours_to_pretty as hrs_prty
+from Cycling.mishigami_planning.Split import Split, RestStop
+from Cycling.mishigami_planning.SubDistancePaceCalculator import SubDistancePaceCalculator
+from Cycling.mishigami_planning.Utils import format_field, hours_to_pretty as hrs_prty, \
+    hours_to_pretty_batch as hrs_prty_batch
 
 import logging
 
@@ -34,6 +35,7 @@ class PaceCalculatorPrinter:
             "header_formatting": ">19s",
             "value_formatting": '19s',
             "transformer": hrs_prty,
+            "batch_transformer": hrs_prty_batch,
             "width": 19
         },
         'down_time': {
@@ -41,6 +43,7 @@ class PaceCalculatorPrinter:
             "header_formatting": ">19s",
             "value_formatting": '19s',
             "transformer": hrs_prty,
+            "batch_transformer": hrs_prty_batch,
             "width": 19
         },
         'split_speed': {
@@ -66,6 +69,7 @@ class PaceCalculatorPrinter:
             "header_formatting": ">19s",
             "value_formatting": '19s',
             "transformer": hrs_prty,
+            "batch_transformer": hrs_prty_batch,
             "width": 19
         },
         'adjustment_time': {
@@ -73,6 +77,7 @@ class PaceCalculatorPrinter:
             "header_formatting": ">19s",
             "value_formatting": '19s',
             "transformer": hrs_prty,
+            "batch_transformer": hrs_prty_batch,
             "width": 19
         },
         'adjustment_start': {
@@ -86,6 +91,7 @@ class PaceCalculatorPrinter:
             "header_formatting": ">19s",
             "value_formatting": '19s',
             "transformer": hrs_prty,
+            "batch_transformer": hrs_prty_batch,
             "width": 19
         },
         'end_time': {
@@ -124,12 +130,12 @@ class PaceCalculatorPrinter:
     SPACER = ' │ '
 
     def __init__(self,
-                 pace_calculator: SubDistancePaceCalculator | SubDistancePaceCalculator,
+                 pace_calculator: SubDistancePaceCalculator | None = None,
                  keys_to_exclude: set[str] = None,
                  keys_to_rename: dict[str: str] = None):
         """
 
-        :param pace_calculator:
+        :param pace_calculator: the calculator printed by print, not needed by print_breakdown
         :param keys_to_exclude: fields by key to remove from printing
         :param keys_to_rename: a dictionary containing fields by key to rename
         """
@@ -139,6 +145,16 @@ class PaceCalculatorPrinter:
 
     def print(self, with_sub_splits: bool = False):
         splits, summary = self.pace_calculator.get_split_breakdown()
+        self.print_breakdown(splits, summary, with_sub_splits=with_sub_splits)
+
+    def print_breakdown(self, splits: list[dict], summary: dict[str: any], with_sub_splits: bool = False):
+        """
+        Prints already computed split rows and their summary, as returned by get_split_breakdown.
+
+        :param splits: the split rows
+        :param summary: the summary row
+        :param with_sub_splits: if True, the sub-split rows of every split are printed above it
+        """
         include_stops = any(split_detail.get('stop', None) is not None for split_detail in splits)
         field_keys_showing = self.__exposed_fields(include_stops)
 
@@ -147,13 +163,20 @@ class PaceCalculatorPrinter:
         self.__print_header(field_keys_showing)
         print('─' * dash_count)
 
+        rows = []
+        for split_detail_line in splits:
+            if 'sub_splits' in split_detail_line and with_sub_splits:
+                rows.extend(split_detail_line['sub_splits'])
+            rows.append(split_detail_line)
+        transformed_rows = iter(self.__transform_columns(rows, field_keys_showing))
+
         for split_detail_line in splits:
             show_sub_splits = 'sub_splits' in split_detail_line and with_sub_splits
             if show_sub_splits:
-                for sub_split in split_detail_line['sub_splits']:
-                    self.__print_detail(sub_split, field_keys_showing, is_sub_split=True)
+                for _ in split_detail_line['sub_splits']:
+                    self.__print_detail(next(transformed_rows), field_keys_showing, is_sub_split=True)
             print(('▄' if show_sub_splits else '¨') * dash_count)
-            self.__print_detail(split_detail_line,
+            self.__print_detail(next(transformed_rows),
                                 field_keys_showing)
             print(('▀' if show_sub_splits else '¨') * dash_count)
 
@@ -208,20 +231,37 @@ class PaceCalculatorPrinter:
             for _k, _v in self.LOCATION_HEADERS.items() if _k in field_keys_showing]
         print(self.SPACER.join(res + res_2))
 
+    def __transform_columns(self, rows: list[dict[str, any]], field_keys_showing: set[str]) -> list[dict[str, any]]:
+        """
+        Transforms the shown columns of the rows, each column in one batch.
+
+        :param rows: the split and sub-split rows, in print order
+        :param field_keys_showing: the fields printed
+        :return: copies of the rows with their transformed values
+        """
+        rows = [dict(row) for row in rows]
+        for key, props in self.FIELD_PROPS.items():
+            if key not in field_keys_showing or 'batch_transformer' not in props:
+                continue
+            rows_with_key = [row for row in rows if key in row]
+            for row, value in zip(rows_with_key, props['batch_transformer']([row[key] for row in rows_with_key])):
+                row[key] = value
+
+        return rows
+
     def __print_detail(self,
                        split: dict[str, any],
                        field_keys_showing: set[str],
                        is_sub_split: bool = False):
+        """
+        :param split: a row whose columns are already transformed, see __transform_columns
+        """
         res = []
         for key in self.FIELD_PROPS:
             if key not in split:
                 logging.error(f"The key: '{key}' does not exist in split detail.")
             if key in field_keys_showing and key in split:
-                _v = split[key]
-                if 'transformer' in self.FIELD_PROPS[key]:
-                    _v = self.FIELD_PROPS[key]['transformer'](split[key])
-
-                res.append(format_field(val=_v, formatting=self.FIELD_PROPS[key]['value_formatting']))
+                res.append(format_field(val=split[key], formatting=self.FIELD_PROPS[key]['value_formatting']))
 
         for key in self.LOCATION_HEADERS:
             if key in field_keys_showing:
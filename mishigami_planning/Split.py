@@ -1,6 +1,7 @@
 import datetime
 from dataclasses import dataclass
 from datetime import timedelta, datetime
+from typing import Any, Optional
 
 from Cycling.mishigami_planning.RestStop import RestStop
 
@@ -1,8 +1,9 @@
-from datetime import datetime, timedelta
+from collections.abc import Iterator
+from datetime import datetime
 
 # NOTE: Python dictionaries preserve order as of 3.7
-from Split import Split
-from Utils import compute_sub_distance_splits
+from Cycling.mishigami_planning.CourseAdapter import LegacySegment, to_course
+from Cycling.mishigami_planning.Split import Split
 
 
 class SubDistancePaceCalculator:
@@ -25,7 +26,7 @@ class SubDistancePaceCalculator:
                        min_moving_speed: float,
                        splits: list[Split],
                        downtime_ratio: float = 0,
-                       stops: list[],
+                       stops: list | None = None,
                        decay_per_split: float = 0,
                        start_time: datetime | None = None,
                        start_offset: float = 0,
@@ -55,120 +56,38 @@ class SubDistancePaceCalculator:
         self.no_end_downtime = no_end_downtime
         self.sub_split_distances = sub_split_distances
 
-    def __compute_split_details(self):
-        times = self.__compute_time()
-        start_time = self.start_time or datetime.today()
-
-        res = []
-        _start_offset = self.start_offset
-        for i, (segment, (moving_time, moving_speed)) in enumerate(zip(self.segments, times), start=1):
-            _down_time_ratio = self.downtime_ratio
-            if self.no_end_downtime:
-                _down_time_ratio = self.downtime_ratio if i < len(self.segments) else 0
-
-            _split_time = moving_time * (1 + _down_time_ratio)
-            if segment.down_time is not None:
-                _split_time = moving_time + segment.down_time
-
-            _adjustment_time = timedelta(hours=0)
-            if segment.adjustment_time is not None:
-                _adjustment_time = segment.adjustment_time
-
-            _moving_speed = moving_speed
-            if segment.moving_speed is not None:
-                _moving_speed = segment.moving_speed
-
-            sub_split_distances = self.sub_split_distances
-
-            if segment.sub_split_count:
-                sub_split_distances = segment.distance / segment.sub_split_count
-
-            _res = {
-                "distance": segment.distance,
-                "sub_splits": compute_sub_distance_splits(
-                    total_distance=segment.sub_split_distance or segment.distance,  # not sure why we or this
-                    down_time_ratio=_down_time_ratio,
-                    moving_speed=_moving_speed,
-                    start_time=start_time,
-                    start_offset=_start_offset,
-                    sub_split_distances=sub_split_distances),
-                "span": f"{_start_offset:>7.2f}, {(_start_offset := _start_offset + segment.distance):>7.2f}",
-                "moving_speed": _moving_speed,
-                "adjustment_time": _adjustment_time,
-                "moving_time": moving_time,
-                "split_time": _split_time,
-                "split_speed": segment.distance / (_split_time.total_seconds() / 3600),
-                "down_time":  moving_time * _down_time_ratio if segment.down_time is None else segment.down_time,
-                "total_time": _split_time + _adjustment_time,
-                "pace": segment.distance / ((_split_time + _adjustment_time).total_seconds() / 3600),
-                "start_time": start_time,
-                "adjustment_start": start_time + moving_time,
-                "stop": segment.rest_stop,
-                "end_time": (start_time := start_time + _split_time + _adjustment_time),
-            }
-            res.append(_res)
-
-        return res
-
-    def __compute_time(self):
+    def to_legacy_segment(self) -> LegacySegment:
         """
-        Returns the split time given the moving speed and decay in decimal hours.
-        :return: list of time in decimal hour per split
+        :return: the splits and settings of the calculator, as a LegacySegment
         """
-        split_times: list[tuple[timedelta, float]] = []
+        return LegacySegment(
+            splits=self.segments,
+            start_moving_speed=self.start_moving_speed,
+            min_moving_speed=self.min_moving_speed,
+            downtime_ratio=self.downtime_ratio,
+            decay_per_split=self.decay_per_split,
+            start_offset=self.start_offset,
+            no_end_downtime=self.no_end_downtime,
+            sub_split_distances=self.sub_split_distances
+        )
 
-        curr_speed = self.start_moving_speed
-        for i, segment in enumerate(self.segments, start=1):
-            if segment.moving_speed is None:
-                split_times.append((timedelta(hours=segment.distance / curr_speed), curr_speed))
-                curr_speed = max(curr_speed - self.decay_per_split, self.min_moving_speed)
-            else:
-                split_times.append((timedelta(hours=segment.distance / segment.moving_speed), segment.moving_speed))
+    def get_split_breakdown(self):
+        # splits are computed by the pace_calculator Course engine, then converted back to the legacy rows
+        legacy_segment = self.to_legacy_segment()
+        course_details = to_course([legacy_segment], self.start_time or datetime.today()).compute_course_details()
+        segment_detail = course_details.segment_details[0]
 
-        return split_times
+        return legacy_segment.split_rows(segment_detail), legacy_segment.summary(segment_detail)
 
-    def get_split_breakdown(self):
-        split_details = self.__compute_split_details()
-        summary = self.compute_summary(split_details)
-
-        return split_details, summary
-
-    def compute_summary(self, split_details) -> dict[str: any]:
-        total_distance: float = 0
-        total_moving_time: timedelta = timedelta(hours=0)
-        total_down_time: timedelta = timedelta(hours=0)
-        total_split_time: timedelta = timedelta(hours=0)
-        total_adjustment_time: timedelta = timedelta(hours=0)
-        total_time: timedelta = timedelta(hours=0)
-        total_pace: float = 0
-        start_time: datetime = self.start_time or datetime.today()
-        end_time: datetime = start_time
-
-        for i, split in enumerate(split_details):
-            total_distance += split['distance']
-            total_down_time += split['down_time']
-            total_moving_time += split['moving_time']
-            total_split_time += split['split_time']
-            total_adjustment_time += split['adjustment_time']
-            total_time += split['total_time']
-            total_pace += split['pace']
-            end_time += split['total_time']
-
-        return {
-            "distance": total_distance,
-            "span": f"{self.start_offset:>7.2f}, {self.start_offset + total_distance:>7.2f}",
-            "moving_speed": total_distance / (total_moving_time.total_seconds() / 3600),
-            "moving_time": total_moving_time,
-            "down_time": total_down_time,
-            "split_time": total_split_time,
-            "split_speed": total_distance / (total_split_time.total_seconds() / 3600),
-            "adjustment_time": total_adjustment_time,
-            "total_time": total_time,
-            "pace": total_distance / (total_time.total_seconds() / 3600),
-            "start_time": start_time,
-            "adjustment_start": None,
-            "end_time": end_time
-        }
+    def iter_split_breakdown(self) -> Iterator[dict]:
+        """
+        Streams the split rows of get_split_breakdown, each as soon as the Course engine computes its split.
+
+        :return: iterator of the legacy split rows
+        """
+        legacy_segment = self.to_legacy_segment()
+        course = to_course([legacy_segment], self.start_time or datetime.today())
+        return legacy_segment.iter_split_rows(progress.split_detail for progress in course.iter_split_details())
 
 
 def main():
@@ -1,6 +1,8 @@
-import math
 from datetime import timedelta, datetime
 
+# the duration formatter is shared with the pace calculator printers
+from Cycling.pace_calculator.Utils import hours_to_pretty, hours_to_pretty_batch  # noqa: F401
+
 
 def should_show_field(field_key: str, keys_to_exclude: set[str]):
     return field_key not in keys_to_exclude
@@ -48,33 +50,6 @@ def compute_distances(distance: float, split_count: int) -> list[float]:
     return split_distance
 
 
-def hours_to_pretty(hours_timedelta: timedelta | float):
-    """
-    Converts decimal hours to days, hours, minutes, and seconds.
-    Leading zeroes can be omitted and last precision can be reduced to minutes.
-    The last precision is rounded.
-
-    :param hours_timedelta: the amount to convert
-    :return: string representing the day, hour, minute, and second of the decimal hours
-    """
-
-    if type(hours_timedelta) == timedelta:
-        is_neg = hours_timedelta.total_seconds() < 0
-        decimal_hours = hours_timedelta.total_seconds() / 3600
-    else:
-        is_neg = hours_timedelta < 0
-        decimal_hours = hours_timedelta
-
-    if is_neg:
-        decimal_hours *= -1
-    days = decimal_hours // 24
-    hours = decimal_hours % 24
-    minutes = (decimal_hours - int(decimal_hours)) * 60
-    seconds = (minutes - int(minutes)) * 60
-
-    return f"{'-' if is_neg else ' '}{math.floor(days):2d}d {math.floor(hours):2d}h {math.floor(minutes):2d}m {seconds:5.2f}s"
-
-
 def days_hours_minutes(td: timedelta):
     return f"{td.days}, {td.seconds // 3600}, {(td.seconds // 60) % 60}"
 
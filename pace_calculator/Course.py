@@ -1,15 +1,25 @@
+import math
+from collections.abc import Iterator
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from itertools import islice
+
+import numpy as np
 
 from Cycling.pace_calculator.CourseDetail import CourseDetail
+from Cycling.pace_calculator.CourseProgress import CourseProgress
 from Cycling.pace_calculator.SegmentDetail import SegmentDetail
 from Cycling.pace_calculator.DetailLines import KOMDetailLine, KOMOptionalDetailLine
 from Cycling.pace_calculator.Segment import Segment
+from Cycling.pace_calculator.SpeedChain import SpeedChain
 from Cycling.pace_calculator.Split import Split
 from Cycling.pace_calculator.SplitDetail import SplitDetail
-from Cycling.pace_calculator.SubSplitCalculator import SubSplitCalculatorV1
+from Cycling.pace_calculator.SubSplitCalculator import LazySubSplits
 from Cycling.pace_calculator.SubSplitMode import EvenSubSplitMode, FixedDistanceSubSplitMode
 
+# bump whenever a change to the computations below changes their results, it invalidates cached results
+ENGINE_VERSION = 1
+
 
 @dataclass
 class Course:
@@ -21,124 +31,263 @@ class Course:
     split_decay: float = 0
     start_time: datetime | None = datetime.today()
 
-    def compute_course_details(self) -> CourseDetail:
+    def compute_course_details(self, segment_details: list[SegmentDetail] | None = None) -> CourseDetail:
         """
         Computes the detailed breakdown of the course based on segments and splits.
 
+        :param segment_details: details of the first segments computed earlier (e.g. cached),
+                                only the segments after them are computed
         :return: A CourseDetail object containing detailed information about the course.
         """
+        segment_details = list(segment_details or [])
+        first_segment = len(segment_details)
         curr_start_time: datetime = self.start_time
-        curr_moving_speed: float = self.init_moving_speed
+        if first_segment:
+            curr_start_time = segment_details[-1].end_time + self.segments[first_segment - 1].sleep_time
+
+        split_details: list[list[SplitDetail]] = [[] for _ in self.segments[first_segment:]]
+        for s, _, split_detail in self.__iter_split_details(first_segment, curr_start_time):
+            split_details[s - first_segment].append(split_detail)
+
+        for segment, segment_split_details in zip(self.segments[first_segment:], split_details):
+            segment_details.append(self.compute_segment_detail(segment, segment_split_details, curr_start_time))
+
+            # account for sleep time between segments
+            curr_start_time = segment_details[-1].end_time + segment.sleep_time
+
+        return self.compute_totals(segment_details, curr_start_time)
+
+    def iter_split_details(self) -> Iterator[CourseProgress]:
+        """
+        Streams the split details of the course, each as soon as it is computed, with the running course totals.
+        Nothing is kept from one split to the next, so long courses are streamed in constant memory.
+
+        :return: iterator of CourseProgress, in course order
+        """
+        total_distance: float = 0
+        total_moving_time = total_down_time = total_adjustment_time = total_sleep_time = timedelta(hours=0)
+        curr_segment = 0
+
+        for s, i, split_detail in self.__iter_split_details():
+            # account for sleep time of the segments before this one, empty segments included
+            for segment in self.segments[curr_segment:s]:
+                total_sleep_time += segment.sleep_time
+            curr_segment = s
+
+            total_distance += split_detail.distance
+            # as in compute_totals, the elapsed time of the splits, down and adjustment time included
+            total_moving_time += split_detail.total_time
+            total_down_time += split_detail.down_time
+            total_adjustment_time += split_detail.adjustment_time
+
+            yield CourseProgress(
+                segment_index=s,
+                split_index=i,
+                split_detail=split_detail,
+                is_segment_end=i == len(self.segments[s].splits) - 1,
+                total_distance=total_distance,
+                total_elapsed_time=split_detail.end_time - self.start_time,
+                total_moving_time=total_moving_time,
+                total_down_time=total_down_time,
+                total_adjustment_time=total_adjustment_time,
+                total_sleep_time=total_sleep_time
+            )
+
+    def __iter_split_details(self,
+                             first_segment: int = 0,
+                             start_time: datetime | None = None) -> Iterator[tuple[int, int, SplitDetail]]:
+        curr_start_time: datetime = self.start_time if start_time is None else start_time
         curr_distance: float = 0
-        segment_details: list[SegmentDetail] = []
+        skipped_splits = 0
+        # the distance and the decay chain carry over from the segments before first_segment
+        for segment in self.segments[:first_segment]:
+            for split in segment.splits:
+                curr_distance += split.distance
+            skipped_splits += len(segment.splits)
+        moving_speeds = islice(self.iter_moving_speeds(), skipped_splits, None)
 
-        # totals
-        total_moving_time: timedelta = timedelta(hours=0)
-        total_down_time: timedelta = timedelta(hours=0)
-        total_adjustment_time: timedelta = timedelta(hours=0)
-        total_sleep_time: timedelta = timedelta(hours=0)
+        for s, segment in enumerate(self.segments[first_segment:], start=first_segment):
+            for i, split in enumerate(segment.splits):
+                split_detail = self.compute_split_detail(segment, i, curr_start_time, next(moving_speeds),
+                                                         curr_distance)
 
+                # NOTE: The operations below are for post-split calculation updates.
+                # Shifting start time, etc.
+                curr_distance += split.distance
+                curr_start_time = split_detail.end_time
+
+                yield s, i, split_detail
+
+            # account for sleep time between segments
+            curr_start_time += segment.sleep_time
+
+    def iter_moving_speeds(self) -> Iterator[float]:
+        """
+        Streams the moving speed of every split, segments flattened; the same values as compute_moving_speeds.
+
+        :return: iterator of moving speeds, overrides included
+        """
+        return SpeedChain.stream(self.init_moving_speed, self.split_decay, self.__speed_constraints())
+
+    def __speed_constraints(self) -> Iterator[tuple[float | None, float]]:
         for segment in self.segments:
-            # check if segment has moving speed defined, as it overrides the decayed/computed moving speed
-            # this can account/simulate for 'recovered'/'fatigued' legs
-            if segment.moving_speed is not None:
-                curr_moving_speed = segment.moving_speed
+            # override with segment min_moving_speed if defined
+            min_moving_speed = self.min_moving_speed if segment.min_moving_speed is None \
+                else segment.min_moving_speed
 
-            split_details: list[SplitDetail] = []
-            segment_start: datetime = curr_start_time
             for i, split in enumerate(segment.splits):
-                # check if split has moving speed defined,
-                # as it overrides the decayed/computed moving speed AND segment moving speed
-                if split.moving_speed is not None:
-                    curr_moving_speed = split.moving_speed
-
-                moving_time = timedelta(hours=split.distance / curr_moving_speed)
-
-                down_time: timedelta = moving_time * self.down_time_ratio
-                # if a segment has defined down_time, it overrides the course-computed down_time
-                if segment.down_time_ratio is not None:
-                    down_time: timedelta = moving_time * segment.down_time_ratio
-                # if a split has defined down_time, it overrides the course and segment-computed down_time
-                if split.down_time is not None:
-                    down_time = split.down_time
-                # check if this is the last split of the segment and no_end_downtime is set
-                if i == len(segment.splits) - 1 and segment.no_end_down_time:
-                    down_time = timedelta(hours=0)
-
-                split_time = moving_time + down_time
-                total_time = split_time + split.adjusted_time
-                sub_split_details = SubSplitCalculatorV1.get_sub_split_details(
-                    split=split,
-                    start_distance=curr_distance,
-                    start_time=curr_start_time,
-                    down_time=down_time,
-                    moving_speed=curr_moving_speed
-                )
-
-                split_detail = SplitDetail(
-                    distance=split.distance,
-                    start_time=curr_start_time,
-                    end_time=curr_start_time + total_time,
-                    adjustment_start=curr_start_time + split_time,
-                    moving_speed=curr_moving_speed,
-                    moving_time=moving_time,
-                    down_time=down_time,
-                    adjustment_time=split.adjusted_time,
-                    split_time=split_time,
-                    total_time=total_time,
-                    pace=split.distance / (total_time.total_seconds() / 3600),
-                    start_distance=curr_distance,
-                    rest_stop=split.rest_stop,
-                    sub_splits=sub_split_details
-                )
+                # a split moving speed overrides the decayed/computed moving speed AND segment moving speed,
+                # a segment moving speed overrides it on the first split of the segment;
+                # this can account/simulate for 'recovered'/'fatigued' legs
+                override = split.moving_speed
+                if override is None and i == 0:
+                    override = segment.moving_speed
+                yield override, min_moving_speed
 
-                # NOTE: The operations below are for post-split calculation updates.
-                # Shifting start time, updating subsequent moving speed, etc.
+    def compute_moving_speeds(self) -> list[float]:
+        """
+        Computes the moving speed of every split, segments flattened, in one pass over the decay chain.
 
-                # decay split moving speed for next split, limit to min_moving_speed
-                next_decayed_moving_speed = curr_moving_speed - self.split_decay
+        :return: the moving speed of every split, overrides included
+        """
+        constraints = list(self.__speed_constraints())
+        return SpeedChain.compute(self.init_moving_speed,
+                                  self.split_decay,
+                                  np.array([math.nan if x is None else x for x, _ in constraints], dtype=float),
+                                  np.array([x for _, x in constraints], dtype=float)).tolist()
 
-                min_moving_speed = self.min_moving_speed
-                # override with segment min_moving_speed if defined
-                # this can account/simulate for stronger/weaker/non-uniform efforts (climb, descent, etc)
-                if segment.min_moving_speed is not None:
-                    min_moving_speed = segment.min_moving_speed
+    def compute_split_detail(self,
+                             segment: Segment,
+                             index: int,
+                             start_time: datetime,
+                             moving_speed: float,
+                             start_distance: float) -> SplitDetail:
+        """
+        Computes the detail of a single split.
 
-                curr_moving_speed = max(next_decayed_moving_speed, min_moving_speed)
-                curr_distance += split.distance
-                curr_start_time += total_time
-
-                split_details.append(split_detail)
-
-            total_segment_elapsed_time = curr_start_time - segment_start
-            total_segment_moving_time = sum((x.moving_time for x in split_details), timedelta(0))
-            total_segment_down_time = sum((x.down_time for x in split_details), timedelta(0))
-            total_segment_adjustment_time = sum((x.adjustment_time for x in split_details), timedelta(0))
-
-            segment_details.append(SegmentDetail(
-                split_details=split_details,
-                start_time=segment_start,
-                end_time=curr_start_time,
-                total_elapsed_time=total_segment_elapsed_time,
-                total_down_time=total_segment_down_time,
-                total_moving_time=total_segment_moving_time,
-                total_adjustment_time=total_segment_adjustment_time,
-                total_sleep_time=segment.sleep_time,
-            ))
+        :param segment: the segment containing the split
+        :param index: the index of the split within the segment
+        :param start_time: when the split starts
+        :param moving_speed: the moving speed carried over from the previous split
+        :param start_distance: the distance marker where the split starts
+        :return: a SplitDetail object
+        """
+        split = segment.splits[index]
 
-            # account for sleep time between segments
-            total_moving_time += total_segment_elapsed_time
-            total_down_time += total_segment_down_time
-            total_adjustment_time += total_segment_adjustment_time
-            total_sleep_time += segment.sleep_time
+        # check if split has moving speed defined,
+        # as it overrides the decayed/computed moving speed AND segment moving speed
+        if split.moving_speed is not None:
+            moving_speed = split.moving_speed
 
-            curr_start_time += segment.sleep_time
+        moving_time = timedelta(hours=split.distance / moving_speed)
+
+        down_time: timedelta = moving_time * self.down_time_ratio
+        # if a segment has defined down_time, it overrides the course-computed down_time
+        if segment.down_time_ratio is not None:
+            down_time: timedelta = moving_time * segment.down_time_ratio
+        # if a split has defined down_time, it overrides the course and segment-computed down_time
+        if split.down_time is not None:
+            down_time = split.down_time
+        # check if this is the last split of the segment and no_end_downtime is set
+        if index == len(segment.splits) - 1 and segment.no_end_down_time:
+            down_time = timedelta(hours=0)
+
+        split_time = moving_time + down_time
+        total_time = split_time + split.adjusted_time
+        # sub-splits are only computed when accessed, e.g. when printing with sub-splits
+        sub_split_details = LazySubSplits(
+            split=split,
+            start_distance=start_distance,
+            start_time=start_time,
+            down_time=down_time,
+            moving_speed=moving_speed
+        )
+
+        return SplitDetail(
+            distance=split.distance,
+            start_time=start_time,
+            end_time=start_time + total_time,
+            adjustment_start=start_time + split_time,
+            moving_speed=moving_speed,
+            moving_time=moving_time,
+            down_time=down_time,
+            adjustment_time=split.adjusted_time,
+            split_time=split_time,
+            total_time=total_time,
+            pace=split.distance / (total_time.total_seconds() / 3600),
+            start_distance=start_distance,
+            rest_stop=split.rest_stop,
+            sub_splits=sub_split_details
+        )
+
+    def decay_moving_speed(self, segment: Segment, moving_speed: float) -> float:
+        """
+        Decays the moving speed of a split for the next split, limited to min_moving_speed.
+
+        :param segment: the segment containing the split
+        :param moving_speed: the moving speed of the split
+        :return: the moving speed carried over to the next split
+        """
+        next_decayed_moving_speed = moving_speed - self.split_decay
+
+        min_moving_speed = self.min_moving_speed
+        # override with segment min_moving_speed if defined
+        # this can account/simulate for stronger/weaker/non-uniform efforts (climb, descent, etc)
+        if segment.min_moving_speed is not None:
+            min_moving_speed = segment.min_moving_speed
+
+        return max(next_decayed_moving_speed, min_moving_speed)
+
+    @staticmethod
+    def compute_segment_detail(segment: Segment,
+                               split_details: list[SplitDetail],
+                               segment_start: datetime) -> SegmentDetail:
+        """
+        Computes the totals of a segment from its split details.
+
+        :param segment: the segment the split details belong to
+        :param split_details: the computed split details of the segment
+        :param segment_start: when the segment starts
+        :return: a SegmentDetail object
+        """
+        segment_end = split_details[-1].end_time if split_details else segment_start
+
+        return SegmentDetail(
+            split_details=split_details,
+            start_time=segment_start,
+            end_time=segment_end,
+            total_elapsed_time=segment_end - segment_start,
+            total_down_time=sum((x.down_time for x in split_details), timedelta(0)),
+            total_moving_time=sum((x.moving_time for x in split_details), timedelta(0)),
+            total_adjustment_time=sum((x.adjustment_time for x in split_details), timedelta(0)),
+            total_sleep_time=segment.sleep_time,
+        )
+
+    def compute_totals(self, segment_details: list[SegmentDetail], end_time: datetime) -> CourseDetail:
+        """
+        Computes the course totals from its segment details.
+
+        :param segment_details: the computed segment details
+        :param end_time: when the course ends, sleep time included
+        :return: A CourseDetail object
+        """
+        total_moving_time: timedelta = timedelta(hours=0)
+        total_down_time: timedelta = timedelta(hours=0)
+        total_adjustment_time: timedelta = timedelta(hours=0)
+        total_sleep_time: timedelta = timedelta(hours=0)
+
+        for segment_detail in segment_details:
+            # account for sleep time between segments
+            total_moving_time += segment_detail.total_elapsed_time
+            total_down_time += segment_detail.total_down_time
+            total_adjustment_time += segment_detail.total_adjustment_time
+            total_sleep_time += segment_detail.total_sleep_time
 
         return CourseDetail(
             segment_details=segment_details,
             start_time=self.start_time,
-            end_time=curr_start_time,
-            total_elapsed_time=curr_start_time - self.start_time,
+            end_time=end_time,
+            total_elapsed_time=end_time - self.start_time,
             total_moving_time=total_moving_time,
             total_down_time=total_down_time,
             total_sleep_time=total_sleep_time,
@@ -1,10 +1,11 @@
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+from Cycling.pace_calculator.RestStop import RestStopAvailability
 from Cycling.pace_calculator.SegmentDetail import SegmentDetail
 
 
-@dataclass
+@dataclass(slots=True)
 class CourseDetail:
     segment_details: list[SegmentDetail]
     start_time: datetime
@@ -14,3 +15,30 @@ class CourseDetail:
     total_down_time: timedelta
     total_sleep_time: timedelta
     total_adjustment_time: timedelta
+
+    def rest_stop_availability(self) -> list[RestStopAvailability]:
+        """
+        Checks every rest stop of the plan against its arrival time, in one pass.
+        The arrival time is the end time of the split the stop is on.
+
+        :return: the availability of each rest stop, in course order
+        """
+        res = []
+        for s, segment_detail in enumerate(self.segment_details):
+            for i, split_detail in enumerate(segment_detail.split_details):
+                rest_stop = split_detail.rest_stop
+                if rest_stop is None:
+                    continue
+
+                index = rest_stop.open_hours.index
+                minutes_until_open = index.minutes_until_open(split_detail.end_time)
+                res.append(RestStopAvailability(
+                    segment_index=s,
+                    split_index=i,
+                    rest_stop=rest_stop,
+                    arrival_date=split_detail.end_time,
+                    is_open=minutes_until_open == 0,
+                    minutes_until_open=minutes_until_open,
+                ))
+
+        return res
@@ -0,0 +1,181 @@
+import csv
+import io
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator
+
+from Cycling.pace_calculator.CourseDetail import CourseDetail
+from Cycling.pace_calculator.CourseProgress import CourseProgress
+from Cycling.pace_calculator.SplitDetail import SplitDetail
+
+Columns = dict[str, list[Any]]
+
+
+def _arrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("pyarrow is required for Arrow/Parquet export: pip install pyarrow") from e
+    return pyarrow
+
+
+def _csv_value(value: Any):
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def write_csv(columns: Columns, filename: str):
+    """
+    Writes columns as a CSV file in a single write.
+    Datetimes are written in ISO format and timedeltas as seconds.
+
+    :param columns: the table to write, by column name
+    :param filename: the file to write to
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns.keys())
+    writer.writerows(map(_csv_value, row) for row in zip(*columns.values()))
+
+    with open(filename, 'w', newline='') as f:
+        f.write(buffer.getvalue())
+
+
+def write_csv_rows(header: list[str], rows: Iterable[list[Any]], filename: str) -> int:
+    """
+    Writes rows as a CSV file as they are produced, in the same format as write_csv.
+
+    :param header: the column names
+    :param rows: the table rows
+    :param filename: the file to write to
+    :return: the number of rows written
+    """
+    count = 0
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(map(_csv_value, row))
+            count += 1
+
+    return count
+
+
+def _to_columns(header: list[str], rows: Iterable[list[Any]]) -> Columns:
+    res: Columns = {_k: [] for _k in header}
+    columns = list(res.values())
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(value)
+
+    return res
+
+
+def to_arrow_table(columns: Columns):
+    """
+    :param columns: the table to convert, by column name
+    :return: a pyarrow.Table; datetimes become timestamps and timedeltas become durations
+    """
+    return _arrow().table(columns)
+
+
+def write_parquet(columns: Columns, filename: str):
+    table = to_arrow_table(columns)
+    from pyarrow import parquet
+    parquet.write_table(table, filename)
+
+
+def write_arrow_ipc(columns: Columns, filename: str):
+    pyarrow = _arrow()
+    table = to_arrow_table(columns)
+    with pyarrow.OSFile(filename, 'wb') as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+@dataclass
+class CourseDetailExporter:
+    """
+    Flattens CourseDetail -> SegmentDetail -> SplitDetail -> SubSplitDetail into columnar tables.
+    The splits table has one row per split and the sub-splits table one row per sub-split;
+    both carry the segment and split indices so they can be joined back together.
+    """
+    course_details: CourseDetail
+
+    SPLIT_FIELDS = ('start_distance', 'distance', 'start_time', 'end_time', 'adjustment_start', 'moving_speed',
+                    'moving_time', 'down_time', 'adjustment_time', 'split_time', 'total_time', 'pace')
+    SUB_SPLIT_FIELDS = ('start_distance', 'distance', 'start_time', 'end_time', 'moving_speed', 'moving_time',
+                        'down_time', 'split_time', 'total_time', 'pace')
+    REST_STOP_FIELDS = ('name', 'hours', 'address', 'alt')
+
+    @classmethod
+    def split_header(cls) -> list[str]:
+        return ['segment', 'split', *cls.SPLIT_FIELDS, *(f'rest_stop_{_k}' for _k in cls.REST_STOP_FIELDS)]
+
+    @classmethod
+    def sub_split_header(cls) -> list[str]:
+        return ['segment', 'split', 'sub_split', *cls.SUB_SPLIT_FIELDS]
+
+    @classmethod
+    def split_row(cls, segment_index: int, split_index: int, split: SplitDetail) -> list[Any]:
+        return [segment_index, split_index, *(getattr(split, _k) for _k in cls.SPLIT_FIELDS),
+                *(None if split.rest_stop is None else getattr(split.rest_stop, _k) for _k in cls.REST_STOP_FIELDS)]
+
+    @classmethod
+    def sub_split_rows(cls, segment_index: int, split_index: int, split: SplitDetail) -> Iterator[list[Any]]:
+        for j, sub_split in enumerate(split.sub_splits):
+            yield [segment_index, split_index, j, *(getattr(sub_split, _k) for _k in cls.SUB_SPLIT_FIELDS)]
+
+    @classmethod
+    def iter_rows(cls, progress: Iterable[CourseProgress], sub_splits: bool = False) -> Iterator[list[Any]]:
+        """
+        :param progress: the streamed splits, e.g. from Course.iter_split_details
+        :param sub_splits: if True, rows of the sub-splits table are streamed instead of the splits table
+        :return: iterator of table rows, in the column order of split_header/sub_split_header
+        """
+        for _p in progress:
+            if sub_splits:
+                yield from cls.sub_split_rows(_p.segment_index, _p.split_index, _p.split_detail)
+            else:
+                yield cls.split_row(_p.segment_index, _p.split_index, _p.split_detail)
+
+    @classmethod
+    def write_csv_stream(cls, progress: Iterable[CourseProgress], filename: str, sub_splits: bool = False) -> int:
+        """
+        Writes the splits (or sub-splits) table as a CSV file while the splits are streamed, in constant memory.
+        The file is the same as to_csv writes.
+
+        :return: the number of rows written
+        """
+        header = cls.sub_split_header() if sub_splits else cls.split_header()
+        return write_csv_rows(header, cls.iter_rows(progress, sub_splits), filename)
+
+    def split_columns(self) -> Columns:
+        rows = (self.split_row(s, i, split)
+                for s, segment_detail in enumerate(self.course_details.segment_details)
+                for i, split in enumerate(segment_detail.split_details))
+        return _to_columns(self.split_header(), rows)
+
+    def sub_split_columns(self) -> Columns:
+        rows = (row
+                for s, segment_detail in enumerate(self.course_details.segment_details)
+                for i, split in enumerate(segment_detail.split_details)
+                for row in self.sub_split_rows(s, i, split))
+        return _to_columns(self.sub_split_header(), rows)
+
+    def columns(self, sub_splits: bool = False) -> Columns:
+        return self.sub_split_columns() if sub_splits else self.split_columns()
+
+    def to_csv(self, filename: str, sub_splits: bool = False):
+        write_csv(self.columns(sub_splits), filename)
+
+    def to_arrow_table(self, sub_splits: bool = False):
+        return to_arrow_table(self.columns(sub_splits))
+
+    def to_parquet(self, filename: str, sub_splits: bool = False):
+        write_parquet(self.columns(sub_splits), filename)
+
+    def to_arrow_ipc(self, filename: str, sub_splits: bool = False):
+        write_arrow_ipc(self.columns(sub_splits), filename)
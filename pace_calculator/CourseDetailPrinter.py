@@ -1,20 +1,80 @@
 import math
+import sys
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from itertools import repeat
+from operator import attrgetter
+from typing import Iterable, TextIO
 
 import logging
 
 from Cycling.pace_calculator.CourseDetail import CourseDetail
+from Cycling.pace_calculator.CourseProgress import CourseProgress
 from Cycling.pace_calculator.PrinterField import PrinterField
-from Cycling.pace_calculator.SplitDetail import SplitDetail
-from Cycling.pace_calculator.Utils import hours_to_pretty, span_to_pretty
+from Cycling.pace_calculator.SplitDetail import SplitDetail, SubSplitDetail
+from Cycling.pace_calculator.Utils import hours_to_pretty, hours_to_pretty_batch, span_to_pretty, \
+    span_to_pretty_batch
 
 logging.basicConfig(level=logging.DEBUG)
 
 
+@dataclass
+class RenderPlan:
+    """
+    A precompiled column set: the header, the divider and the fields of every column.
+    Rows are rendered column by column, so each column is transformed and formatted in one batch
+    (see PrinterField.formatted_values) before the cells are joined into lines.
+    """
+    header: str
+    divider: str
+    spacer: str
+    field_keys: list[str]
+    fields: list[PrinterField]
+    stop_keys: list[str]
+    stop_fields: list[PrinterField]
+
+    def __post_init__(self):
+        self.empty_cells = [f.formatted_value() for f in self.fields]
+        self.empty_stops = self.spacer.join(f.formatted_value() for f in self.stop_fields)
+
+    def __columns(self, rows: list[SplitDetail | SubSplitDetail]) -> list[list[str] | repeat]:
+        # fields the row type does not have (e.g. sub-splits have no adjustment fields) are left empty
+        return [_f.formatted_values(list(map(attrgetter(_k), rows))) if hasattr(rows[0], _k) else repeat(empty)
+                for _k, _f, empty in zip(self.field_keys, self.fields, self.empty_cells)]
+
+    def __stop_columns(self, rows: list[SplitDetail | SubSplitDetail]) -> list[list[str]]:
+        rest_stops = [getattr(row, 'rest_stop', None) for row in rows]
+        return [_f.formatted_values([None if rest_stop is None else getattr(rest_stop, _k) for rest_stop in rest_stops])
+                for _k, _f in zip(self.stop_keys, self.stop_fields)]
+
+    def render_rows(self, rows: list[SplitDetail | SubSplitDetail]) -> list[str]:
+        """
+        :param rows: splits and sub-splits, in any mix
+        :return: one line per row, in order
+        """
+        by_type: dict[type, list[int]] = {}
+        for i, row in enumerate(rows):
+            by_type.setdefault(type(row), []).append(i)
+
+        columns: list[list[str]] = [[''] * len(rows) for _ in self.fields]
+        for indices in by_type.values():
+            group_rows = rows if len(by_type) == 1 else [rows[i] for i in indices]
+            for column, cells in zip(columns, self.__columns(group_rows)):
+                for i, cell in zip(indices, cells):
+                    column[i] = cell
+
+        if self.stop_fields:
+            columns += self.__stop_columns(rows)
+
+        return list(map(self.spacer.join, zip(*columns)))
+
+    def render_row(self, split: SplitDetail | SubSplitDetail) -> str:
+        return self.render_rows([split])[0]
+
+
 @dataclass
 class CourseDetailPrinter:
-    course_details: CourseDetail
+    course_details: CourseDetail | None = None  # not needed by write_progress
     keys_to_exclude: set[str] = None
     keys_to_rename: dict[str: str] = None
     SPACER = ' │ '
@@ -31,6 +91,7 @@ class CourseDetailPrinter:
             header_format=">16s",
             value_format='16s',
             value_transformer=span_to_pretty,
+            batch_value_transformer=span_to_pretty_batch,
             width=16
         ),
         'moving_speed': PrinterField(
@@ -44,6 +105,7 @@ class CourseDetailPrinter:
             header_format=">19s",
             value_format='19s',
             value_transformer=hours_to_pretty,
+            batch_value_transformer=hours_to_pretty_batch,
             width=19
         ),
         'down_time': PrinterField(
@@ -51,6 +113,7 @@ class CourseDetailPrinter:
             header_format=">19s",
             value_format='19s',
             value_transformer=hours_to_pretty,
+            batch_value_transformer=hours_to_pretty_batch,
             width=19
         ),
         'pace': PrinterField(
@@ -70,6 +133,7 @@ class CourseDetailPrinter:
             header_format=">19s",
             value_format='19s',
             value_transformer=hours_to_pretty,
+            batch_value_transformer=hours_to_pretty_batch,
             width=19
         ),
         'adjustment_time': PrinterField(
@@ -77,6 +141,7 @@ class CourseDetailPrinter:
             header_format=">19s",
             value_format='19s',
             value_transformer=hours_to_pretty,
+            batch_value_transformer=hours_to_pretty_batch,
             width=19
         ),
         'adjustment_start': PrinterField(
@@ -90,6 +155,7 @@ class CourseDetailPrinter:
             header_format=">19s",
             value_format='19s',
             value_transformer=hours_to_pretty,
+            batch_value_transformer=hours_to_pretty_batch,
             width=19
         ),
         'end_time': PrinterField(
@@ -128,19 +194,7 @@ class CourseDetailPrinter:
     }
 
     def print(self, include_sub_splits: bool = False, include_stops: bool = True):
-        segment_details = self.course_details.segment_details
-
-        field_keys_showing = self.__exposed_fields(include_stops)
-        dash_count = self.__compute_dash_count(field_keys_showing, include_stops)
-
-        for segment_detail in segment_details:
-            self.__print_header(field_keys_showing)
-            print('─' * dash_count)
-
-            for split in segment_detail.split_details:
-                self.__print_detail(split, field_keys_showing, include_sub_splits)
-
-            print('─' * dash_count)
+        sys.stdout.write(self.render(include_sub_splits, include_stops))
 
         # print('─' * dash_count)
         # self.__print_footer(summary,
@@ -167,6 +221,117 @@ class CourseDetailPrinter:
         # print(f"{'Down/Moving':14}: {summary['down_time'] / summary['moving_time']:>8.3%}")
         # print(f"{'Adj./Moving':14}: {summary['adjustment_time'] / summary['moving_time']:>8.3%}")
 
+    def render(self,
+               include_sub_splits: bool = False,
+               include_stops: bool = True,
+               stream: TextIO | None = None) -> str:
+        """
+        Renders the whole table into a single string.
+        The column set is compiled once into a RenderPlan and the rows of every segment are rendered with it in one batch.
+
+        :param include_sub_splits: whether to render the sub-splits of every split, above the split row
+        :param include_stops: whether to render the rest stop columns
+        :param stream: optional writable stream the table is written to in one call
+        :return: the rendered table
+        """
+        plan = self.compile(include_stops)
+        lines = []
+        for segment_detail in self.course_details.segment_details:
+            lines.append(plan.header)
+            lines.append(plan.divider)
+
+            rows = []
+            for split in segment_detail.split_details:
+                rows.extend(self.__split_rows(split, include_sub_splits))
+            if rows:
+                lines.extend(plan.render_rows(rows))
+
+            lines.append(plan.divider)
+
+        res = '\n'.join(lines) + '\n' if lines else ''
+        if stream is not None:
+            stream.write(res)
+
+        return res
+
+    def write_progress(self,
+                       progress: Iterable[CourseProgress],
+                       include_sub_splits: bool = False,
+                       include_stops: bool = True,
+                       stream: TextIO | None = None,
+                       batch_size: int = 64) -> int:
+        """
+        Writes the table as it is streamed, e.g. by Course.iter_split_details, so rows show up while the course is
+        computed and only a batch of rows is kept in memory.
+        Rows are rendered and written batch_size splits at a time and at the end of every segment, as rendering a
+        batch of rows costs far less than rendering them one by one.
+        The output matches render, except that segments without splits are not streamed and so not written.
+
+        :param progress: the streamed splits, in course order
+        :param include_sub_splits: whether to write the sub-splits of every split, above the split row
+        :param include_stops: whether to write the rest stop columns
+        :param stream: writable stream the table is written to, stdout by default
+        :param batch_size: the number of splits rendered and written at once, 1 to write every split as it comes
+        :return: the number of split rows written
+        """
+        stream = sys.stdout if stream is None else stream
+        plan = self.compile(include_stops)
+        lines: list[str] = []
+        rows: list[SplitDetail | SubSplitDetail] = []  # rows after lines, not rendered yet
+        count = 0
+        for _p in progress:
+            if _p.split_index == 0:
+                lines.extend(plan.render_rows(rows) if rows else [])
+                rows = []
+                lines.extend((plan.header, plan.divider))
+
+            rows.extend(self.__split_rows(_p.split_detail, include_sub_splits))
+            count += 1
+            if _p.is_segment_end or count % batch_size == 0:
+                lines.extend(plan.render_rows(rows))
+                rows = []
+                if _p.is_segment_end:
+                    lines.append(plan.divider)
+                stream.write('\n'.join(lines) + '\n')
+                lines = []
+
+        if rows:
+            lines.extend(plan.render_rows(rows))
+        if lines:
+            stream.write('\n'.join(lines) + '\n')
+
+        return count
+
+    @staticmethod
+    def __split_rows(split: SplitDetail, include_sub_splits: bool) -> list[SplitDetail | SubSplitDetail]:
+        rows = list(split.sub_splits) if include_sub_splits else []
+        rows.append(split)
+        return rows
+
+    def compile(self, include_stops: bool = True) -> RenderPlan:
+        """
+        Compiles the selected and renamed columns into a RenderPlan.
+
+        :param include_stops: whether to include the rest stop columns
+        :return: a RenderPlan
+        """
+        field_keys_showing = self.__exposed_fields(include_stops)
+        field_keys = [_k for _k in self.FIELD_PROPS if _k in field_keys_showing]
+        stop_keys = [_k for _k in self.REST_STOP_HEADERS if _k in field_keys_showing]
+
+        headers = [self.FIELD_PROPS[_k].formatted_header(self.keys_to_rename.get(_k, None)) for _k in field_keys]
+        headers += [self.REST_STOP_HEADERS[_k].formatted_header(self.keys_to_rename.get(_k, None)) for _k in stop_keys]
+
+        return RenderPlan(
+            header=self.SPACER.join(headers),
+            divider='─' * self.__compute_dash_count(field_keys_showing, include_stops),
+            spacer=self.SPACER,
+            field_keys=field_keys,
+            fields=[self.FIELD_PROPS[_k] for _k in field_keys],
+            stop_keys=stop_keys,
+            stop_fields=[self.REST_STOP_HEADERS[_k] for _k in stop_keys],
+        )
+
     def __exposed_fields(self, include_stop_info):
         if self.keys_to_rename is None:
             self.keys_to_rename = {}
@@ -182,36 +347,6 @@ class CourseDetailPrinter:
 
         return field_keys_showing
 
-    def __print_header(self, field_keys_showing: set[str]):
-        res = []
-        for _k in self.FIELD_PROPS:
-            if _k in field_keys_showing:
-                header_override = self.keys_to_rename.get(_k, None)
-                res.append(self.FIELD_PROPS[_k].formatted_header(header_override))
-
-        for _k in self.REST_STOP_HEADERS:
-            if _k in field_keys_showing:
-                header_override = self.keys_to_rename.get(_k, None)
-                res.append(self.REST_STOP_HEADERS[_k].formatted_header(header_override))
-
-        print(self.SPACER.join(res))
-
-    def __print_detail(self, split: SplitDetail, field_keys_showing: set[str], is_sub_split: bool = False):
-        res = []
-        for _k in self.FIELD_PROPS:
-            if _k in field_keys_showing:
-                _v = self.FIELD_PROPS[_k].formatted_value(split.__getattribute__(_k))
-                res.append(_v)
-
-        for _k in self.REST_STOP_HEADERS:
-            if _k in field_keys_showing:
-                if split.rest_stop is None:
-                    _v = self.REST_STOP_HEADERS[_k].formatted_value()
-                else:
-                    _v = self.REST_STOP_HEADERS[_k].formatted_value(split.rest_stop.__getattribute__(_k))
-                res.append(_v)
-        print(f'{self.SPACER.join(res)}' if is_sub_split else self.SPACER.join(res))
-
     def __print_footer(self, summary: dict[str: [str | float | datetime]], keys_to_include: set[str]):
         ...
         # res = []
@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from Cycling.pace_calculator.SplitDetail import SplitDetail
+
+
+@dataclass(slots=True)
+class CourseProgress:
+    """
+    A split detail streamed by Course.iter_split_details, with the course totals up to the end of the split.
+    """
+    segment_index: int
+    split_index: int
+    split_detail: SplitDetail
+    is_segment_end: bool  # True for the last split of its segment
+    total_distance: float
+    total_elapsed_time: timedelta  # from the course start to the end of the split, sleep time included
+    total_moving_time: timedelta  # elapsed time of the splits, as CourseDetail.total_moving_time; sleep time excluded
+    total_down_time: timedelta
+    total_adjustment_time: timedelta
+    total_sleep_time: timedelta  # sleep time of the previous segments
+
+    @property
+    def end_time(self) -> datetime:
+        return self.split_detail.end_time
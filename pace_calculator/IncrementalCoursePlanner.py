@@ -0,0 +1,157 @@
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Any
+
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.CourseDetail import CourseDetail
+from Cycling.pace_calculator.SplitDetail import SplitDetail
+
+
+@dataclass
+class SplitState:
+    """
+    The state of the course computation when a split starts.
+    """
+    start_time: datetime
+    moving_speed: float  # the moving speed carried over from the previous split, before any override
+    start_distance: float
+
+
+def _patch(target: Any, source: Any):
+    for f in fields(source):
+        setattr(target, f.name, getattr(source, f.name))
+
+
+class IncrementalCoursePlanner:
+    def __init__(self, course: Course):
+        """
+        Keeps the computed details of a course up to date while its splits are edited.
+        After an edit, only the edited split and the splits whose moving speed it affects are recomputed.
+        Every split after that is shifted in time.
+        The existing CourseDetail/SegmentDetail/SplitDetail objects are patched in place.
+
+        :param course: the course to plan
+        """
+        self.course = course
+        self.course_details: CourseDetail = course.compute_course_details()
+        self.__split_states: list[list[SplitState]] = self.__compute_split_states()
+
+    def set_moving_speed(self, segment_index: int, split_index: int, moving_speed: float | None) -> CourseDetail:
+        return self.update_split(segment_index, split_index, moving_speed=moving_speed)
+
+    def set_down_time(self, segment_index: int, split_index: int, down_time: timedelta | None) -> CourseDetail:
+        return self.update_split(segment_index, split_index, down_time=down_time)
+
+    def update_split(self, segment_index: int, split_index: int, **changes) -> CourseDetail:
+        """
+        Updates fields of a split and recomputes the course from that split onward.
+
+        :param segment_index: the index of the segment containing the split
+        :param split_index: the index of the split within the segment
+        :param changes: the Split fields to update, e.g. moving_speed, down_time, adjusted_time or distance
+        :return: the patched CourseDetail
+        """
+        split = self.course.segments[segment_index].splits[split_index]
+        for name, value in changes.items():
+            if name not in {f.name for f in fields(split)}:
+                raise ValueError(f"Split has no field '{name}'.")
+            setattr(split, name, value)
+
+        self.recompute_from(segment_index, split_index)
+        return self.course_details
+
+    def recompute_from(self, segment_index: int, split_index: int):
+        """
+        Recomputes the course details from the given (dirty) split onward.
+
+        :param segment_index: the index of the segment containing the dirty split
+        :param split_index: the index of the dirty split within the segment
+        """
+        state = self.__split_states[segment_index][split_index]
+        curr_start_time, curr_moving_speed, curr_distance = state.start_time, state.moving_speed, state.start_distance
+        # once a split starts with the same moving speed as before, the rest of the course only shifts
+        time_shift: timedelta | None = None
+        distance_shift: float = 0
+
+        for s in range(segment_index, len(self.course.segments)):
+            segment = self.course.segments[s]
+            segment_detail = self.course_details.segment_details[s]
+            split_states = self.__split_states[s]
+            recomputed = False
+
+            segment_start = segment_detail.start_time
+            if s > segment_index:
+                segment_start = curr_start_time if time_shift is None else segment_start + time_shift
+
+            for i in range(split_index if s == segment_index else 0, len(segment.splits)):
+                split_detail = segment_detail.split_details[i]
+                state = split_states[i]
+
+                is_dirty = s == segment_index and i == split_index
+                if time_shift is None and not is_dirty and curr_moving_speed == state.moving_speed:
+                    time_shift = curr_start_time - state.start_time
+                    distance_shift = curr_distance - state.start_distance
+
+                if time_shift is not None:
+                    self.__shift(split_detail, state, time_shift, distance_shift)
+                    continue
+
+                state.start_time, state.moving_speed, state.start_distance = \
+                    curr_start_time, curr_moving_speed, curr_distance
+                moving_speed = segment.moving_speed if i == 0 and segment.moving_speed is not None \
+                    else curr_moving_speed
+
+                _patch(split_detail, self.course.compute_split_detail(segment, i, curr_start_time, moving_speed,
+                                                                      curr_distance))
+                recomputed = True
+
+                curr_moving_speed = self.course.decay_moving_speed(segment, split_detail.moving_speed)
+                curr_distance += split_detail.distance
+                curr_start_time = split_detail.end_time
+
+            if recomputed or time_shift is None:
+                _patch(segment_detail, self.course.compute_segment_detail(segment, segment_detail.split_details,
+                                                                          segment_start))
+                curr_start_time = segment_detail.end_time + segment.sleep_time
+            else:
+                segment_detail.start_time = segment_start
+                segment_detail.end_time += time_shift
+
+            split_index = 0
+
+        segments = self.course_details.segment_details
+        end_time = segments[-1].end_time + self.course.segments[-1].sleep_time if segments \
+            else self.course_details.start_time
+        _patch(self.course_details, self.course.compute_totals(segments, end_time))
+
+    @staticmethod
+    def __shift(split_detail: SplitDetail, state: SplitState, time_shift: timedelta, distance_shift: float):
+        state.start_time += time_shift
+        state.start_distance += distance_shift
+        if not time_shift and not distance_shift:
+            return
+
+        split_detail.start_time += time_shift
+        split_detail.end_time += time_shift
+        split_detail.adjustment_start += time_shift
+        split_detail.start_distance += distance_shift
+        split_detail.sub_splits.shift(time_shift, distance_shift)
+
+        if split_detail.rest_stop is not None:
+            split_detail.rest_stop.arrival_date = split_detail.end_time
+
+    def __compute_split_states(self) -> list[list[SplitState]]:
+        res = []
+        curr_moving_speed = self.course.init_moving_speed
+        for segment, segment_detail in zip(self.course.segments, self.course_details.segment_details):
+            states = []
+            for split_detail in segment_detail.split_details:
+                states.append(SplitState(
+                    start_time=split_detail.start_time,
+                    moving_speed=curr_moving_speed,
+                    start_distance=split_detail.start_distance
+                ))
+                curr_moving_speed = self.course.decay_moving_speed(segment, split_detail.moving_speed)
+            res.append(states)
+
+        return res
@@ -0,0 +1,201 @@
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Callable
+
+import numpy as np
+
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.RestStop import RestStop
+from Cycling.pace_calculator.VectorizedCourseCalculator import CourseArrays, VectorizedCourseCalculator
+
+# seconds; the float seconds of the vectorized engine drift a few microseconds from the timedelta engine
+DEADLINE_TOLERANCE = 1e-3
+
+
+@dataclass
+class Deadline:
+    time: datetime
+
+    def split_index(self, course: Course) -> int | None:
+        """
+        :param course: the course the deadline applies to
+        :return: the index of the split that must end by the deadline, segments flattened, None for the finish
+        """
+        raise NotImplementedError('Subclasses must implement split_index')
+
+
+@dataclass
+class FinishDeadline(Deadline):
+    """
+    The course must end by the deadline, as CourseDetail.end_time does: the last segment's sleep time included.
+    """
+
+    def split_index(self, course: Course) -> int | None:
+        return None
+
+
+@dataclass
+class SplitDeadline(Deadline):
+    """
+    A split must end by the deadline, e.g. the close time of the control it ends at.
+    """
+    segment_index: int
+    index: int
+
+    def split_index(self, course: Course) -> int | None:
+        if not 0 <= self.index < len(course.segments[self.segment_index].splits):
+            raise ValueError(f"Segment {self.segment_index} has no split {self.index}.")
+        return sum(len(segment.splits) for segment in course.segments[:self.segment_index]) + self.index
+
+
+@dataclass
+class RestStopDeadline(Deadline):
+    """
+    A rest stop, given as a RestStop or by name, must be reached by the deadline.
+    It is reached when its split ends, as in Course.compute_course_details.
+    """
+    rest_stop: RestStop | str
+
+    def split_index(self, course: Course) -> int | None:
+        i = 0
+        for segment in course.segments:
+            for split in segment.splits:
+                rest_stop = split.rest_stop
+                if rest_stop is not None and (rest_stop is self.rest_stop or rest_stop.name == self.rest_stop):
+                    return i
+                i += 1
+
+        raise ValueError(f"The course has no rest stop '{self.rest_stop}'.")
+
+
+@dataclass
+class InverseCourseSolver:
+    """
+    Finds the course parameter that meets a set of deadlines:
+    the minimum init_moving_speed, or the maximum down_time_ratio.
+    End times are monotonic in both, so the bracket is narrowed by evaluating `probes` values at once
+    with VectorizedCourseCalculator, until it is narrower than `tolerance`.
+    """
+    course: Course
+    tolerance: float = 1e-4
+    probes: int = 64
+
+    def min_init_moving_speed(self, deadlines: Deadline | list[Deadline], max_speed: float = 100) -> float:
+        """
+        :param deadlines: the deadlines to meet
+        :param max_speed: the fastest init_moving_speed considered
+        :return: the smallest init_moving_speed meeting every deadline, within tolerance
+        """
+        return self.__solve(deadlines, 'init_moving_speed', low=self.tolerance, high=max_speed, feasible_above=True)
+
+    def max_down_time_ratio(self, deadlines: Deadline | list[Deadline], max_ratio: float = 10) -> float:
+        """
+        :param deadlines: the deadlines to meet
+        :param max_ratio: the largest down_time_ratio considered, returned when even that meets every deadline
+        :return: the largest down_time_ratio meeting every deadline, within tolerance
+        """
+        return self.__solve(deadlines, 'down_time_ratio', low=0, high=max_ratio, feasible_above=False)
+
+    def __solve(self,
+                deadlines: Deadline | list[Deadline],
+                parameter: str,
+                low: float,
+                high: float,
+                feasible_above: bool) -> float:
+        deadlines = [deadlines] if isinstance(deadlines, Deadline) else deadlines
+        if not deadlines:
+            raise ValueError("At least one deadline is required.")
+
+        arrays = CourseArrays.from_course(self.course)
+        split_indices = np.array([-1 if (i := _d.split_index(self.course)) is None else i for _d in deadlines])
+        deadline_offsets = np.array([(_d.time - self.course.start_time).total_seconds() for _d in deadlines])
+
+        def is_feasible(values: np.ndarray) -> np.ndarray:
+            end_offsets = self.__end_offsets(arrays, parameter, values, split_indices)
+            return np.all(end_offsets <= deadline_offsets + DEADLINE_TOLERANCE, axis=-1)
+
+        def meets(value: float) -> bool:
+            return self.__meets(replace(self.course, **{parameter: value}), split_indices, deadlines)
+
+        feasible_low, feasible_high = is_feasible(np.array([low, high]))
+        # the timedelta engine has the last word on the endpoints
+        if feasible_low and feasible_high and meets(low if feasible_above else high):
+            return low if feasible_above else high
+        if not (feasible_high if feasible_above else feasible_low) and not meets(high if feasible_above else low):
+            raise ValueError(f"No {parameter} between {low} and {high} meets the deadlines.")
+
+        value = self.__bracket(is_feasible, low, high, feasible_above)
+        if meets(value):
+            return value
+
+        # end times are compared in float seconds above; when the timedelta engine disagrees,
+        # bisect between the bracketed value and the feasible end of the range
+        infeasible, feasible = value, high if feasible_above else low
+        if not meets(feasible):
+            raise ValueError(f"No {parameter} between {low} and {high} meets the deadlines.")
+        while abs(feasible - infeasible) > self.tolerance:
+            middle = (infeasible + feasible) / 2
+            if meets(middle):
+                feasible = middle
+            else:
+                infeasible = middle
+
+        return feasible
+
+    def __bracket(self, is_feasible: Callable[[np.ndarray], np.ndarray], low: float, high: float,
+                  feasible_above: bool) -> float:
+        # low/high hold an infeasible/feasible value when feasible_above, and the reverse otherwise
+        while high - low > self.tolerance:
+            values = np.linspace(low, high, self.probes)
+            feasible = is_feasible(values)
+            if not feasible.any():
+                # only the timedelta engine accepted the feasible end; the caller confirms it
+                return float(high if feasible_above else low)
+            if feasible_above:
+                first = int(np.argmax(feasible))
+                if first == 0:
+                    return float(low)
+                low, high = values[first - 1], values[first]
+            else:
+                last = len(values) - 1 - int(np.argmax(feasible[::-1]))
+                if last == len(values) - 1:
+                    return float(high)
+                low, high = values[last], values[last + 1]
+
+        return float(high if feasible_above else low)
+
+    def __end_offsets(self,
+                      arrays: CourseArrays,
+                      parameter: str,
+                      values: np.ndarray,
+                      split_indices: np.ndarray) -> np.ndarray:
+        """
+        :return: the end offset of every deadline's split for each value, shaped (value count, deadline count)
+        """
+        course_values = {
+            'init_moving_speed': self.course.init_moving_speed,
+            'split_decay': self.course.split_decay,
+            'down_time_ratio': self.course.down_time_ratio,
+        } | {parameter: values}
+
+        moving_speeds = VectorizedCourseCalculator.compute_moving_speeds(arrays,
+                                                                         course_values['init_moving_speed'],
+                                                                         course_values['split_decay'])
+        moving_speeds = np.broadcast_to(moving_speeds, (len(values), arrays.split_count))
+        _, _, total_times = VectorizedCourseCalculator.compute_split_times(arrays, moving_speeds,
+                                                                          course_values['down_time_ratio'])
+
+        # the extra last column is the course end, the last segment's sleep time included
+        sleep_offsets = np.repeat(np.cumsum(arrays.sleep_times) - arrays.sleep_times, np.diff(arrays.segment_bounds))
+        end_offsets = np.cumsum(total_times, axis=-1) + sleep_offsets
+        end_offset = np.sum(total_times, axis=-1) + np.sum(arrays.sleep_times)
+
+        return np.column_stack((end_offsets, end_offset))[:, split_indices]
+
+    @staticmethod
+    def __meets(course: Course, split_indices: np.ndarray, deadlines: list[Deadline]) -> bool:
+        course_details = course.compute_course_details()
+        end_times = [split.end_time for segment in course_details.segment_details for split in segment.split_details]
+        end_times.append(course_details.end_time)
+
+        return all(end_times[i] <= deadline.time for i, deadline in zip(split_indices, deadlines))
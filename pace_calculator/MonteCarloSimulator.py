@@ -0,0 +1,294 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.RestStop import MINUTES_PER_WEEK, RestStop, minute_of_week
+from Cycling.pace_calculator.VectorizedCourseCalculator import CourseArrays, VectorizedCourseCalculator
+
+
+@dataclass
+class Distribution:
+    def sample(self, rng: np.random.Generator, shape: tuple[int, ...]) -> np.ndarray:
+        raise NotImplementedError('Subclasses must implement sample')
+
+
+@dataclass
+class FixedDistribution(Distribution):
+    value: float
+
+    def sample(self, rng: np.random.Generator, shape: tuple[int, ...]) -> np.ndarray:
+        return np.full(shape, self.value, dtype=float)
+
+
+@dataclass
+class UniformDistribution(Distribution):
+    low: float
+    high: float
+
+    def sample(self, rng: np.random.Generator, shape: tuple[int, ...]) -> np.ndarray:
+        return rng.uniform(self.low, self.high, shape)
+
+
+@dataclass
+class NormalDistribution(Distribution):
+    """
+    Normal distribution, optionally clipped to [low, high].
+    """
+    mean: float
+    std: float
+    low: float | None = None
+    high: float | None = None
+
+    def sample(self, rng: np.random.Generator, shape: tuple[int, ...]) -> np.ndarray:
+        res = rng.normal(self.mean, self.std, shape)
+        if self.low is not None or self.high is not None:
+            np.clip(res, self.low, self.high, out=res)
+        return res
+
+
+@dataclass
+class TriangularDistribution(Distribution):
+    low: float
+    mode: float
+    high: float
+
+    def sample(self, rng: np.random.Generator, shape: tuple[int, ...]) -> np.ndarray:
+        return rng.triangular(self.low, self.mode, self.high, shape)
+
+
+@dataclass
+class Control:
+    name: str
+    mile: float  # distance marker from the course start
+    close_time: datetime
+
+
+@dataclass
+class SimulationModel:
+    """
+    What is sampled, on top of a Course.
+    Distributions that are not defined keep the course's deterministic value.
+    """
+    init_moving_speed: Distribution | None = None  # per trial
+    split_decay: Distribution | None = None  # per trial
+    speed_factor: Distribution | None = None  # per split, multiplies the decayed (or overridden) moving speed
+    # per split, replaces the course down_time_ratio; segment ratios and split down_time overrides still apply
+    down_time_ratio: Distribution | None = None
+    adjustment_time: Distribution | None = None  # per split, minutes added to the split's adjusted_time
+
+
+@dataclass
+class RestStopSimulation:
+    segment_index: int
+    split_index: int
+    rest_stop: RestStop
+    arrival_offsets: np.ndarray  # seconds from the course start, one per percentile
+    open_probability: float
+
+
+@dataclass
+class ControlSimulation:
+    control: Control
+    arrival_offsets: np.ndarray  # seconds from the course start, one per percentile
+    miss_probability: float
+
+
+@dataclass
+class SimulationResult:
+    """
+    Percentiles of a Monte Carlo simulation. Times are stored as seconds from the course start.
+    """
+    start_time: datetime
+    trials: int
+    percentiles: np.ndarray
+    split_end_offsets: np.ndarray  # shaped (percentile count, split count)
+    finish_offsets: np.ndarray  # the finish offset of every trial, sleep time included
+    rest_stops: list[RestStopSimulation] = field(default_factory=list)
+    controls: list[ControlSimulation] = field(default_factory=list)
+
+    def finish_times(self) -> list[datetime]:
+        """
+        :return: the finish time at each percentile
+        """
+        return self.to_times(np.percentile(self.finish_offsets, self.percentiles))
+
+    def split_end_times(self, split_index: int) -> list[datetime]:
+        """
+        :param split_index: the index of the split, segments flattened
+        :return: the end time of the split at each percentile
+        """
+        return self.to_times(self.split_end_offsets[:, split_index])
+
+    def to_times(self, offsets: np.ndarray) -> list[datetime]:
+        return [self.start_time + timedelta(seconds=float(offset)) for offset in offsets]
+
+
+def _simulate_end_offsets(arrays: CourseArrays,
+                          course_values: tuple[float, float, float],
+                          model: SimulationModel,
+                          trials: int,
+                          seed: np.random.SeedSequence) -> np.ndarray:
+    """
+    Samples trials and computes the end offset of every split, sleep time included.
+    Runs in the worker processes when the simulation is spread across processes.
+
+    :return: end offsets in seconds, shaped (trials, split count)
+    """
+    rng = np.random.default_rng(seed)
+    init_moving_speed, split_decay, down_time_ratio = course_values
+    n = arrays.split_count
+    per_trial, per_split = (trials,), (trials, n)
+
+    if model.init_moving_speed is not None:
+        init_moving_speed = model.init_moving_speed.sample(rng, per_trial)
+    else:
+        init_moving_speed = np.full(per_trial, init_moving_speed)
+    if model.split_decay is not None:
+        split_decay = model.split_decay.sample(rng, per_trial)
+
+    moving_speeds = VectorizedCourseCalculator.compute_moving_speeds(arrays, init_moving_speed, split_decay)
+    if model.speed_factor is not None:
+        moving_speeds *= model.speed_factor.sample(rng, per_split)
+    moving_times = arrays.distances / moving_speeds * 3600
+
+    if model.down_time_ratio is not None:
+        down_time_ratio = model.down_time_ratio.sample(rng, per_split)
+    # mirrors VectorizedCourseCalculator.compute_split_times, with a ratio per split
+    down_time_ratios = np.where(np.isnan(arrays.segment_down_time_ratios), down_time_ratio,
+                                arrays.segment_down_time_ratios)
+    down_times = np.where(np.isnan(arrays.down_time_overrides), moving_times * down_time_ratios,
+                          arrays.down_time_overrides)
+    down_times[..., arrays.zero_down_time] = 0
+
+    total_times = moving_times + down_times + arrays.adjustment_times
+    if model.adjustment_time is not None:
+        total_times += model.adjustment_time.sample(rng, per_split) * 60
+
+    sleep_offsets = np.repeat(np.cumsum(arrays.sleep_times) - arrays.sleep_times, np.diff(arrays.segment_bounds))
+    return np.cumsum(total_times, axis=-1) + sleep_offsets
+
+
+@dataclass
+class MonteCarloSimulator:
+    """
+    Samples moving speeds, down times and adjustment times of a Course to estimate the distribution of its
+    arrival times.
+    Trials are computed with VectorizedCourseCalculator in batches, optionally spread across processes.
+    """
+    course: Course
+    model: SimulationModel
+    max_batch_size: int = 1_000_000  # upper bound of split values computed per batch
+    max_workers: int | None = 1  # processes to spread batches across, 1 to stay in this process
+    seed: int | None = None
+
+    PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+    def simulate(self,
+                 trials: int,
+                 controls: list[Control] | None = None,
+                 percentiles: tuple[float, ...] = PERCENTILES) -> SimulationResult:
+        """
+        :param trials: how many trials to sample
+        :param controls: controls whose close time should be checked
+        :param percentiles: the percentiles to report, between 0 and 100
+        :return: a SimulationResult
+        """
+        if trials <= 0:
+            raise ValueError("At least one trial is required.")
+
+        arrays = CourseArrays.from_course(self.course)
+        end_offsets = self.__end_offsets(arrays, trials)
+        percentiles = np.asarray(percentiles, dtype=float)
+
+        return SimulationResult(
+            start_time=self.course.start_time,
+            trials=trials,
+            percentiles=percentiles,
+            split_end_offsets=np.percentile(end_offsets, percentiles, axis=0),
+            finish_offsets=end_offsets[:, -1] + arrays.sleep_times[-1] if arrays.split_count else np.zeros(trials),
+            rest_stops=self.__rest_stops(arrays, end_offsets, percentiles),
+            controls=[self.__control(arrays, end_offsets, percentiles, control) for control in controls or []],
+        )
+
+    def __end_offsets(self, arrays: CourseArrays, trials: int) -> np.ndarray:
+        course_values = (self.course.init_moving_speed, self.course.split_decay, self.course.down_time_ratio)
+        batch_size = max(1, self.max_batch_size // max(1, arrays.split_count))
+        batches = [(start, min(start + batch_size, trials)) for start in range(0, trials, batch_size)]
+        # one independent stream per batch, so results only depend on the seed and the batch size
+        seeds = np.random.SeedSequence(self.seed).spawn(len(batches))
+
+        # stored as float32 to keep 100k trials of a long course in memory; that is well under a second of error
+        res = np.empty((trials, arrays.split_count), dtype=np.float32)
+        if self.max_workers == 1 or len(batches) == 1:
+            for (start, end), seed in zip(batches, seeds):
+                res[start:end] = _simulate_end_offsets(arrays, course_values, self.model, end - start, seed)
+            return res
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(_simulate_end_offsets, arrays, course_values, self.model, end - start, seed)
+                       for (start, end), seed in zip(batches, seeds)]
+            for (start, end), future in zip(batches, futures):
+                res[start:end] = future.result()
+
+        return res
+
+    def __rest_stops(self,
+                     arrays: CourseArrays,
+                     end_offsets: np.ndarray,
+                     percentiles: np.ndarray) -> list[RestStopSimulation]:
+        res = []
+        start_minute = minute_of_week(self.course.start_time)
+        for s, segment in enumerate(self.course.segments):
+            for i, split in enumerate(segment.splits):
+                if split.rest_stop is None:
+                    continue
+
+                # the stop is reached when its split ends, as in Course.compute_course_details
+                arrivals = end_offsets[:, arrays.segment_bounds[s] + i]
+                index = split.rest_stop.open_hours.index
+                starts, ends = np.asarray(index.starts, dtype=float), np.asarray(index.ends, dtype=float)
+                minutes = (start_minute + arrivals / 60) % MINUTES_PER_WEEK
+                # vectorized OpenHoursIndex.is_open_at
+                interval = np.searchsorted(starts, minutes, side='right') - 1
+                is_open = (interval >= 0) & (minutes < ends[np.maximum(interval, 0)]) if len(starts) \
+                    else np.zeros(len(minutes), dtype=bool)
+
+                res.append(RestStopSimulation(
+                    segment_index=s,
+                    split_index=i,
+                    rest_stop=split.rest_stop,
+                    arrival_offsets=np.percentile(arrivals, percentiles),
+                    open_probability=float(np.mean(is_open)),
+                ))
+
+        return res
+
+    def __control(self,
+                  arrays: CourseArrays,
+                  end_offsets: np.ndarray,
+                  percentiles: np.ndarray,
+                  control: Control) -> ControlSimulation:
+        end_distances = np.cumsum(arrays.distances)
+        i = int(np.searchsorted(end_distances, control.mile))
+        if i == arrays.split_count:
+            raise ValueError(f"Control '{control.name}' lies beyond the end of the course.")
+
+        # within a split, time is spread evenly over its distance; a control at the split end is reached at its end
+        arrivals = end_offsets[:, i]
+        if control.mile < end_distances[i]:
+            start_offsets = end_offsets[:, i - 1] if i > 0 else np.zeros(len(end_offsets), dtype=np.float32)
+            segment = int(np.searchsorted(arrays.segment_bounds, i, side='right')) - 1
+            if i == arrays.segment_bounds[segment] and segment > 0:
+                start_offsets = start_offsets + arrays.sleep_times[segment - 1]
+            fraction = (control.mile - (end_distances[i] - arrays.distances[i])) / arrays.distances[i]
+            arrivals = start_offsets + (arrivals - start_offsets) * fraction
+
+        close_offset = (control.close_time - self.course.start_time).total_seconds()
+        return ControlSimulation(
+            control=control,
+            arrival_offsets=np.percentile(arrivals, percentiles),
+            miss_probability=float(np.mean(arrivals > close_offset)),
+        )
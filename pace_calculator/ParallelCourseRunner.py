@@ -0,0 +1,75 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, NamedTuple
+
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.VectorizedCourseCalculator import CourseArrays, VectorizedCourseCalculator, \
+    VectorizedCourseDetail
+
+
+class CourseWire(NamedTuple):
+    """
+    Compact, picklable form of a Course: its packed split arrays plus the course-level parameters.
+    Rest stops, sub-split modes and KOMs are not shipped since they do not affect the computation.
+    """
+    arrays: CourseArrays
+    init_moving_speed: float
+    split_decay: float
+    down_time_ratio: float
+    start_time: datetime
+
+    @classmethod
+    def from_course(cls, course: Course) -> 'CourseWire':
+        return cls(
+            arrays=CourseArrays.from_course(course),
+            init_moving_speed=course.init_moving_speed,
+            split_decay=course.split_decay,
+            down_time_ratio=course.down_time_ratio,
+            start_time=course.start_time,
+        )
+
+
+def _compute_batch(wires: list[CourseWire]) -> list[VectorizedCourseDetail]:
+    return [VectorizedCourseCalculator.compute_arrays(*wire) for wire in wires]
+
+
+@dataclass
+class ParallelCourseRunner:
+    """
+    Computes many independent courses across a process pool.
+    Courses are sent to the workers in their wire form and batched to amortize the inter-process overhead.
+    """
+    max_workers: int | None = None
+    batch_size: int = 16
+    max_pending_batches: int | None = None  # bounds how far ahead of the consumer the courses are submitted
+
+    def run(self, courses: Iterable[Course]) -> Iterator[VectorizedCourseDetail]:
+        """
+        Computes the given courses in parallel and streams the results back in input order.
+        courses can be a generator; it is consumed only as fast as results are collected.
+
+        :param courses: the courses to compute
+        :return: iterator of VectorizedCourseDetail, with each result attached to its course
+        """
+        max_workers = self.max_workers or os.cpu_count() or 1
+        max_pending_batches = self.max_pending_batches or 2 * max_workers
+        courses = iter(courses)
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending: deque[tuple[list[Course], Future]] = deque()
+            while batch := list(islice(courses, self.batch_size)):
+                pending.append((batch, executor.submit(_compute_batch, [CourseWire.from_course(c) for c in batch])))
+                if len(pending) >= max_pending_batches:
+                    yield from self.__collect(*pending.popleft())
+
+            while pending:
+                yield from self.__collect(*pending.popleft())
+
+    @staticmethod
+    def __collect(batch: list[Course], future: Future) -> Iterator[VectorizedCourseDetail]:
+        for course, course_detail in zip(batch, future.result()):
+            yield replace(course_detail, course=course)
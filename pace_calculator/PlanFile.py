@@ -0,0 +1,424 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
+
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.DetailLines import KOMDetailLine, KOMOptionalDetailLine
+from Cycling.pace_calculator.RestStop import FixedOpenHours, OpenHours, RestStop, WeeklyOpenHours
+from Cycling.pace_calculator.Segment import Segment
+from Cycling.pace_calculator.Split import Split
+from Cycling.pace_calculator.SubSplitMode import (CustomSubSplitMode, EvenSubSplitMode, FixedDistanceSubSplitMode,
+                                                  SubSplitMode)
+
+PLAN_FORMAT_VERSION = 1
+MSGPACK_EXTENSIONS = ('.msgpack', '.mpk')
+_JSON_LINE_PREFIX = b'{"version":%d,"hash":"' % PLAN_FORMAT_VERSION
+
+_WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+_NUMBER = {'type': 'number'}
+_OPTIONAL_NUMBER = {'type': ['number', 'null']}
+_OPTIONAL_STRING = {'type': ['string', 'null']}
+_SECONDS = {'type': 'number', 'description': 'duration in seconds'}
+_OPTIONAL_SECONDS = {'type': ['number', 'null'], 'description': 'duration in seconds'}
+
+# JSON Schema of a plan record: a Course under "plan", with its format version, and optionally a name and hash
+PLAN_SCHEMA = {
+    '$schema': 'https://json-schema.org/draft/2020-12/schema',
+    'title': 'pace_calculator plan',
+    'type': 'object',
+    'required': ['version', 'plan'],
+    'properties': {
+        'version': {'const': PLAN_FORMAT_VERSION},
+        'name': _OPTIONAL_STRING,
+        'hash': {'type': 'string', 'description': 'plan_hash of the record, sha256 hex digest'},
+        'plan': {'$ref': '#/$defs/course'},
+    },
+    '$defs': {
+        'course': {
+            'type': 'object',
+            'required': ['segments', 'init_moving_speed', 'min_moving_speed'],
+            'properties': {
+                'segments': {'type': 'array', 'items': {'$ref': '#/$defs/segment'}},
+                'koms': {'type': 'array', 'items': {'$ref': '#/$defs/kom'}},
+                'init_moving_speed': _NUMBER,
+                'min_moving_speed': _NUMBER,
+                'down_time_ratio': _NUMBER,
+                'split_decay': _NUMBER,
+                'start_time': {'type': ['string', 'null'], 'format': 'date-time'},
+            },
+        },
+        'segment': {
+            'type': 'object',
+            'required': ['splits'],
+            'properties': {
+                'splits': {'type': 'array', 'items': {'$ref': '#/$defs/split'}},
+                'down_time_ratio': _OPTIONAL_NUMBER,
+                'split_decay': _OPTIONAL_NUMBER,
+                'moving_speed': _OPTIONAL_NUMBER,
+                'min_moving_speed': _OPTIONAL_NUMBER,
+                'sleep_time': _SECONDS,
+                'no_end_down_time': {'type': 'boolean'},
+            },
+        },
+        'split': {
+            'type': 'object',
+            'required': ['distance', 'sub_split_mode'],
+            'properties': {
+                'distance': _NUMBER,
+                'sub_split_mode': {'$ref': '#/$defs/sub_split_mode'},
+                'rest_stop': {'oneOf': [{'$ref': '#/$defs/rest_stop'}, {'type': 'null'}]},
+                'down_time': _OPTIONAL_SECONDS,
+                'moving_speed': _OPTIONAL_NUMBER,
+                'adjusted_time': _SECONDS,
+            },
+        },
+        'sub_split_mode': {
+            'oneOf': [
+                {'type': 'object', 'required': ['type', 'sub_split_count'],
+                 'properties': {'type': {'const': 'even'}, 'sub_split_count': {'type': 'integer'}}},
+                {'type': 'object', 'required': ['type', 'sub_split_distance'],
+                 'properties': {'type': {'const': 'fixed_distance'}, 'sub_split_distance': _NUMBER,
+                                'last_sub_split_threshold': _OPTIONAL_NUMBER}},
+                {'type': 'object', 'required': ['type', 'sub_split_distances'],
+                 'properties': {'type': {'const': 'custom'},
+                                'sub_split_distances': {'type': 'array', 'items': _NUMBER}}},
+            ],
+        },
+        'rest_stop': {
+            'type': 'object',
+            'required': ['name', 'open_hours', 'address'],
+            'properties': {
+                'name': {'type': 'string'},
+                'open_hours': {'$ref': '#/$defs/open_hours'},
+                'address': {'type': 'string'},
+                'alt': _OPTIONAL_STRING,
+            },
+        },
+        'open_hours': {
+            'oneOf': [
+                {'type': 'object', 'required': ['type'],
+                 'properties': {'type': {'const': 'weekly'}} | {_d: _OPTIONAL_STRING for _d in _WEEKDAYS}},
+                {'type': 'object', 'required': ['type', 'hours'],
+                 'properties': {'type': {'const': 'fixed'}, 'hours': _OPTIONAL_STRING}},
+            ],
+        },
+        'kom': {
+            'type': 'object',
+            'required': ['type', 'mile_mark', 'distance', 'name', 'speed', 'avg_grade', 'orientation', 'kom_time'],
+            'properties': {
+                'type': {'enum': ['kom', 'kom_optional']},
+                'mile_mark': _NUMBER,
+                'distance': _NUMBER,
+                'name': {'type': 'string'},
+                'speed': _NUMBER,
+                'avg_grade': _NUMBER,
+                'orientation': {'type': 'string'},
+                'kom_time': _SECONDS,
+            },
+        },
+    },
+}
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError("msgpack is required for the binary plan format: pip install msgpack") from e
+    return msgpack
+
+
+@lru_cache(maxsize=None)
+def _json_loads() -> Callable[[str | bytes], Any]:
+    # orjson is only a faster parser, the stdlib one reads the same files
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+    return orjson.loads
+
+
+def _is_msgpack(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in MSGPACK_EXTENSIONS
+
+
+def _seconds(value: timedelta | None) -> float | None:
+    return None if value is None else value.total_seconds()
+
+
+def _timedelta(value: float | None) -> timedelta | None:
+    return None if value is None else timedelta(seconds=value)
+
+
+def _float(value: float | None) -> float | None:
+    # numbers are stored as floats, so 100 and 100.0 give the same plan hash
+    return None if value is None else float(value)
+
+
+def _sub_split_mode_to_dict(mode: SubSplitMode) -> dict[str, Any]:
+    if isinstance(mode, EvenSubSplitMode):
+        return {'type': 'even', 'sub_split_count': mode.sub_split_count}
+    if isinstance(mode, FixedDistanceSubSplitMode):
+        return {'type': 'fixed_distance', 'sub_split_distance': _float(mode.sub_split_distance),
+                'last_sub_split_threshold': _float(mode.last_sub_split_threshold)}
+    if isinstance(mode, CustomSubSplitMode):
+        return {'type': 'custom', 'sub_split_distances': [float(x) for x in mode.sub_split_distances]}
+    raise ValueError(f"Unsupported sub-split mode: {type(mode).__name__}.")
+
+
+def _sub_split_mode_from_dict(data: dict[str, Any]) -> SubSplitMode:
+    mode_type = data['type']
+    if mode_type == 'even':
+        return EvenSubSplitMode(sub_split_count=data['sub_split_count'])
+    if mode_type == 'fixed_distance':
+        return FixedDistanceSubSplitMode(sub_split_distance=data['sub_split_distance'],
+                                         last_sub_split_threshold=data.get('last_sub_split_threshold'))
+    if mode_type == 'custom':
+        return CustomSubSplitMode(sub_split_distances=list(data['sub_split_distances']))
+    raise ValueError(f"Unsupported sub-split mode: {mode_type}.")
+
+
+def _open_hours_to_dict(open_hours: OpenHours) -> dict[str, Any]:
+    if isinstance(open_hours, FixedOpenHours):
+        return {'type': 'fixed', 'hours': open_hours.hours}
+    # any other OpenHours is fully described by its weekly hours
+    return {'type': 'weekly'} | dict(zip(_WEEKDAYS, open_hours.weekly_hours))
+
+
+def _open_hours_from_dict(data: dict[str, Any]) -> OpenHours:
+    if data['type'] == 'fixed':
+        return FixedOpenHours(hours=data['hours'])
+    if data['type'] == 'weekly':
+        return WeeklyOpenHours(**{_d: data.get(_d) for _d in _WEEKDAYS})
+    raise ValueError(f"Unsupported open hours: {data['type']}.")
+
+
+def _rest_stop_to_dict(rest_stop: RestStop | None) -> dict[str, Any] | None:
+    if rest_stop is None:
+        return None
+    # arrival_date is computed, not part of the plan
+    return {'name': rest_stop.name, 'open_hours': _open_hours_to_dict(rest_stop.open_hours),
+            'address': rest_stop.address, 'alt': rest_stop.alt}
+
+
+def _rest_stop_from_dict(data: dict[str, Any] | None) -> RestStop | None:
+    if data is None:
+        return None
+    return RestStop(name=data['name'], open_hours=_open_hours_from_dict(data['open_hours']),
+                    address=data['address'], alt=data.get('alt'))
+
+
+def _kom_to_dict(kom: KOMDetailLine) -> dict[str, Any]:
+    return {'type': 'kom_optional' if isinstance(kom, KOMOptionalDetailLine) else 'kom',
+            'mile_mark': _float(kom.mile_mark), 'distance': _float(kom.distance), 'name': kom.name,
+            'speed': _float(kom.speed), 'avg_grade': _float(kom.avg_grade), 'orientation': kom.orientation,
+            'kom_time': _seconds(kom.kom_time)}
+
+
+def _kom_from_dict(data: dict[str, Any]) -> KOMDetailLine:
+    cls = KOMOptionalDetailLine if data['type'] == 'kom_optional' else KOMDetailLine
+    return cls(mile_mark=data['mile_mark'], distance=data['distance'], name=data['name'], speed=data['speed'],
+               avg_grade=data['avg_grade'], orientation=data['orientation'], kom_time=_timedelta(data['kom_time']))
+
+
+def plan_to_dict(course: Course) -> dict[str, Any]:
+    """
+    :param course: the plan
+    :return: the plan as plain JSON/msgpack values, see PLAN_SCHEMA; datetimes are ISO strings, durations seconds
+    """
+    return {
+        'segments': [{
+            'splits': [{
+                'distance': float(split.distance),
+                'sub_split_mode': _sub_split_mode_to_dict(split.sub_split_mode),
+                'rest_stop': _rest_stop_to_dict(split.rest_stop),
+                'down_time': _seconds(split.down_time),
+                'moving_speed': _float(split.moving_speed),
+                'adjusted_time': _seconds(split.adjusted_time),
+            } for split in segment.splits],
+            'down_time_ratio': _float(segment.down_time_ratio),
+            'split_decay': _float(segment.split_decay),
+            'moving_speed': _float(segment.moving_speed),
+            'min_moving_speed': _float(segment.min_moving_speed),
+            'sleep_time': _seconds(segment.sleep_time),
+            'no_end_down_time': segment.no_end_down_time,
+        } for segment in course.segments],
+        'koms': [_kom_to_dict(kom) for kom in course.KOMs],
+        'init_moving_speed': float(course.init_moving_speed),
+        'min_moving_speed': float(course.min_moving_speed),
+        'down_time_ratio': float(course.down_time_ratio),
+        'split_decay': float(course.split_decay),
+        'start_time': None if course.start_time is None else course.start_time.isoformat(),
+    }
+
+
+def plan_from_dict(data: dict[str, Any]) -> Course:
+    """
+    :param data: a plan as returned by plan_to_dict
+    :return: the Course it describes
+    """
+    return Course(
+        segments=[Segment(
+            splits=[Split(
+                distance=split['distance'],
+                sub_split_mode=_sub_split_mode_from_dict(split['sub_split_mode']),
+                rest_stop=_rest_stop_from_dict(split.get('rest_stop')),
+                down_time=_timedelta(split.get('down_time')),
+                moving_speed=split.get('moving_speed'),
+                adjusted_time=_timedelta(split.get('adjusted_time', 0)),
+            ) for split in segment['splits']],
+            down_time_ratio=segment.get('down_time_ratio'),
+            split_decay=segment.get('split_decay'),
+            moving_speed=segment.get('moving_speed'),
+            min_moving_speed=segment.get('min_moving_speed'),
+            sleep_time=_timedelta(segment.get('sleep_time', 0)),
+            no_end_down_time=segment.get('no_end_down_time', True),
+        ) for segment in data['segments']],
+        KOMs=[_kom_from_dict(kom) for kom in data.get('koms', [])],
+        init_moving_speed=data['init_moving_speed'],
+        min_moving_speed=data['min_moving_speed'],
+        down_time_ratio=data.get('down_time_ratio', 0),
+        split_decay=data.get('split_decay', 0),
+        start_time=None if data.get('start_time') is None else datetime.fromisoformat(data['start_time']),
+    )
+
+
+def plan_hash(plan: Course | dict[str, Any]) -> str:
+    """
+    Content hash of a plan: equal plans hash the same whatever file or format they come from.
+
+    :param plan: a Course, or a plan dict as stored in a plan file; dicts are canonicalized through plan_from_dict
+                 and plan_to_dict first, so e.g. 17 and 17.0 hash the same
+    :return: sha256 hex digest of the canonical JSON of the plan and the format version
+    """
+    return _canonical_plan_hash(plan_to_dict(plan if isinstance(plan, Course) else plan_from_dict(plan)))
+
+
+def _canonical_plan_hash(data: dict[str, Any]) -> str:
+    # data must come straight from plan_to_dict
+    canonical = json.dumps({'version': PLAN_FORMAT_VERSION, 'plan': data}, sort_keys=True, separators=(',', ':'),
+                           ensure_ascii=False, allow_nan=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class PlanRecord:
+    """
+    A plan as stored in a plan file. The Course is only built when asked for,
+    so plans whose hash is already known (e.g. cached results) can be skipped cheaply.
+    """
+    name: str | None
+    plan_hash: str
+    data: dict[str, Any] = field(repr=False)
+
+    @staticmethod
+    def from_course(course: Course, name: str | None = None) -> 'PlanRecord':
+        data = plan_to_dict(course)
+        return PlanRecord(name=name, plan_hash=_canonical_plan_hash(data), data=data)
+
+    @staticmethod
+    def from_dict(record: dict[str, Any]) -> 'PlanRecord':
+        if record.get('version') != PLAN_FORMAT_VERSION:
+            raise ValueError(f"Unsupported plan format version: {record.get('version')}.")
+        # a stored hash is trusted, it is only computed for records written without one
+        return PlanRecord(name=record.get('name'), plan_hash=record.get('hash') or plan_hash(record['plan']),
+                          data=record['plan'])
+
+    def to_dict(self) -> dict[str, Any]:
+        # the hash leads the record, so iter_plan_library can skip a JSON line without parsing it
+        return {'version': PLAN_FORMAT_VERSION, 'hash': self.plan_hash, 'name': self.name, 'plan': self.data}
+
+    def course(self) -> Course:
+        return plan_from_dict(self.data)
+
+
+def save_plan(course: Course, filename: str, name: str | None = None) -> PlanRecord:
+    """
+    Saves a plan as JSON, or msgpack for .msgpack/.mpk files.
+
+    :return: the saved PlanRecord
+    """
+    record = PlanRecord.from_course(course, name)
+    if _is_msgpack(filename):
+        # packed before opening, so a missing msgpack does not truncate an existing file
+        content = _msgpack().packb(record.to_dict())
+        with open(filename, 'wb') as f:
+            f.write(content)
+    else:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(record.to_dict(), f, indent=2, ensure_ascii=False, allow_nan=False)
+
+    return record
+
+
+def load_plan(filename: str) -> PlanRecord:
+    """
+    Loads a plan saved by save_plan.
+
+    :return: the PlanRecord, see PlanRecord.course for the Course
+    """
+    with open(filename, 'rb') as f:
+        content = f.read()
+
+    return PlanRecord.from_dict(_msgpack().unpackb(content) if _is_msgpack(filename) else _json_loads()(content))
+
+
+def save_plan_library(plans: Iterable[PlanRecord | Course], filename: str) -> int:
+    """
+    Saves plans into a single library file: JSON lines (one record per line), or consecutive msgpack records
+    for .msgpack/.mpk files. Both are written and read one plan at a time.
+
+    :param plans: the plans, as PlanRecords or Courses
+    :param filename: the file to write to
+    :return: the number of plans written
+    """
+    count = 0
+    msgpack = _msgpack() if _is_msgpack(filename) else None
+    with open(filename, 'wb') as f:
+        for plan in plans:
+            record = plan if isinstance(plan, PlanRecord) else PlanRecord.from_course(plan)
+            if msgpack is not None:
+                f.write(msgpack.packb(record.to_dict()))
+            else:
+                f.write(json.dumps(record.to_dict(), separators=(',', ':'), ensure_ascii=False,
+                                   allow_nan=False).encode('utf-8'))
+                f.write(b'\n')
+            count += 1
+
+    return count
+
+
+def iter_plan_library(filename: str, skip_hashes: set[str] | None = None) -> Iterator[PlanRecord]:
+    """
+    Streams the plans of a library file, one record at a time.
+
+    :param filename: a file written by save_plan_library
+    :param skip_hashes: hashes of plans to skip, e.g. plans whose results are already cached
+    :return: iterator of PlanRecords, in file order
+    """
+    skip_hashes = skip_hashes or set()
+    with open(filename, 'rb') as f:
+        records = _msgpack().Unpacker(f) if _is_msgpack(filename) else _iter_json_lines(f, skip_hashes)
+        for record in records:
+            if record.get('hash') in skip_hashes:
+                continue
+            plan_record = PlanRecord.from_dict(record)
+            if plan_record.plan_hash not in skip_hashes:
+                yield plan_record
+
+
+def _iter_json_lines(f: BinaryIO, skip_hashes: set[str]) -> Iterator[dict[str, Any]]:
+    loads = _json_loads()
+    for line in f:
+        if not line.strip():
+            continue
+        # records written by save_plan_library start with their hash, skipped plans are not even parsed
+        if skip_hashes and line.startswith(_JSON_LINE_PREFIX):
+            start = len(_JSON_LINE_PREFIX)
+            if line[start:start + 64].decode('ascii', errors='replace') in skip_hashes:
+                continue
+        yield loads(line)
@@ -1,6 +1,9 @@
 from dataclasses import dataclass
+from datetime import datetime
 from typing import Callable, Any
 
+from Cycling.pace_calculator.Utils import strftime_batch
+
 
 @dataclass
 class PrinterField:
@@ -10,6 +13,8 @@ class PrinterField:
     width: int = 0
     empty_char: str = '-'
     value_transformer: Callable[[Any], str] | None = None
+    # transforms a whole column at once, as value_transformer does value by value
+    batch_value_transformer: Callable[[list[Any]], list[str]] | None = None
 
     @property
     def empty_value(self):
@@ -24,5 +29,35 @@ class PrinterField:
 
         return f'{value:{self.value_format}}'
 
+    def formatted_values(self, values: list[Any]) -> list[str]:
+        """
+        Formats a whole column, as formatted_value does value by value.
+        The column is transformed in one batch, and datetimes are formatted with strftime_batch.
+
+        :param values: the values of the column, None for empty cells
+        :return: the formatted cells, in order
+        """
+        if len(values) == 1 and self.batch_value_transformer is None:
+            # nothing to batch, e.g. when streaming split by split
+            return [self.formatted_value(values[0])]
+
+        present = [value for value in values if value is not None]
+        if self.batch_value_transformer is not None:
+            present = self.batch_value_transformer(present)
+        elif self.value_transformer is not None:
+            present = list(map(self.value_transformer, present))
+
+        if present and all(isinstance(value, datetime) for value in present):
+            present = strftime_batch(present, self.value_format)
+        else:
+            present = list(map(f'{{:{self.value_format}}}'.format, present))
+
+        if len(present) == len(values):
+            return present
+
+        empty = self.formatted_value()
+        cells = iter(present)
+        return [empty if value is None else next(cells) for value in values]
+
     def formatted_header(self, override: str | None = None):
         return f'{self.name if override is None else override:{self.header_format}}'
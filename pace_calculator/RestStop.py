@@ -1,15 +1,160 @@
+import re
+from bisect import bisect_right
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 
 (MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY) = range(7)
 
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# e.g. '6:00a', '9:00 pm', '12p', '11:30PM'
+_TIME_PATTERN = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*([ap])\.?m?\.?', re.IGNORECASE)
+_ALL_DAY_PATTERN = re.compile(r'^\s*(open\s*)?24\s*(hrs|hours|h)?\s*$', re.IGNORECASE)
+_CLOSED_PATTERN = re.compile(r'^\s*closed\s*$', re.IGNORECASE)
+
+
+def minute_of_week(when: datetime) -> float:
+    """
+    :param when: a date and time
+    :return: minutes elapsed since Monday 00:00 of the same week
+    """
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute + when.second / 60
+
+
+def parse_time(text: str) -> int:
+    """
+    Parses a 12-hour clock time, e.g. '6:00a' or '9:30 pm'.
+
+    :param text: the time to parse
+    :return: minutes since midnight
+    """
+    match = _TIME_PATTERN.fullmatch(text.strip())
+    if match is None:
+        raise ValueError(f"Unrecognized time '{text}'.")
+
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3).lower()
+    if not 1 <= hours <= 12 or minutes >= 60:
+        raise ValueError(f"Unrecognized time '{text}'.")
+
+    return (hours % 12 + (12 if meridiem == 'p' else 0)) * 60 + minutes
+
+
+def parse_day_hours(text: str | None) -> list[tuple[int, int]]:
+    """
+    Parses the hours of a single day, e.g. ' 6:00a -  9:00p', '3:00p - 11:00a', '24hrs', 'CLOSED'
+    or several ranges separated by ',' or ';'.
+    Overnight ranges end past midnight, so their end is greater than MINUTES_PER_DAY.
+
+    :param text: the hours to parse, None when closed
+    :return: (start, end) minutes since the day's midnight
+    """
+    if text is None or _CLOSED_PATTERN.match(text):
+        return []
+    if _ALL_DAY_PATTERN.match(text):
+        return [(0, MINUTES_PER_DAY)]
+
+    res = []
+    for hours in re.split(r'[,;]', text):
+        if not hours.strip():
+            continue
+
+        start, separator, end = hours.partition('-')
+        if not separator:
+            raise ValueError(f"Unrecognized open hours '{text}'.")
+
+        start, end = parse_time(start), parse_time(end)
+        # an end at or before the start runs overnight, e.g. 3:00p - 11:00a or 6:00a - 6:00a
+        res.append((start, end if end > start else end + MINUTES_PER_DAY))
+
+    return res
+
+
+@dataclass(frozen=True, slots=True)
+class OpenHoursIndex:
+    """
+    Open hours as sorted, non-overlapping minutes-of-week intervals [start, end).
+    Intervals running past Sunday midnight are split in two, so every interval lies within one week.
+    """
+    starts: tuple[int, ...]
+    ends: tuple[int, ...]
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def from_weekly_hours(weekly_hours: tuple[str | None, ...]) -> 'OpenHoursIndex':
+        """
+        Stops sharing the same hours (e.g. a chain) share the same index.
+
+        :param weekly_hours: the hours of each day, Monday first
+        :return: the parsed index
+        """
+        intervals = []
+        for day, hours in enumerate(weekly_hours):
+            for start, end in parse_day_hours(hours):
+                start, end = day * MINUTES_PER_DAY + start, day * MINUTES_PER_DAY + end
+                if end > MINUTES_PER_WEEK:
+                    intervals.append((0, end - MINUTES_PER_WEEK))
+                    end = MINUTES_PER_WEEK
+                intervals.append((start, end))
+
+        starts, ends = [], []
+        for start, end in sorted(intervals):
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+
+        return OpenHoursIndex(tuple(starts), tuple(ends))
+
+    def is_open_at(self, when: datetime | float) -> bool:
+        """
+        :param when: a date and time, or minutes since Monday 00:00
+        :return: whether the stop is open then
+        """
+        minute = minute_of_week(when) if isinstance(when, datetime) else when % MINUTES_PER_WEEK
+        i = bisect_right(self.starts, minute) - 1
+        return i >= 0 and minute < self.ends[i]
+
+    def minutes_until_open(self, when: datetime | float) -> float | None:
+        """
+        :param when: a date and time, or minutes since Monday 00:00
+        :return: minutes to wait until the stop opens, 0 if already open, None if it never opens
+        """
+        if not self.starts:
+            return None
+
+        minute = minute_of_week(when) if isinstance(when, datetime) else when % MINUTES_PER_WEEK
+        i = bisect_right(self.starts, minute)
+        if i > 0 and minute < self.ends[i - 1]:
+            return 0
+        if i < len(self.starts):
+            return self.starts[i] - minute
+
+        return self.starts[0] + MINUTES_PER_WEEK - minute
+
 
 @dataclass
 class OpenHours:
+    @property
+    def weekly_hours(self) -> tuple[str | None, ...]:
+        """
+        :return: the hours of each day, Monday first, None when closed
+        """
+        raise NotImplementedError('Subclasses must implement weekly_hours property')
+
     @property
     def open_hours(self):
         raise NotImplementedError('Subclasses must implement open_hours property')
 
+    @property
+    def index(self) -> OpenHoursIndex:
+        return OpenHoursIndex.from_weekly_hours(self.weekly_hours)
+
+    def day_hours(self, weekday: int) -> str | None:
+        return self.weekly_hours[weekday]
+
 
 @dataclass
 class WeeklyOpenHours(OpenHours):
@@ -26,14 +171,12 @@ class WeeklyOpenHours(OpenHours):
     sun: str | None = None
 
     @property
-    def open_hours(self):
-        ordered_days = [self.mon, self.tue, self.wed, self.thu, self.fri, self.sat, self.sun]
-        res = {}
-        for i, hours in enumerate(ordered_days):
-            if hours is not None:
-                res[i] = hours
+    def weekly_hours(self) -> tuple[str | None, ...]:
+        return self.mon, self.tue, self.wed, self.thu, self.fri, self.sat, self.sun
 
-        return res
+    @property
+    def open_hours(self):
+        return {i: hours for i, hours in enumerate(self.weekly_hours) if hours is not None}
 
 
 class FixedOpenHours(OpenHours):
@@ -44,17 +187,16 @@ class FixedOpenHours(OpenHours):
     def __init__(self, hours):
         self.hours = hours
 
+    @property
+    def weekly_hours(self) -> tuple[str | None, ...]:
+        return (self.hours,) * 7
+
     @property
     def open_hours(self):
-        return {
-            MONDAY: self.hours,
-            TUESDAY: self.hours,
-            WEDNESDAY: self.hours,
-            THURSDAY: self.hours,
-            FRIDAY: self.hours,
-            SATURDAY: self.hours,
-            SUNDAY: self.hours,
-        }
+        return dict.fromkeys(range(7), self.hours)
+
+    def day_hours(self, weekday: int) -> str | None:
+        return self.hours
 
 
 @dataclass
@@ -69,7 +211,37 @@ class RestStop:
     def hours(self):
         if self.arrival_date is None:
             raise ValueError("Arrival date is not set for this rest stop.")
-        return self.open_hours.open_hours.get(self.arrival_date.weekday(), "CLOSED")
+        hours = self.open_hours.day_hours(self.arrival_date.weekday())
+        return "CLOSED" if hours is None else hours
+
+    @property
+    def is_open(self) -> bool:
+        """
+        :return: whether the stop is open at the arrival date
+        """
+        if self.arrival_date is None:
+            raise ValueError("Arrival date is not set for this rest stop.")
+        return self.open_hours.index.is_open_at(self.arrival_date)
+
+    @property
+    def minutes_until_open(self) -> float | None:
+        """
+        :return: minutes to wait at the arrival date until the stop opens, 0 if open, None if it never opens
+        """
+        if self.arrival_date is None:
+            raise ValueError("Arrival date is not set for this rest stop.")
+        return self.open_hours.index.minutes_until_open(self.arrival_date)
+
+
+@dataclass(slots=True)
+class RestStopAvailability:
+    segment_index: int
+    split_index: int
+    rest_stop: RestStop
+    arrival_date: datetime
+    is_open: bool
+    minutes_until_open: float | None  # 0 when open, None when the stop never opens
+
 
 # TODO: Method to convert this to a RestDetailLine or RestOptionalDetailLine
 
@@ -0,0 +1,213 @@
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.RestStop import RestStop
+from Cycling.pace_calculator.Split import Split
+from Cycling.pace_calculator.SubSplitMode import SubSplitMode
+
+
+@dataclass
+class CandidateStop:
+    mile: float  # distance marker from the course start
+    rest_stop: RestStop
+
+
+@dataclass(slots=True)
+class _Node:
+    mile: float
+    rest_stop: RestStop | None
+    next_segment: int  # the segment of the splits starting at this node
+    segment_end: int | None = None  # the segment ending at this node, if any
+
+
+@dataclass(slots=True)
+class _Label:
+    node: int
+    segment: int  # the segment of the split ending at the node
+    arrival: datetime  # the end time of the split ending at the node, waits included
+    moving_speed: float  # the moving speed carried over to the next split
+    wait: timedelta
+    parent: '_Label | None'
+
+
+@dataclass
+class RestStopOptimizer:
+    """
+    Re-splits a course at candidate rest stops to minimize the total elapsed time,
+    while every chosen stop is open when its split ends.
+
+    The segments of the course are kept, with their settings and sleep times, but their splits are replaced:
+    a segment is split at the chosen candidates within it and always ends at its original end.
+    Waiting for a stop to open is modelled as the adjusted_time of the split ending at it.
+
+    The search is a dynamic program over the candidates in mile order. Each candidate keeps the Pareto front of
+    (arrival time, carried moving speed) labels: arriving earlier with a higher moving speed is never worse,
+    as long as unbounded waits are allowed. Otherwise an earlier arrival can find a later stop closed,
+    so up to beam_width labels are kept per candidate instead and the result is not guaranteed to be optimal.
+    """
+    course: Course
+    candidates: list[CandidateStop]
+    max_split_distance: float
+    min_split_distance: float = 0
+    allow_waits: bool = False
+    max_wait: timedelta | None = None  # only used when allow_waits is set, None for unbounded waits
+    sub_split_mode: SubSplitMode | None = None  # defaults to the mode of the first split of each segment
+    beam_width: int = 8
+
+    def optimize(self) -> Course:
+        """
+        :return: a copy of the course, split at the chosen stops
+        """
+        nodes = self.__nodes()
+        labels: list[list[_Label]] = [[] for _ in nodes]
+        labels[0].append(_Label(0, -1, self.course.start_time, self.course.init_moving_speed, timedelta(0), None))
+
+        for a, node in enumerate(nodes):
+            labels[a] = self.__prune(labels[a])
+            if node.next_segment == len(self.course.segments):
+                continue
+
+            segment = self.course.segments[node.next_segment]
+
+            for label in labels[a]:
+                start_time = label.arrival
+                moving_speed = label.moving_speed
+                if node.segment_end is not None or a == 0:
+                    if node.segment_end is not None:
+                        start_time += self.course.segments[node.segment_end].sleep_time
+                    if segment.moving_speed is not None:
+                        moving_speed = segment.moving_speed
+
+                for b in range(a + 1, len(nodes)):
+                    distance = nodes[b].mile - node.mile
+                    if distance > self.max_split_distance:
+                        break
+                    if distance > 0 and distance >= self.min_split_distance:
+                        arrival = self.__arrive(b, nodes[b], node.next_segment, start_time, moving_speed, distance,
+                                                label)
+                        if arrival is not None:
+                            labels[b].append(arrival)
+                    if nodes[b].segment_end is not None:
+                        # a split never spans two segments
+                        break
+
+        if not labels[-1]:
+            raise ValueError("No schedule keeps every chosen rest stop open within the given split distances.")
+
+        return self.__build_course(nodes, min(labels[-1], key=lambda _l: (_l.arrival, -_l.moving_speed)))
+
+    def __nodes(self) -> list[_Node]:
+        nodes = [_Node(mile=0, rest_stop=None, next_segment=0)]
+        segment_start = 0
+        candidates = sorted(self.candidates, key=lambda _c: _c.mile)
+        total_distance = sum(split.distance for segment in self.course.segments for split in segment.splits)
+        if any(not 0 < candidate.mile <= total_distance for candidate in candidates):
+            raise ValueError(f"Candidate stops must lie within the course, between 0 and {total_distance} miles.")
+
+        c = 0
+        for s, segment in enumerate(self.course.segments):
+            segment_end = segment_start + sum(split.distance for split in segment.splits)
+            if segment_end <= segment_start:
+                raise ValueError("Every segment of the course must have a positive distance.")
+
+            while c < len(candidates) and candidates[c].mile < segment_end:
+                nodes.append(_Node(mile=candidates[c].mile, rest_stop=candidates[c].rest_stop, next_segment=s))
+                c += 1
+
+            # a candidate at the very end of the segment is the stop of its last split
+            rest_stop = None
+            while c < len(candidates) and candidates[c].mile == segment_end:
+                rest_stop = candidates[c].rest_stop
+                c += 1
+            nodes.append(_Node(mile=segment_end, rest_stop=rest_stop, next_segment=s + 1, segment_end=s))
+            segment_start = segment_end
+
+        return nodes
+
+    def __arrive(self,
+                 b: int,
+                 node: _Node,
+                 s: int,
+                 start_time: datetime,
+                 moving_speed: float,
+                 distance: float,
+                 label: _Label) -> _Label | None:
+        # mirrors Course.compute_split_detail, so the built course reproduces the same times
+        segment = self.course.segments[s]
+        moving_time = timedelta(hours=distance / moving_speed)
+        down_time_ratio = self.course.down_time_ratio if segment.down_time_ratio is None else segment.down_time_ratio
+        down_time = moving_time * down_time_ratio
+        if node.segment_end is not None and segment.no_end_down_time:
+            down_time = timedelta(hours=0)
+
+        arrival = start_time + (moving_time + down_time)
+        wait = timedelta(0)
+        if node.rest_stop is not None:
+            index = node.rest_stop.open_hours.index
+            minutes_until_open = index.minutes_until_open(arrival)
+            if minutes_until_open is None or (minutes_until_open and not self.allow_waits):
+                return None
+
+            if minutes_until_open:
+                # stops open on the minute, so waiting exactly until then keeps earlier arrivals never worse
+                opening = (arrival + timedelta(minutes=minutes_until_open, seconds=30)).replace(second=0,
+                                                                                               microsecond=0)
+                wait = opening - arrival
+                if self.max_wait is not None and wait > self.max_wait:
+                    return None
+
+        min_moving_speed = self.course.min_moving_speed if segment.min_moving_speed is None \
+            else segment.min_moving_speed
+
+        return _Label(
+            node=b,
+            segment=s,
+            arrival=arrival + wait,
+            moving_speed=max(moving_speed - self.course.split_decay, min_moving_speed),
+            wait=wait,
+            parent=label
+        )
+
+    def __prune(self, labels: list[_Label]) -> list[_Label]:
+        labels.sort(key=lambda _l: (_l.arrival, -_l.moving_speed))
+        if not self.allow_waits or self.max_wait is not None:
+            res = []
+            for label in labels:
+                if not res or (label.arrival, label.moving_speed) != (res[-1].arrival, res[-1].moving_speed):
+                    res.append(label)
+                if len(res) == self.beam_width:
+                    break
+            return res
+
+        res = []
+        for label in labels:
+            if not res or label.moving_speed > res[-1].moving_speed:
+                res.append(label)
+
+        return res
+
+    def __build_course(self, nodes: list[_Node], label: _Label) -> Course:
+        path: list[_Label] = []
+        while label.parent is not None:
+            path.append(label)
+            label = label.parent
+        path.reverse()
+
+        splits: list[list[Split]] = [[] for _ in self.course.segments]
+        start_mile = 0
+        for label in path:
+            node = nodes[label.node]
+            template = self.course.segments[label.segment]
+            sub_split_mode = self.sub_split_mode or template.splits[0].sub_split_mode
+            splits[label.segment].append(Split(
+                distance=node.mile - start_mile,
+                sub_split_mode=sub_split_mode,
+                rest_stop=None if node.rest_stop is None else replace(node.rest_stop, arrival_date=None),
+                adjusted_time=label.wait,
+            ))
+            start_mile = node.mile
+
+        return replace(self.course,
+                       segments=[replace(segment, splits=segment_splits)
+                                 for segment, segment_splits in zip(self.course.segments, splits)])
@@ -0,0 +1,252 @@
+import hashlib
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from Cycling.pace_calculator.Course import ENGINE_VERSION, Course
+from Cycling.pace_calculator.CourseDetail import CourseDetail
+from Cycling.pace_calculator.RestStop import RestStop
+from Cycling.pace_calculator.Segment import Segment
+from Cycling.pace_calculator.SegmentDetail import SegmentDetail
+from Cycling.pace_calculator.Split import Split
+from Cycling.pace_calculator.SubSplitMode import CustomSubSplitMode, EvenSubSplitMode, FixedDistanceSubSplitMode
+
+# fixed so that keys written to the disk tier stay valid across Python versions
+_KEY_PICKLE_PROTOCOL = 5
+
+
+def _rest_stop_key(rest_stop: RestStop | None) -> tuple | None:
+    if rest_stop is None:
+        return None
+    # arrival_date is an output, it is set on the rest stop when the course is computed
+    return rest_stop.name, rest_stop.open_hours.weekly_hours, rest_stop.address, rest_stop.alt
+
+
+def _sub_split_mode_key(mode) -> tuple:
+    if isinstance(mode, EvenSubSplitMode):
+        return 'even', mode.sub_split_count
+    if isinstance(mode, FixedDistanceSubSplitMode):
+        return 'fixed_distance', mode.sub_split_distance, mode.last_sub_split_threshold
+    if isinstance(mode, CustomSubSplitMode):
+        return 'custom', tuple(mode.sub_split_distances)
+    raise ValueError(f"Unsupported sub-split mode: {type(mode).__name__}.")
+
+
+def _split_key(split: Split) -> tuple:
+    return (split.distance, _sub_split_mode_key(split.sub_split_mode), _rest_stop_key(split.rest_stop),
+            split.down_time, split.moving_speed, split.adjusted_time)
+
+
+def _segment_key(segment: Segment) -> tuple:
+    return (segment.down_time_ratio, segment.split_decay, segment.moving_speed, segment.min_moving_speed,
+            segment.sleep_time, segment.no_end_down_time, tuple(_split_key(split) for split in segment.splits))
+
+
+def course_keys(course: Course, digests: dict[tuple[bytes, tuple], bytes] | None = None) -> list[str]:
+    """
+    Chained content hashes of a course: the first covers the engine version and the course-level inputs,
+    the k-th also covers the first k segments. The last one is the key of the whole course.
+    Segments only depend on what comes before them, so equal keys mean equal segment details.
+    The inputs are hashed through their pickle, which is much cheaper than their repr; equal inputs sharing objects
+    differently may get different keys, which only costs a cache miss.
+
+    :param course: the course
+    :param digests: optional memo of the digest of every (previous digest, segment inputs) pair, filled as segments
+                    are hashed; segments found in it are not pickled and hashed again
+    :return: hex digests, one more than there are segments
+    """
+    head = (ENGINE_VERSION, course.init_moving_speed, course.min_moving_speed, course.down_time_ratio,
+            course.split_decay, course.start_time)
+    digest = hashlib.blake2b(pickle.dumps(head, protocol=_KEY_PICKLE_PROTOCOL), digest_size=16).digest()
+    res = [digest.hex()]
+    for segment in course.segments:
+        segment_key = _segment_key(segment)
+        previous, digest = digest, None if digests is None else digests.get((digest, segment_key))
+        if digest is None:
+            digest = hashlib.blake2b(previous + pickle.dumps(segment_key, protocol=_KEY_PICKLE_PROTOCOL),
+                                     digest_size=16).digest()
+            if digests is not None:
+                digests[previous, segment_key] = digest
+        res.append(digest.hex())
+
+    return res
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    partial_hits: int = 0  # some leading segments were cached
+    misses: int = 0
+    disk_hits: int = 0  # segments read back from the disk tier
+
+
+@dataclass
+class ResultCache:
+    """
+    Caches Course.compute_course_details results by the content hash of the course inputs, see course_keys.
+
+    The memory tier is an LRU of up to max_entries results and segment details; a repeated request for an identical
+    course is answered from it without any computation. The optional disk tier is a SQLite file of segment details,
+    evicted least recently used first once it grows over max_disk_bytes.
+    When only the leading segments of a course are cached, they are reused and only the remaining ones are computed.
+
+    Cached details are shared between the requests they answer, so they must be treated as read-only. Their
+    rest_stop attributes are the rest stops of the course they were computed for; the rest stops of every requesting
+    course still get their arrival_date, as when the course is computed.
+
+    The keys of recently requested segments are memoized by their inputs, so requesting a course again only walks
+    its inputs instead of pickling and hashing them.
+    """
+    path: str | None = None  # the SQLite file of the disk tier, None to only cache in memory
+    max_entries: int = 1024
+    max_disk_bytes: int = 256 * 1024 * 1024
+    stats: CacheStats = field(default_factory=CacheStats)
+
+    def __post_init__(self):
+        self.__memory: OrderedDict[str, CourseDetail | SegmentDetail] = OrderedDict()
+        self.__digests: OrderedDict[tuple[bytes, tuple], bytes] = OrderedDict()
+        self.__connection: sqlite3.Connection | None = None
+        if self.path is not None:
+            self.__connection = sqlite3.connect(self.path)
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS segment_details '
+                                      '(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, '
+                                      'accessed REAL NOT NULL)')
+            self.__connection.execute('CREATE INDEX IF NOT EXISTS segment_details_accessed '
+                                      'ON segment_details (accessed)')
+            self.__connection.commit()
+
+    def compute_course_details(self, course: Course) -> CourseDetail:
+        """
+        :param course: the course to compute
+        :return: the details of the course, from the cache when possible
+        """
+        keys = course_keys(course, self.__digests)
+        # segments of the memo beyond the memory tier size are evicted oldest first
+        while len(self.__digests) > self.max_entries:
+            self.__digests.popitem(last=False)
+
+        course_key = f'course:{keys[-1]}'
+        res = self.__memory_get(course_key)
+        if res is not None:
+            self.stats.hits += 1
+            self.__bind_rest_stops(course, res)
+            return res
+
+        segment_keys = [f'segment:{key}' for key in keys[1:]]
+        segment_details = self.__cached_prefix(segment_keys)
+        if len(segment_details) == len(segment_keys):
+            self.stats.hits += 1
+        elif segment_details:
+            self.stats.partial_hits += 1
+        else:
+            self.stats.misses += 1
+
+        cached = len(segment_details)
+        res = course.compute_course_details(segment_details)
+
+        new_segments = list(zip(segment_keys[cached:], res.segment_details[cached:]))
+        for key, segment_detail in new_segments:
+            self.__memory_put(key, segment_detail)
+        self.__memory_put(course_key, res)
+        self.__disk_put(new_segments)
+
+        if cached:
+            self.__bind_rest_stops(course, res)
+        return res
+
+    def clear(self):
+        self.__memory.clear()
+        self.__digests.clear()
+        if self.__connection is not None:
+            self.__connection.execute('DELETE FROM segment_details')
+            self.__connection.commit()
+
+    def close(self):
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+    @staticmethod
+    def __bind_rest_stops(course: Course, course_detail: CourseDetail):
+        # cached split details point at the rest stops of the course they were computed for
+        for segment, segment_detail in zip(course.segments, course_detail.segment_details):
+            for split, split_detail in zip(segment.splits, segment_detail.split_details):
+                if split.rest_stop is not None:
+                    split.rest_stop.arrival_date = split_detail.end_time
+
+    def __memory_get(self, key: str):
+        res = self.__memory.get(key)
+        if res is not None:
+            self.__memory.move_to_end(key)
+        return res
+
+    def __memory_put(self, key: str, value: CourseDetail | SegmentDetail):
+        self.__memory[key] = value
+        self.__memory.move_to_end(key)
+        while len(self.__memory) > self.max_entries:
+            self.__memory.popitem(last=False)
+
+    def __cached_prefix(self, segment_keys: list[str]) -> list[SegmentDetail]:
+        res = []
+        for key in segment_keys:
+            segment_detail = self.__memory_get(key)
+            if segment_detail is None:
+                break
+            res.append(segment_detail)
+
+        missing = segment_keys[len(res):]
+        if self.__connection is None or not missing:
+            return res
+
+        # a key covers every segment before it, so the longest cached prefix is read in one query
+        on_disk = {}
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            rows = self.__connection.execute(
+                f"SELECT key, value FROM segment_details WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            on_disk.update(rows)
+
+        hits = []
+        for key in missing:
+            if key not in on_disk:
+                break
+            segment_detail = pickle.loads(on_disk[key])
+            self.__memory_put(key, segment_detail)
+            res.append(segment_detail)
+            hits.append(key)
+
+        if hits:
+            self.stats.disk_hits += len(hits)
+            self.__connection.executemany('UPDATE segment_details SET accessed = ? WHERE key = ?',
+                                          [(time.time(), key) for key in hits])
+            self.__connection.commit()
+
+        return res
+
+    def __disk_put(self, segments: list[tuple[str, SegmentDetail]]):
+        if self.__connection is None or not segments:
+            return
+
+        now = time.time()
+        rows = []
+        for key, segment_detail in segments:
+            value = pickle.dumps(segment_detail, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((key, value, len(value), now))
+        self.__connection.executemany('INSERT OR REPLACE INTO segment_details VALUES (?, ?, ?, ?)', rows)
+        self.__evict()
+        self.__connection.commit()
+
+    def __evict(self):
+        total_size = self.__connection.execute('SELECT COALESCE(SUM(size), 0) FROM segment_details').fetchone()[0]
+        if total_size <= self.max_disk_bytes:
+            return
+
+        evicted = []
+        for key, size in self.__connection.execute('SELECT key, size FROM segment_details ORDER BY accessed'):
+            if total_size <= self.max_disk_bytes:
+                break
+            evicted.append((key,))
+            total_size -= size
+        self.__connection.executemany('DELETE FROM segment_details WHERE key = ?', evicted)
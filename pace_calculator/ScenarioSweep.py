@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.VectorizedCourseCalculator import CourseArrays, VectorizedCourseCalculator
+
+
+@dataclass
+class SweepResult:
+    """
+    Columnar result of a scenario sweep, one row per parameter combination.
+    Times are stored as seconds.
+    """
+    start_time: datetime
+    init_moving_speeds: np.ndarray
+    split_decays: np.ndarray
+    down_time_ratios: np.ndarray
+    end_offsets: np.ndarray  # elapsed seconds from the course start, sleep time included
+    total_moving_times: np.ndarray  # elapsed seconds of the segments, as CourseDetail.total_moving_time
+    total_down_times: np.ndarray
+    paces: np.ndarray  # distance travelled per elapsed hour
+
+    def __len__(self):
+        return len(self.end_offsets)
+
+    @property
+    def end_times(self) -> np.ndarray:
+        return np.datetime64(self.start_time, 'us') + (self.end_offsets * 1e6).astype('timedelta64[us]')
+
+    def end_time(self, i: int) -> datetime:
+        return self.start_time + timedelta(seconds=float(self.end_offsets[i]))
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """
+        :return: the result as named columns, e.g. for CourseDetailExporter.write_csv or write_parquet
+        """
+        return {
+            'init_moving_speed': self.init_moving_speeds,
+            'split_decay': self.split_decays,
+            'down_time_ratio': self.down_time_ratios,
+            'end_time': self.end_times,
+            'total_moving_time': self.total_moving_times,
+            'total_down_time': self.total_down_times,
+            'pace': self.paces,
+        }
+
+    def scenario(self, i: int) -> dict[str, float]:
+        return {
+            'init_moving_speed': float(self.init_moving_speeds[i]),
+            'split_decay': float(self.split_decays[i]),
+            'down_time_ratio': float(self.down_time_ratios[i]),
+        }
+
+
+@dataclass
+class ScenarioSweep:
+    """
+    Evaluates a grid of init_moving_speed, split_decay and down_time_ratio values over one Course template.
+    The grid is evaluated in batches of rows, without building a CourseDetail per combination.
+    """
+    course: Course
+    max_batch_size: int = 1_000_000  # upper bound of split values computed per batch
+
+    def sweep(self,
+              init_moving_speeds: list[float] | np.ndarray | None = None,
+              split_decays: list[float] | np.ndarray | None = None,
+              down_time_ratios: list[float] | np.ndarray | None = None) -> SweepResult:
+        """
+        Evaluates every combination of the given parameter values.
+        Parameters that are not supplied keep the course's value.
+
+        :param init_moving_speeds: candidate initial moving speeds
+        :param split_decays: candidate speed decays per split
+        :param down_time_ratios: candidate course down time ratios
+        :return: a SweepResult with one row per combination
+        """
+        axes = [
+            self.course.init_moving_speed if init_moving_speeds is None else init_moving_speeds,
+            self.course.split_decay if split_decays is None else split_decays,
+            self.course.down_time_ratio if down_time_ratios is None else down_time_ratios,
+        ]
+        grid = np.meshgrid(*(np.atleast_1d(np.asarray(axis, dtype=float)) for axis in axes), indexing='ij')
+        return self.evaluate(*(values.ravel() for values in grid))
+
+    def evaluate(self,
+                 init_moving_speeds: np.ndarray,
+                 split_decays: np.ndarray,
+                 down_time_ratios: np.ndarray) -> SweepResult:
+        """
+        Evaluates explicit scenarios, where the i-th scenario is made of the i-th value of each array.
+        Scalars are broadcast against the arrays, so e.g. a single down time ratio can be shared by every scenario.
+
+        :param init_moving_speeds: initial moving speed per scenario
+        :param split_decays: speed decay per split per scenario
+        :param down_time_ratios: course down time ratio per scenario
+        :return: a SweepResult with one row per scenario
+        """
+        init_moving_speeds, split_decays, down_time_ratios = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(init_moving_speeds, dtype=float)),
+            np.atleast_1d(np.asarray(split_decays, dtype=float)),
+            np.atleast_1d(np.asarray(down_time_ratios, dtype=float))
+        )
+        arrays = CourseArrays.from_course(self.course)
+        scenario_count = len(init_moving_speeds)
+
+        total_distance = float(np.sum(arrays.distances))
+        total_sleep_time = float(np.sum(arrays.sleep_times))
+        end_offsets = np.empty(scenario_count)
+        total_moving_times = np.empty(scenario_count)
+        total_down_times = np.empty(scenario_count)
+
+        batch_size = max(1, self.max_batch_size // max(1, arrays.split_count))
+        for start in range(0, scenario_count, batch_size):
+            batch = slice(start, start + batch_size)
+            moving_speeds = VectorizedCourseCalculator.compute_moving_speeds(arrays,
+                                                                             init_moving_speeds[batch],
+                                                                             split_decays[batch])
+            _, down_times, total_times = VectorizedCourseCalculator.compute_split_times(
+                arrays, moving_speeds, down_time_ratios[batch]
+            )
+            # as Course.compute_totals, the moving total is the elapsed time of the segments, sleep time excluded
+            total_moving_times[batch] = total_times.sum(axis=-1)
+            total_down_times[batch] = down_times.sum(axis=-1)
+            end_offsets[batch] = total_moving_times[batch] + total_sleep_time
+
+        return SweepResult(
+            start_time=self.course.start_time,
+            init_moving_speeds=init_moving_speeds.copy(),
+            split_decays=split_decays.copy(),
+            down_time_ratios=down_time_ratios.copy(),
+            end_offsets=end_offsets,
+            total_moving_times=total_moving_times,
+            total_down_times=total_down_times,
+            paces=total_distance / (end_offsets / 3600),
+        )
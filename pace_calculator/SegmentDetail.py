@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 from Cycling.pace_calculator.SplitDetail import SplitDetail
 
 
-@dataclass
+@dataclass(slots=True)
 class SegmentDetail:
     split_details: list[SplitDetail]
     start_time: datetime
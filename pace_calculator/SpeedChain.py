@@ -0,0 +1,125 @@
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class SpeedChain:
+    """
+    Closed-form evaluation of the moving speed decay chain shared by the pace calculators:
+    speed[i] = max(speed[i - 1] - split_decay, min_moving_speed[i - 1]), restarted by moving speed overrides.
+
+    Within a run of splits with the same floor, the k-th split after the run start is max(v0 - split_decay * k, floor),
+    so the chain is filled range by range between override and floor change points instead of split by split.
+    The closed form needs split_decay >= 0: a negative decay lets a speed below the floor climb back from it, so such
+    chains are evaluated split by split.
+    The closed form can differ from the split by split chain in the last bits of a speed, as v0 - split_decay * k is
+    not rounded as k successive subtractions are.
+    """
+
+    @staticmethod
+    def compute(init_moving_speed: float | np.ndarray,
+                split_decay: float | np.ndarray,
+                overrides: np.ndarray,
+                min_moving_speeds: np.ndarray,
+                overrides_reset: bool = True) -> np.ndarray:
+        """
+        Computes the moving speed of every split.
+        init_moving_speed and split_decay can be arrays of scenarios, in which case one row is computed per scenario.
+
+        :param init_moving_speed: the moving speed of the first split
+        :param split_decay: how much speed drops from one split to the next
+        :param overrides: the moving speed override of every split, NaN when not defined
+        :param min_moving_speeds: the floor applied when decaying from each split into the next
+        :param overrides_reset: if True, the chain restarts from an override (Course);
+                                otherwise overridden splits are skipped by the chain (SubDistancePaceCalculator)
+        :return: array of moving speeds, shaped (..., split count)
+        """
+        overrides = np.asarray(overrides, dtype=float)
+        min_moving_speeds = np.asarray(min_moving_speeds, dtype=float)
+        init_moving_speed = np.asarray(init_moving_speed, dtype=float)[..., np.newaxis]
+        split_decay = np.asarray(split_decay, dtype=float)[..., np.newaxis]
+        n = len(overrides)
+        res = np.empty(np.broadcast_shapes(init_moving_speed.shape, split_decay.shape)[:-1] + (n,))
+        if n == 0:
+            return res
+
+        is_override = ~np.isnan(overrides)
+        sequential = bool(np.any(split_decay < 0))
+        if not overrides_reset:
+            chained = np.flatnonzero(~is_override)
+            res[..., is_override] = overrides[is_override]
+            res[..., chained] = SpeedChain.compute(init_moving_speed[..., 0], split_decay[..., 0],
+                                                   np.full(len(chained), np.nan), min_moving_speeds[chained])
+            return res
+
+        # a run restarts at every override and wherever the floor changes
+        run_starts = is_override.copy()
+        run_starts[0] = True
+        run_starts[2:] |= min_moving_speeds[1:-1] != min_moving_speeds[:-2]
+        bounds = np.append(np.flatnonzero(run_starts), n)
+
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if is_override[start]:
+                res[..., start] = overrides[start]
+            elif start == 0:
+                res[..., start] = init_moving_speed[..., 0]
+            else:
+                res[..., start] = np.maximum(res[..., start - 1] - split_decay[..., 0], min_moving_speeds[start - 1])
+
+            if end - start > 1 and sequential:
+                for i in range(start + 1, end):
+                    res[..., i] = np.maximum(res[..., i - 1] - split_decay[..., 0], min_moving_speeds[start])
+            elif end - start > 1:
+                steps = split_decay * np.arange(1, end - start)
+                np.maximum(res[..., start, np.newaxis] - steps, min_moving_speeds[start], out=res[..., start + 1:end])
+
+        return res
+
+    @staticmethod
+    def stream(init_moving_speed: float,
+               split_decay: float,
+               constraints: Iterable[tuple[float | None, float]]) -> Iterator[float]:
+        """
+        Streams the moving speed of every split, one split at a time and in constant memory.
+        Runs are evaluated as compute (with overrides_reset) evaluates them, so both agree exactly.
+
+        :param init_moving_speed: the moving speed of the first split
+        :param split_decay: how much speed drops from one split to the next
+        :param constraints: the moving speed override of every split (None when not defined), paired with
+                            the floor applied when decaying from the split into the next
+        :return: iterator of moving speeds
+        """
+        moving_speed = run_speed = run_floor = prev_floor = prev_prev_floor = None
+        steps = 0
+        for i, (override, min_moving_speed) in enumerate(constraints):
+            # a run restarts at every override and wherever the floor changes, as in compute
+            if i == 0 or override is not None or (i > 1 and prev_floor != prev_prev_floor):
+                if override is not None:
+                    moving_speed = override
+                elif i == 0:
+                    moving_speed = init_moving_speed
+                else:
+                    moving_speed = max(moving_speed - split_decay, prev_floor)
+                run_speed, run_floor, steps = moving_speed, min_moving_speed, 0
+            elif split_decay < 0:
+                moving_speed = max(moving_speed - split_decay, run_floor)
+            else:
+                steps += 1
+                moving_speed = max(run_speed - split_decay * steps, run_floor)
+
+            prev_prev_floor, prev_floor = prev_floor, min_moving_speed
+            yield moving_speed
+
+    @staticmethod
+    def moving_time_offsets(distances: np.ndarray, moving_speeds: np.ndarray) -> np.ndarray:
+        """
+        :param distances: the distance of every split
+        :param moving_speeds: moving speeds as returned by compute
+        :return: prefix sums of moving hours, shaped (..., split count + 1) and starting at 0
+        """
+        moving_times = np.asarray(distances, dtype=float) / moving_speeds
+        res = np.zeros(moving_times.shape[:-1] + (moving_times.shape[-1] + 1,))
+        np.cumsum(moving_times, axis=-1, out=res[..., 1:])
+        return res
@@ -17,5 +17,9 @@ class Split:
     adjusted_time: timedelta = timedelta(hours=0)
 
     @property
-    def sub_split_distances(self):
+    def sub_split_distances(self) -> tuple[float, ...]:
         return self.sub_split_mode.sub_splits(self.distance)
+
+    @property
+    def sub_split_offsets(self) -> tuple[float, ...]:
+        return self.sub_split_mode.offsets(self.distance)
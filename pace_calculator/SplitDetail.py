@@ -1,10 +1,12 @@
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 from Cycling.pace_calculator.RestStop import RestStop
 
 
-@dataclass
+@dataclass(slots=True)
 class SubSplitDetail:
     distance: float
     start_time: datetime
@@ -22,9 +24,9 @@ class SubSplitDetail:
         return self.start_distance, self.distance
 
 
-@dataclass
+@dataclass(slots=True)
 class SplitDetail(SubSplitDetail):
-    sub_splits: list[SubSplitDetail]
+    sub_splits: Sequence[SubSplitDetail]  # computed lazily by Course, see LazySubSplits
     adjustment_start: datetime  # represents when adjustment time starts
     adjustment_time: timedelta
     rest_stop: RestStop | None = None
@@ -32,3 +34,139 @@ class SplitDetail(SubSplitDetail):
     def __post_init__(self):
         if self.rest_stop is not None:
             self.rest_stop.arrival_date = self.end_time
+
+
+class SubSplitTable(Sequence):
+    """
+    Struct-of-arrays storage for the sub-splits of a split.
+    Times are stored as seconds since the split start and converted to datetime/timedelta only when a view is read.
+    """
+    __slots__ = ('start_time', 'start_distance', 'moving_speed', 'down_time', 'distances', 'moving_times',
+                 'start_offsets', 'distance_offsets')
+
+    def __init__(self,
+                 start_time: datetime,
+                 start_distance: float,
+                 moving_speed: float,
+                 down_time: float,
+                 distances: array,
+                 moving_times: array,
+                 start_offsets: array,
+                 distance_offsets: array):
+        """
+        :param start_time: when the split starts
+        :param start_distance: the distance marker where the split starts
+        :param moving_speed: the moving speed shared by every sub-split
+        :param down_time: the down time of each sub-split, in seconds
+        :param distances: the distance of each sub-split
+        :param moving_times: the moving time of each sub-split, in seconds
+        :param start_offsets: seconds from the split start to each sub-split start, plus the split end
+        :param distance_offsets: distance from the split start to each sub-split start
+        """
+        self.start_time = start_time
+        self.start_distance = start_distance
+        self.moving_speed = moving_speed
+        self.down_time = down_time
+        self.distances = distances
+        self.moving_times = moving_times
+        self.start_offsets = start_offsets
+        self.distance_offsets = distance_offsets
+
+    def shift(self, time_shift: timedelta, distance_shift: float = 0):
+        self.start_time += time_shift
+        self.start_distance += distance_shift
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SubSplitView(self, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('sub-split index out of range')
+        return SubSplitView(self, index)
+
+    def __len__(self):
+        return len(self.distances)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class SubSplitView:
+    """
+    Read-only view of a single row of a SubSplitTable, exposing the SubSplitDetail attributes.
+    """
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table: SubSplitTable, index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def distance(self) -> float:
+        return self.table.distances[self.index]
+
+    @property
+    def start_time(self) -> datetime:
+        return self.table.start_time + timedelta(seconds=self.table.start_offsets[self.index])
+
+    @property
+    def end_time(self) -> datetime:
+        return self.table.start_time + timedelta(seconds=self.table.start_offsets[self.index + 1])
+
+    @property
+    def moving_speed(self) -> float:
+        return self.table.moving_speed
+
+    @property
+    def moving_time(self) -> timedelta:
+        return timedelta(seconds=self.table.moving_times[self.index])
+
+    @property
+    def down_time(self) -> timedelta:
+        return timedelta(seconds=self.table.down_time)
+
+    @property
+    def split_time(self) -> timedelta:
+        return timedelta(seconds=self.table.moving_times[self.index] + self.table.down_time)
+
+    @property
+    def total_time(self) -> timedelta:
+        # equal to split time because sub-splits do not consider adjusted time
+        return self.split_time
+
+    @property
+    def pace(self) -> float:
+        return self.distance / ((self.table.moving_times[self.index] + self.table.down_time) / 3600)
+
+    @property
+    def start_distance(self) -> float:
+        return self.table.start_distance + self.table.distance_offsets[self.index]
+
+    @property
+    def span(self) -> tuple[float, float]:
+        return self.start_distance, self.distance
+
+    def to_detail(self) -> SubSplitDetail:
+        return SubSplitDetail(
+            distance=self.distance,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            moving_speed=self.moving_speed,
+            moving_time=self.moving_time,
+            down_time=self.down_time,
+            split_time=self.split_time,
+            total_time=self.total_time,
+            pace=self.pace,
+            start_distance=self.start_distance
+        )
+
+    def __eq__(self, other):
+        if isinstance(other, SubSplitView):
+            other = other.to_detail()
+        if not isinstance(other, SubSplitDetail):
+            return NotImplemented
+        return self.to_detail() == other
+
+    def __repr__(self):
+        return repr(self.to_detail())
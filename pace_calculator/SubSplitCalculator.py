@@ -1,8 +1,11 @@
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from itertools import accumulate
 
 from Cycling.pace_calculator.Split import Split
-from Cycling.pace_calculator.SplitDetail import SubSplitDetail
+from Cycling.pace_calculator.SplitDetail import SubSplitDetail, SubSplitTable
 
 
 @dataclass
@@ -16,6 +19,14 @@ class SubSplitCalculator:
                               moving_speed: float):
         pass
 
+    @staticmethod
+    def get_sub_split_table(split: Split,
+                            start_distance: float,
+                            start_time: datetime,
+                            down_time: timedelta,
+                            moving_speed: float) -> SubSplitTable:
+        pass
+
 
 @dataclass
 class SubSplitCalculatorV1(SubSplitCalculator):
@@ -55,3 +66,103 @@ class SubSplitCalculatorV1(SubSplitCalculator):
 
             res.append(sub_split_detail)
         return res
+
+    @staticmethod
+    def get_sub_split_table(split: Split,
+                            start_distance: float,
+                            start_time: datetime,
+                            down_time: timedelta,
+                            moving_speed: float) -> SubSplitTable:
+        """
+        Same breakdown as get_sub_split_details, stored as a compact SubSplitTable.
+        """
+        partition = split.sub_split_mode.partition(split.distance)
+        distances = array('d', partition.distances)
+        # times are rounded to microseconds like their timedelta counterparts in get_sub_split_details
+        moving_times = array('d', [timedelta(hours=distance / moving_speed).total_seconds() for distance in distances])
+        sub_split_down_time = (down_time / len(distances)).total_seconds()
+
+        return SubSplitTable(
+            start_time=start_time,
+            start_distance=start_distance,
+            moving_speed=moving_speed,
+            down_time=sub_split_down_time,
+            distances=distances,
+            moving_times=moving_times,
+            start_offsets=array('d', accumulate((t + sub_split_down_time for t in moving_times), initial=0)),
+            distance_offsets=array('d', partition.offsets)
+        )
+
+
+class LazySubSplits(Sequence):
+    __slots__ = ('split', 'start_distance', 'start_time', 'down_time', 'moving_speed', 'calculator', '__sub_splits')
+
+    def __init__(self,
+                 split: Split,
+                 start_distance: float,
+                 start_time: datetime,
+                 down_time: timedelta,
+                 moving_speed: float,
+                 calculator: type[SubSplitCalculator] = SubSplitCalculatorV1):
+        """
+        Sequence of the sub-split details of a split, computed on first access.
+        Sub-splits are stored in a SubSplitTable and read through SubSplitView objects.
+
+        :param split: the split to break down
+        :param start_distance: the distance marker where the split starts
+        :param start_time: when the split starts
+        :param down_time: the down time of the split
+        :param moving_speed: the moving speed of the split
+        :param calculator: the SubSplitCalculator used to compute the sub-splits
+        """
+        self.split = split
+        self.start_distance = start_distance
+        self.start_time = start_time
+        self.down_time = down_time
+        self.moving_speed = moving_speed
+        self.calculator = calculator
+        self.__sub_splits: SubSplitTable | None = None
+
+    @property
+    def is_materialized(self) -> bool:
+        return self.__sub_splits is not None
+
+    def shift(self, time_shift: timedelta, distance_shift: float = 0):
+        """
+        Shifts the sub-splits in time and distance without materializing them.
+
+        :param time_shift: how much later the split starts
+        :param distance_shift: how much further the split starts
+        """
+        self.start_time += time_shift
+        self.start_distance += distance_shift
+        if self.__sub_splits is not None:
+            self.__sub_splits.shift(time_shift, distance_shift)
+
+    def __materialize(self) -> SubSplitTable:
+        if self.__sub_splits is None:
+            self.__sub_splits = self.calculator.get_sub_split_table(
+                split=self.split,
+                start_distance=self.start_distance,
+                start_time=self.start_time,
+                down_time=self.down_time,
+                moving_speed=self.moving_speed
+            )
+        return self.__sub_splits
+
+    def __getitem__(self, index):
+        return self.__materialize()[index]
+
+    def __len__(self):
+        return len(self.__materialize())
+
+    def __iter__(self):
+        return iter(self.__materialize())
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(self.__materialize())
@@ -1,18 +1,80 @@
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
+
+# partitions are shared by every split of the same distance and mode parameters, e.g. across sweep scenarios
+PARTITION_CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True, slots=True)
+class SubSplitPartition:
+    distances: tuple[float, ...]
+    offsets: tuple[float, ...]  # distance from the split start to each sub-split start, plus the split end
+
+    @staticmethod
+    def of(distances) -> 'SubSplitPartition':
+        distances = tuple(distances)
+        return SubSplitPartition(distances, tuple(accumulate(distances, initial=0)))
 
 
 @dataclass
 class SubSplitMode:
-    def sub_splits(self, distance: float) -> list[float]:
+    def sub_splits(self, distance: float) -> tuple[float, ...]:
         pass
 
+    def partition(self, distance: float) -> SubSplitPartition:
+        """
+        :param distance: the distance of the split
+        :return: the sub-split distances and their cumulative offsets
+        """
+        return SubSplitPartition.of(self.sub_splits(distance))
+
+    def count(self, distance: float) -> int:
+        return len(self.partition(distance).distances)
+
+    def offsets(self, distance: float) -> tuple[float, ...]:
+        return self.partition(distance).offsets
+
+
+@lru_cache(maxsize=PARTITION_CACHE_SIZE, typed=True)
+def _even_partition(sub_split_count: int, distance: float) -> SubSplitPartition:
+    return SubSplitPartition.of(distance / sub_split_count for _ in range(sub_split_count))
+
+
+@lru_cache(maxsize=PARTITION_CACHE_SIZE, typed=True)
+def _fixed_distance_partition(sub_split_distance: float,
+                              last_sub_split_threshold: float | None,
+                              distance: float) -> SubSplitPartition:
+    full_sub_split_count = int(distance // sub_split_distance)
+    splits = [sub_split_distance for _ in range(full_sub_split_count)]
+
+    residual_distance = distance % sub_split_distance
+    # residual distance is within threshold, add it to last split
+    if last_sub_split_threshold is not None and 0 < residual_distance < last_sub_split_threshold:
+        splits[-1] = sub_split_distance + residual_distance
+    elif 0 < residual_distance:
+        splits.append(residual_distance)
+
+    return SubSplitPartition.of(splits)
+
+
+@lru_cache(maxsize=PARTITION_CACHE_SIZE, typed=True)
+def _custom_partition(sub_split_distances: tuple[float, ...]) -> SubSplitPartition:
+    return SubSplitPartition.of(sub_split_distances)
+
 
 @dataclass
 class EvenSubSplitMode(SubSplitMode):
     sub_split_count: int
 
-    def sub_splits(self, distance) -> list[float]:
-        return [distance / self.sub_split_count for _ in range(self.sub_split_count)]
+    def sub_splits(self, distance) -> tuple[float, ...]:
+        return self.partition(distance).distances
+
+    def partition(self, distance: float) -> SubSplitPartition:
+        return _even_partition(self.sub_split_count, distance)
+
+    def count(self, distance: float) -> int:
+        return self.sub_split_count
 
 
 @dataclass
@@ -20,23 +82,19 @@ class FixedDistanceSubSplitMode(SubSplitMode):
     sub_split_distance: float
     last_sub_split_threshold: float | None = None
 
-    def sub_splits(self, distance) -> list[float]:
-        full_sub_split_count = int(distance // self.sub_split_distance)
-        splits = [self.sub_split_distance for _ in range(full_sub_split_count)]
+    def sub_splits(self, distance) -> tuple[float, ...]:
+        return self.partition(distance).distances
 
-        residual_distance = distance % self.sub_split_distance
-        # residual distance is within threshold, add it to last split
-        if self.last_sub_split_threshold is not None and 0 < residual_distance < self.last_sub_split_threshold:
-            splits[-1] = self.sub_split_distance + residual_distance
-        elif 0 < residual_distance:
-            splits.append(residual_distance)
-
-        return splits
+    def partition(self, distance: float) -> SubSplitPartition:
+        return _fixed_distance_partition(self.sub_split_distance, self.last_sub_split_threshold, distance)
 
 
 @dataclass
 class CustomSubSplitMode(SubSplitMode):
     sub_split_distances: list[float]
 
-    def sub_splits(self, distance) -> list[float]:
-        return self.sub_split_distances
+    def sub_splits(self, distance) -> tuple[float, ...]:
+        return self.partition(distance).distances
+
+    def partition(self, distance: float) -> SubSplitPartition:
+        return _custom_partition(tuple(self.sub_split_distances))
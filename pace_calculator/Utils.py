@@ -1,38 +1,144 @@
-import math
-from datetime import timedelta
+import locale
+import re
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+# strftime directives that only change by the day, so a format made of them and of time of day fields is rendered once
+# per day; %z and %Z are left out as the offset of aware datetimes can change within a day
+_DAILY_DIRECTIVES = frozenset('aAbBdjmuUVwWyYG%')
+# time of day fields, filled in for every datetime: hour, 12-hour clock hour, AM/PM, minute, second
+_TIME_OF_DAY_FIELDS = {'%H': '{0}', '%I': '{1}', '%p': '{2}', '%M': '{3}', '%S': '{4}'}
+_TWO_DIGITS = [f'{i:02d}' for i in range(60)]
+# the hours and minutes of every minute of a day, and the seconds of every centisecond of a minute
+_HOURS_MINUTES = [f'{hours:2d}h {minutes:2d}m ' for hours in range(24) for minutes in range(60)]
+_SECONDS = [f'{centiseconds // 100:2d}.{centiseconds % 100:02d}s' for centiseconds in range(6_000)]
 
 
 def format_field(val: str, formatting: str):
     return f'{val:{formatting}}'
 
 
+def to_centiseconds(hours_timedelta: timedelta | float) -> int:
+    """
+    :param hours_timedelta: a duration, or decimal hours
+    :return: the duration in whole centiseconds, rounded half away from zero
+    """
+    if type(hours_timedelta) == timedelta:
+        microseconds = (hours_timedelta.days * 86_400 + hours_timedelta.seconds) * 1_000_000 \
+                       + hours_timedelta.microseconds
+    else:
+        microseconds = round(hours_timedelta * 3_600_000_000)
+
+    centiseconds = (abs(microseconds) + 5_000) // 10_000
+    return -centiseconds if microseconds < 0 else centiseconds
+
+
+@lru_cache(maxsize=65_536)
+def centiseconds_to_pretty(centiseconds: int) -> str:
+    """
+    Formats whole centiseconds as days, hours, minutes, and seconds.
+    Equal durations (e.g. sub-splits of equal length) are only formatted once.
+
+    :param centiseconds: the amount to convert
+    :return: string representing the day, hour, minute, and second of the duration
+    """
+    sign = '-' if centiseconds < 0 else ' '
+    minutes, centiseconds = divmod(abs(centiseconds), 6_000)
+    days, minutes = divmod(minutes, 1_440)
+
+    return f"{sign}{days:2d}d {_HOURS_MINUTES[minutes]}{_SECONDS[centiseconds]}"
+
+
 def hours_to_pretty(hours_timedelta: timedelta | float):
     """
     Converts decimal hours to days, hours, minutes, and seconds.
-    Leading zeroes can be omitted and last precision can be reduced to minutes.
-    The last precision is rounded.
+    The seconds are rounded to hundredths.
 
-    :param hours_timedelta: the amount to convert
+    :param hours_timedelta: the amount to convert, a timedelta or decimal hours
     :return: string representing the day, hour, minute, and second of the decimal hours
     """
+    return centiseconds_to_pretty(to_centiseconds(hours_timedelta))
 
-    if type(hours_timedelta) == timedelta:
-        is_neg = hours_timedelta.total_seconds() < 0
-        decimal_hours = hours_timedelta.total_seconds() / 3600
-    else:
-        is_neg = hours_timedelta < 0
-        decimal_hours = hours_timedelta
 
-    if is_neg:
-        decimal_hours *= -1
-    days = decimal_hours // 24
-    hours = decimal_hours % 24
-    minutes = (decimal_hours - int(decimal_hours)) * 60
-    seconds = (minutes - int(minutes)) * 60
+def hours_to_pretty_batch(durations: Iterable[timedelta | float]) -> list[str]:
+    """
+    Formats a whole column of durations, each distinct duration being converted and formatted once.
+
+    :param durations: the amounts to convert, timedeltas or decimal hours
+    :return: the formatted durations, in order
+    """
+    formatted: dict[timedelta | float, str] = {}
+    res = []
+    for duration in durations:
+        value = formatted.get(duration)
+        if value is None:
+            value = formatted[duration] = centiseconds_to_pretty(to_centiseconds(duration))
+        res.append(value)
 
-    return f"{'-' if is_neg else ' '}{math.floor(days):2d}d {math.floor(hours):2d}h {math.floor(minutes):2d}m {seconds:5.2f}s"
+    return res
 
 
 def span_to_pretty(span: tuple[float, float]):
     start_distance, distance = span
     return f"{start_distance:7.2f}, {start_distance + distance:7.2f}"
+
+
+def span_to_pretty_batch(spans: Iterable[tuple[float, float]]) -> list[str]:
+    """
+    Formats a whole column of spans, as span_to_pretty does span by span.
+
+    :param spans: (start distance, distance) pairs
+    :return: the formatted spans, in order
+    """
+    return [f"{start_distance:7.2f}, {start_distance + distance:7.2f}" for start_distance, distance in spans]
+
+
+@lru_cache(maxsize=256)
+def _strftime_plan(fmt: str,
+                   time_locale: tuple[str | None, str | None]) -> tuple[str, list[tuple[str, str, str]]] | None:
+    """
+    :param fmt: a strftime format
+    :param time_locale: the LC_TIME locale the plan is made for, as AM/PM follow it
+    :return: the per-day format and the hour, 12-hour clock hour and AM/PM of every hour,
+             None when the format has fields that change within a day other than the time of day fields
+    """
+    tokens = re.findall(r'%.|%$|[^%]+', fmt)
+    if any(token[0] == '%' and token not in _TIME_OF_DAY_FIELDS and token[1:] not in _DAILY_DIRECTIVES
+           for token in tokens):
+        return None
+
+    day_format = ''.join(_TIME_OF_DAY_FIELDS.get(token, token.replace('{', '{{').replace('}', '}}'))
+                         for token in tokens)
+    am, pm = datetime(2000, 1, 1, 0).strftime('%p'), datetime(2000, 1, 1, 12).strftime('%p')
+    return day_format, [(_TWO_DIGITS[hour], _TWO_DIGITS[(hour - 1) % 12 + 1], am if hour < 12 else pm)
+                        for hour in range(24)]
+
+
+def strftime_batch(datetimes: Iterable[datetime], fmt: str) -> list[str]:
+    """
+    Formats a whole column of datetimes, as datetime.strftime does datetime by datetime.
+    When the format only has fields that change by the day besides hours, AM/PM, minutes and seconds
+    (e.g. '%m/%d %I:%M:%S %p'), each day is formatted once and only the time of day of every datetime is filled in.
+    The analysis of the format is cached, so small batches cost little more than their values.
+
+    :param datetimes: the datetimes to format
+    :param fmt: a strftime format
+    :return: the formatted datetimes, in order
+    """
+    plan = _strftime_plan(fmt, locale.getlocale(locale.LC_TIME))
+    if plan is None:
+        return [value.strftime(fmt) for value in datetimes]
+
+    day_format, hour_fields = plan
+    templates: dict[date, str] = {}
+    res = []
+    for value in datetimes:
+        day = value.date()
+        template = templates.get(day)
+        if template is None:
+            template = templates[day] = value.strftime(day_format)
+        hour, hour_12, am_pm = hour_fields[value.hour]
+        res.append(template.format(hour, hour_12, am_pm, _TWO_DIGITS[value.minute], _TWO_DIGITS[value.second]))
+
+    return res
@@ -0,0 +1,318 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import cached_property
+
+import numpy as np
+
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.CourseDetail import CourseDetail
+from Cycling.pace_calculator.SegmentDetail import SegmentDetail
+from Cycling.pace_calculator.SpeedChain import SpeedChain
+from Cycling.pace_calculator.SplitDetail import SplitDetail
+from Cycling.pace_calculator.SubSplitCalculator import LazySubSplits
+
+
+@dataclass
+class CourseArrays:
+    """
+    Struct-of-arrays packing of a Course.
+    Every per-split array has one entry per split in course order, segments flattened.
+    Optional overrides are stored as NaN when they are not defined.
+    """
+    distances: np.ndarray
+    speed_overrides: np.ndarray  # split moving_speed
+    segment_speed_overrides: np.ndarray  # segment moving_speed, only set on the first split of a segment
+    min_moving_speeds: np.ndarray  # floor applied when decaying into the next split
+    segment_down_time_ratios: np.ndarray  # segment down_time_ratio
+    down_time_overrides: np.ndarray  # seconds
+    adjustment_times: np.ndarray  # seconds
+    zero_down_time: np.ndarray  # True for the last split of a segment with no_end_down_time
+    segment_bounds: np.ndarray  # split index where each segment starts, plus the total split count
+    sleep_times: np.ndarray  # seconds, per segment
+
+    @classmethod
+    def from_course(cls, course: Course) -> 'CourseArrays':
+        """
+        Packs the inputs of a course into flat arrays.
+
+        :param course: the Course to pack
+        :return: a CourseArrays object
+        """
+        nan = float('nan')
+        distances, speed_overrides, segment_speed_overrides = [], [], []
+        min_moving_speeds, segment_down_time_ratios, down_time_overrides = [], [], []
+        adjustment_times, zero_down_time, segment_bounds, sleep_times = [], [], [0], []
+
+        for segment in course.segments:
+            min_moving_speed = course.min_moving_speed if segment.min_moving_speed is None \
+                else segment.min_moving_speed
+            down_time_ratio = nan if segment.down_time_ratio is None else segment.down_time_ratio
+            last = len(segment.splits) - 1
+
+            for i, split in enumerate(segment.splits):
+                distances.append(split.distance)
+                speed_overrides.append(nan if split.moving_speed is None else split.moving_speed)
+                segment_speed_overrides.append(nan if i > 0 or segment.moving_speed is None else segment.moving_speed)
+                min_moving_speeds.append(min_moving_speed)
+                segment_down_time_ratios.append(down_time_ratio)
+                down_time_overrides.append(nan if split.down_time is None else split.down_time.total_seconds())
+                adjustment_times.append(split.adjusted_time.total_seconds())
+                zero_down_time.append(i == last and segment.no_end_down_time)
+
+            segment_bounds.append(len(distances))
+            sleep_times.append(segment.sleep_time.total_seconds())
+
+        return cls(
+            distances=np.array(distances, dtype=float),
+            speed_overrides=np.array(speed_overrides, dtype=float),
+            segment_speed_overrides=np.array(segment_speed_overrides, dtype=float),
+            min_moving_speeds=np.array(min_moving_speeds, dtype=float),
+            segment_down_time_ratios=np.array(segment_down_time_ratios, dtype=float),
+            down_time_overrides=np.array(down_time_overrides, dtype=float),
+            adjustment_times=np.array(adjustment_times, dtype=float),
+            zero_down_time=np.array(zero_down_time, dtype=bool),
+            segment_bounds=np.array(segment_bounds, dtype=np.intp),
+            sleep_times=np.array(sleep_times, dtype=float),
+        )
+
+    @property
+    def split_count(self) -> int:
+        return len(self.distances)
+
+    @property
+    def segment_index(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.sleep_times)), np.diff(self.segment_bounds))
+
+
+@dataclass
+class VectorizedCourseDetail:
+    """
+    Array form of a computed course. Times are stored as seconds (offsets are relative to the course start).
+    The CourseDetail tree is only built when course_details is accessed, which requires the course to be attached.
+    """
+    course: Course | None
+    arrays: CourseArrays
+    start_time: datetime
+    moving_speeds: np.ndarray
+    moving_times: np.ndarray
+    down_times: np.ndarray
+    split_times: np.ndarray
+    total_times: np.ndarray
+    start_offsets: np.ndarray
+    start_distances: np.ndarray
+    segment_start_offsets: np.ndarray
+    segment_end_offsets: np.ndarray
+    end_offset: float
+
+    @property
+    def end_time(self) -> datetime:
+        return self.start_time + timedelta(seconds=self.end_offset)
+
+    @property
+    def total_moving_time(self) -> float:
+        # mirrors Course.compute_course_details, which accumulates segment elapsed time here
+        return float(np.sum(self.segment_end_offsets - self.segment_start_offsets))
+
+    @property
+    def total_down_time(self) -> float:
+        return float(np.sum(self.down_times))
+
+    @property
+    def total_adjustment_time(self) -> float:
+        return float(np.sum(self.arrays.adjustment_times))
+
+    @property
+    def total_sleep_time(self) -> float:
+        return float(np.sum(self.arrays.sleep_times))
+
+    @property
+    def paces(self) -> np.ndarray:
+        return self.arrays.distances / (self.total_times / 3600)
+
+    @cached_property
+    def course_details(self) -> CourseDetail:
+        """
+        Materializes the CourseDetail tree from the computed arrays.
+
+        :return: a CourseDetail object equivalent to Course.compute_course_details
+        """
+        if self.course is None:
+            raise ValueError("Course is not attached to these course details.")
+
+        start_time = self.start_time
+        bounds = self.arrays.segment_bounds
+        adjustment_times = self.arrays.adjustment_times
+        segment_details: list[SegmentDetail] = []
+
+        for s, segment in enumerate(self.course.segments):
+            split_details: list[SplitDetail] = []
+            for i, split in enumerate(segment.splits, start=bounds[s]):
+                split_start = start_time + timedelta(seconds=float(self.start_offsets[i]))
+                moving_speed = float(self.moving_speeds[i])
+                down_time = timedelta(seconds=float(self.down_times[i]))
+                split_time = timedelta(seconds=float(self.split_times[i]))
+                total_time = timedelta(seconds=float(self.total_times[i]))
+
+                split_details.append(SplitDetail(
+                    distance=split.distance,
+                    start_time=split_start,
+                    end_time=split_start + total_time,
+                    adjustment_start=split_start + split_time,
+                    moving_speed=moving_speed,
+                    moving_time=timedelta(seconds=float(self.moving_times[i])),
+                    down_time=down_time,
+                    adjustment_time=timedelta(seconds=float(adjustment_times[i])),
+                    split_time=split_time,
+                    total_time=total_time,
+                    pace=split.distance / (total_time.total_seconds() / 3600),
+                    start_distance=float(self.start_distances[i]),
+                    rest_stop=split.rest_stop,
+                    sub_splits=LazySubSplits(
+                        split=split,
+                        start_distance=float(self.start_distances[i]),
+                        start_time=split_start,
+                        down_time=down_time,
+                        moving_speed=moving_speed
+                    )
+                ))
+
+            segment_slice = slice(bounds[s], bounds[s + 1])
+            segment_start = start_time + timedelta(seconds=float(self.segment_start_offsets[s]))
+            segment_end = start_time + timedelta(seconds=float(self.segment_end_offsets[s]))
+            segment_details.append(SegmentDetail(
+                split_details=split_details,
+                start_time=segment_start,
+                end_time=segment_end,
+                total_elapsed_time=segment_end - segment_start,
+                total_down_time=timedelta(seconds=float(np.sum(self.down_times[segment_slice]))),
+                total_moving_time=timedelta(seconds=float(np.sum(self.moving_times[segment_slice]))),
+                total_adjustment_time=timedelta(seconds=float(np.sum(adjustment_times[segment_slice]))),
+                total_sleep_time=segment.sleep_time,
+            ))
+
+        return CourseDetail(
+            segment_details=segment_details,
+            start_time=start_time,
+            end_time=self.end_time,
+            total_elapsed_time=self.end_time - start_time,
+            total_moving_time=timedelta(seconds=self.total_moving_time),
+            total_down_time=timedelta(seconds=self.total_down_time),
+            total_sleep_time=timedelta(seconds=self.total_sleep_time),
+            total_adjustment_time=timedelta(seconds=self.total_adjustment_time)
+        )
+
+
+@dataclass
+class VectorizedCourseCalculator:
+    """
+    Alternative engine to Course.compute_course_details.
+    Splits are packed into arrays and every quantity is computed with array operations.
+    """
+
+    @staticmethod
+    def compute_moving_speeds(arrays: CourseArrays,
+                              init_moving_speed: float | np.ndarray,
+                              split_decay: float | np.ndarray) -> np.ndarray:
+        """
+        Computes the decayed moving speed of every split.
+        A split override, or a segment override on the first split of a segment, resets the chain.
+        Otherwise, speed[i] = max(speed[i - 1] - split_decay, min_moving_speed[i - 1]).
+        init_moving_speed and split_decay can be arrays of scenarios, in which case one row is computed per scenario.
+
+        :param arrays: the packed course
+        :param init_moving_speed: the moving speed of the first split
+        :param split_decay: how much speed drops from one split to the next
+        :return: array of moving speeds, shaped (..., split count)
+        """
+        resets = np.where(np.isnan(arrays.speed_overrides), arrays.segment_speed_overrides, arrays.speed_overrides)
+        return SpeedChain.compute(init_moving_speed, split_decay, resets, arrays.min_moving_speeds)
+
+    @staticmethod
+    def compute_split_times(arrays: CourseArrays,
+                            moving_speeds: np.ndarray,
+                            down_time_ratio: float | np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Computes the moving, down and total times of every split in seconds.
+        down_time_ratio is the course ratio; segments that define their own ratio keep it.
+
+        :param arrays: the packed course
+        :param moving_speeds: moving speeds as returned by compute_moving_speeds
+        :param down_time_ratio: the course down time ratio, or an array of scenarios
+        :return: tuple of moving times, down times and total times, shaped like moving_speeds
+        """
+        moving_times = arrays.distances / moving_speeds * 3600
+
+        down_time_ratios = np.where(np.isnan(arrays.segment_down_time_ratios),
+                                    np.asarray(down_time_ratio, dtype=float)[..., np.newaxis],
+                                    arrays.segment_down_time_ratios)
+        down_times = np.where(np.isnan(arrays.down_time_overrides),
+                              moving_times * down_time_ratios,
+                              arrays.down_time_overrides)
+        down_times[..., arrays.zero_down_time] = 0
+
+        return moving_times, down_times, moving_times + down_times + arrays.adjustment_times
+
+    @staticmethod
+    def compute_course_details(course: Course) -> VectorizedCourseDetail:
+        """
+        Computes the breakdown of the course with array operations.
+
+        :param course: the Course to compute
+        :return: a VectorizedCourseDetail, whose course_details property builds the CourseDetail tree lazily
+        """
+        return VectorizedCourseCalculator.compute_arrays(CourseArrays.from_course(course),
+                                                         init_moving_speed=course.init_moving_speed,
+                                                         split_decay=course.split_decay,
+                                                         down_time_ratio=course.down_time_ratio,
+                                                         start_time=course.start_time,
+                                                         course=course)
+
+    @staticmethod
+    def compute_arrays(arrays: CourseArrays,
+                       init_moving_speed: float,
+                       split_decay: float,
+                       down_time_ratio: float,
+                       start_time: datetime,
+                       course: Course | None = None) -> VectorizedCourseDetail:
+        """
+        Computes the breakdown of an already packed course.
+
+        :param arrays: the packed course
+        :param init_moving_speed: the course initial moving speed
+        :param split_decay: the course speed decay per split
+        :param down_time_ratio: the course down time ratio
+        :param start_time: the course start time
+        :param course: the Course the arrays were packed from, needed to build the CourseDetail tree
+        :return: a VectorizedCourseDetail
+        """
+        moving_speeds = VectorizedCourseCalculator.compute_moving_speeds(arrays, init_moving_speed, split_decay)
+        moving_times, down_times, total_times = VectorizedCourseCalculator.compute_split_times(arrays,
+                                                                                              moving_speeds,
+                                                                                              down_time_ratio)
+
+        # sleep time of every previous segment shifts the start of the following splits
+        bounds = arrays.segment_bounds
+        elapsed = np.concatenate(([0.], np.cumsum(total_times)))
+        segment_totals = elapsed[bounds[1:]] - elapsed[bounds[:-1]]
+        segment_spans = segment_totals + arrays.sleep_times
+        segment_start_offsets = np.concatenate(([0.], np.cumsum(segment_spans)[:-1]))
+        segment_end_offsets = segment_start_offsets + segment_totals
+
+        start_offsets = elapsed[:-1] + np.repeat(np.cumsum(arrays.sleep_times) - arrays.sleep_times, np.diff(bounds))
+        start_distances = np.concatenate(([0.], np.cumsum(arrays.distances)[:-1]))
+
+        return VectorizedCourseDetail(
+            course=course,
+            arrays=arrays,
+            start_time=start_time,
+            moving_speeds=moving_speeds,
+            moving_times=moving_times,
+            down_times=down_times,
+            split_times=moving_times + down_times,
+            total_times=total_times,
+            start_offsets=start_offsets,
+            start_distances=start_distances,
+            segment_start_offsets=segment_start_offsets,
+            segment_end_offsets=segment_end_offsets,
+            end_offset=float(np.sum(segment_spans)),
+        )
@@ -0,0 +1,358 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from Cycling.mishigami_planning.PaceCalculatorPrinter import PaceCalculatorPrinter
+from Cycling.mishigami_planning.RestStop import RestStop as LegacyRestStop
+from Cycling.mishigami_planning.Split import Split as LegacySplit
+from Cycling.mishigami_planning.SubDistancePaceCalculator import SubDistancePaceCalculator
+from Cycling.pace_calculator.Course import Course
+from Cycling.pace_calculator.CourseDetailExporter import CourseDetailExporter
+from Cycling.pace_calculator.CourseDetailPrinter import CourseDetailPrinter
+from Cycling.pace_calculator.RestStop import RestStop, WeeklyOpenHours, FixedOpenHours
+from Cycling.pace_calculator.Segment import Segment
+from Cycling.pace_calculator.Split import Split
+from Cycling.pace_calculator.SubSplitMode import EvenSubSplitMode, FixedDistanceSubSplitMode, CustomSubSplitMode
+
+SPLIT_COUNTS = (10, 100, 10_000)
+SUB_SPLIT_MODES = ('even', 'fixed_distance', 'custom')
+SPLITS_PER_SEGMENT = 50
+START_TIME = datetime(2025, 7, 12, 6, 0, 0)
+
+
+@dataclass
+class BenchmarkCase:
+    split_count: int
+    sub_split_mode: str
+    with_rest_stops: bool
+
+    @property
+    def name(self) -> str:
+        return f"{self.split_count}-{self.sub_split_mode}-{'stops' if self.with_rest_stops else 'no_stops'}"
+
+
+@dataclass
+class BenchmarkResult:
+    case: str
+    stage: str
+    split_count: int
+    sub_split_mode: str
+    with_rest_stops: bool
+    rows: int  # number of splits or sub-splits the stage went through
+    best_seconds: float
+    mean_seconds: float
+    repeat: int
+    peak_memory: int  # bytes allocated at peak while the stage ran, as reported by tracemalloc
+
+
+def make_sub_split_mode(sub_split_mode: str, distance: float):
+    if sub_split_mode == 'even':
+        return EvenSubSplitMode(sub_split_count=4)
+    if sub_split_mode == 'fixed_distance':
+        return FixedDistanceSubSplitMode(sub_split_distance=25, last_sub_split_threshold=5)
+    if sub_split_mode == 'custom':
+        return CustomSubSplitMode(sub_split_distances=[distance * 0.4, distance * 0.35, distance * 0.25])
+
+    raise ValueError(f"Unknown sub-split mode '{sub_split_mode}'.")
+
+
+def make_rest_stop(i: int) -> RestStop:
+    open_hours = FixedOpenHours(hours="24hrs") if i % 2 else WeeklyOpenHours(
+        mon="6:00a -  9:00p",
+        tue="9:00a - 10:00p",
+        wed="6:00a -  9:00p",
+        fri="6:00a - 11:00p",
+        sat="7:00a -  8:00p",
+    )
+    return RestStop(
+        name=f"Stop {i}",
+        open_hours=open_hours,
+        address=f"{100 + i} Main St, Chicago, IL 60620",
+        alt="https://example.com/stops",
+    )
+
+
+def make_distances(split_count: int, seed: int = 0) -> list[float]:
+    rng = random.Random(seed)
+    return [round(rng.uniform(40, 120), 1) for _ in range(split_count)]
+
+
+def make_course(case: BenchmarkCase, seed: int = 0) -> Course:
+    """
+    Builds a synthetic course: splits of 40-120 miles grouped into segments of SPLITS_PER_SEGMENT splits,
+    with an occasional moving speed, down time or adjusted time override.
+
+    :param case: the size and shape of the course
+    :param seed: seed of the generated distances and overrides
+    :return: a Course
+    """
+    rng = random.Random(seed)
+    distances = make_distances(case.split_count, seed)
+
+    splits = []
+    for i, distance in enumerate(distances):
+        splits.append(Split(
+            distance=distance,
+            sub_split_mode=make_sub_split_mode(case.sub_split_mode, distance),
+            rest_stop=make_rest_stop(i) if case.with_rest_stops else None,
+            moving_speed=rng.uniform(12, 18) if rng.random() < 0.1 else None,
+            down_time=timedelta(minutes=rng.randint(5, 30)) if rng.random() < 0.1 else None,
+            adjusted_time=timedelta(minutes=rng.randint(10, 60)) if rng.random() < 0.05 else timedelta(hours=0),
+        ))
+
+    segments = [
+        Segment(splits=splits[i:i + SPLITS_PER_SEGMENT], sleep_time=timedelta(hours=4))
+        for i in range(0, len(splits), SPLITS_PER_SEGMENT)
+    ]
+    return Course(
+        segments=segments,
+        KOMs=[],
+        start_time=START_TIME,
+        init_moving_speed=17,
+        min_moving_speed=15,
+        down_time_ratio=0.05,
+        split_decay=0.1
+    )
+
+
+def make_legacy_calculator(case: BenchmarkCase, seed: int = 0) -> SubDistancePaceCalculator | None:
+    """
+    Builds the SubDistancePaceCalculator equivalent of make_course, as a single segment.
+
+    :param case: the size and shape of the course
+    :param seed: seed of the generated distances
+    :return: a SubDistancePaceCalculator, or None if the sub-split mode has no legacy equivalent
+    """
+    if case.sub_split_mode == 'custom':
+        return None
+
+    hours = {day: "6:00a -  9:00p" for day in range(7)}
+    splits = [
+        LegacySplit(
+            distance=distance,
+            sub_split_count=4 if case.sub_split_mode == 'even' else None,
+            rest_stop=LegacyRestStop(name=f"Stop {i}", hours=hours, address=f"{100 + i} Main St",
+                                     alt="https://example.com/stops") if case.with_rest_stops else None,
+        )
+        for i, distance in enumerate(make_distances(case.split_count, seed))
+    ]
+
+    pace_calculator = SubDistancePaceCalculator()
+    pace_calculator.set_split_info(
+        start_moving_speed=17,
+        min_moving_speed=15,
+        splits=splits,
+        downtime_ratio=0.05,
+        decay_per_split=0.1,
+        start_time=START_TIME,
+        sub_split_distances=25,
+    )
+    return pace_calculator
+
+
+def measure(run: Callable[[], Any], repeat: int) -> tuple[float, float, int]:
+    """
+    Times run repeat times, then runs it once more under tracemalloc, as tracing slows down the timed runs.
+
+    :param run: the stage to measure
+    :param repeat: how many timed runs
+    :return: the best and mean run time in seconds, and the peak traced memory in bytes
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings), sum(timings) / len(timings), peak_memory
+
+
+def stages(case: BenchmarkCase, output_dir: str) -> dict[str, tuple[int, Callable[[], Any]]]:
+    """
+    :param case: the course to benchmark
+    :param output_dir: where the export stages write their files
+    :return: the stages by name, with the number of rows each goes through
+    """
+    course = make_course(case)
+    course_details = course.compute_course_details()
+    split_rows = case.split_count
+    sub_split_rows = sum(split.sub_split_mode.count(split.distance)
+                         for segment in course.segments for split in segment.splits)
+
+    def materialize_sub_splits():
+        for segment_detail in course.compute_course_details().segment_details:
+            for split_detail in segment_detail.split_details:
+                split_detail.sub_splits[0]
+
+    exporter = CourseDetailExporter(course_details)
+    res = {
+        'compute': (split_rows, course.compute_course_details),
+        'compute_sub_splits': (sub_split_rows, materialize_sub_splits),
+        'print': (split_rows, lambda: CourseDetailPrinter(course_details).render()),
+        'print_sub_splits': (split_rows + sub_split_rows,
+                             lambda: CourseDetailPrinter(course_details).render(include_sub_splits=True)),
+        'export_csv': (split_rows, lambda: exporter.to_csv(os.path.join(output_dir, 'splits.csv'))),
+        'export_sub_splits_csv': (sub_split_rows,
+                                  lambda: exporter.to_csv(os.path.join(output_dir, 'sub_splits.csv'), sub_splits=True)),
+        # the streaming stages compute the course as they go, in constant memory
+        'stream_print': (split_rows, lambda: CourseDetailPrinter().write_progress(course.iter_split_details(),
+                                                                                  stream=io.StringIO())),
+        'stream_export_csv': (split_rows, lambda: CourseDetailExporter.write_csv_stream(
+            course.iter_split_details(), os.path.join(output_dir, 'splits_stream.csv'))),
+    }
+
+    try:
+        exporter.to_arrow_table()
+        res['export_parquet'] = (split_rows, lambda: exporter.to_parquet(os.path.join(output_dir, 'splits.parquet')))
+    except ImportError:
+        pass
+
+    pace_calculator = make_legacy_calculator(case)
+    if pace_calculator is not None:
+        def legacy_print():
+            with contextlib.redirect_stdout(io.StringIO()):
+                PaceCalculatorPrinter(pace_calculator).print(with_sub_splits=True)
+
+        legacy_rows = sum(len(split['sub_splits']) for split in pace_calculator.get_split_breakdown()[0])
+        res['legacy_compute'] = (split_rows + legacy_rows, pace_calculator.get_split_breakdown)
+        res['legacy_print'] = (split_rows + legacy_rows, legacy_print)
+
+    return res
+
+
+def run_benchmarks(cases: list[BenchmarkCase],
+                   repeat: int = 5,
+                   stage_names: set[str] | None = None,
+                   log: Callable[[str], Any] | None = print) -> list[BenchmarkResult]:
+    """
+    Runs every stage of every case.
+
+    :param cases: the courses to benchmark
+    :param repeat: timed runs per stage; the largest courses are run fewer times
+    :param stage_names: the stages to run, all of them if None
+    :param log: where progress lines go, or None
+    :return: a BenchmarkResult per case and stage
+    """
+    res = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for case in cases:
+            case_repeat = max(1, repeat // 5) if case.split_count >= 10_000 else repeat
+            for stage, (rows, run) in stages(case, output_dir).items():
+                if stage_names is not None and stage not in stage_names:
+                    continue
+
+                best_seconds, mean_seconds, peak_memory = measure(run, case_repeat)
+                res.append(BenchmarkResult(
+                    case=case.name,
+                    stage=stage,
+                    split_count=case.split_count,
+                    sub_split_mode=case.sub_split_mode,
+                    with_rest_stops=case.with_rest_stops,
+                    rows=rows,
+                    best_seconds=best_seconds,
+                    mean_seconds=mean_seconds,
+                    repeat=case_repeat,
+                    peak_memory=peak_memory,
+                ))
+                if log is not None:
+                    log(f"{case.name:28s} {stage:22s} {best_seconds * 1000:10.2f} ms {peak_memory / 2 ** 20:9.2f} MiB")
+
+    return res
+
+
+def environment() -> dict[str, str | None]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+
+
+def save_results(results: list[BenchmarkResult], filename: str):
+    with open(filename, 'w') as f:
+        json.dump({'environment': environment(), 'results': [asdict(_r) for _r in results]}, f, indent=2)
+
+
+def compare_results(results: list[BenchmarkResult], baseline_filename: str, threshold: float = 1.1) -> list[str]:
+    """
+    Compares results against a file saved by save_results.
+
+    :param results: the current results
+    :param baseline_filename: the saved results of a previous version
+    :param threshold: ratio of best times above which a stage counts as a regression
+    :return: a line per stage that got slower than the threshold
+    """
+    with open(baseline_filename) as f:
+        baseline = {(_r['case'], _r['stage']): _r for _r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result.case, result.stage))
+        if previous is None or not previous['best_seconds']:
+            continue
+
+        ratio = result.best_seconds / previous['best_seconds']
+        if ratio > threshold:
+            regressions.append(f"{result.case} {result.stage}: {previous['best_seconds'] * 1000:.2f} ms -> "
+                               f"{result.best_seconds * 1000:.2f} ms ({ratio:.2f}x)")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the pace calculation engines, printers and exporters.")
+    parser.add_argument('--output', default='benchmark_results.json', help="file the results are saved to")
+    parser.add_argument('--compare', help="results file of a previous version to report regressions against")
+    parser.add_argument('--split-counts', type=int, nargs='+', default=list(SPLIT_COUNTS))
+    parser.add_argument('--sub-split-modes', nargs='+', choices=SUB_SPLIT_MODES, default=list(SUB_SPLIT_MODES))
+    parser.add_argument('--stages', nargs='+', help="only run these stages, e.g. compute print export_csv")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [BenchmarkCase(split_count, sub_split_mode, with_rest_stops)
+             for split_count in args.split_counts
+             for sub_split_mode in args.sub_split_modes
+             for with_rest_stops in (False, True)]
+
+    results = run_benchmarks(cases, repeat=args.repeat, stage_names=set(args.stages) if args.stages else None)
+    save_results(results, args.output)
+
+    if args.compare:
+        regressions = compare_results(results, args.compare)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()